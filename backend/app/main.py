@@ -11,14 +11,13 @@ from typing import Optional, Dict, Any, List
 from datetime import timedelta, datetime
 import asyncio
 import base64
+import json
 import io
 import os
 import logging
 from logging.handlers import RotatingFileHandler
 import io
 import secrets
-import time
-import threading
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -28,22 +27,45 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 # Import local modules
-from app.database import get_db, User, Subscription, LoginHistory, UserActivity, FileProcessingHistory, ConsentLog, ApiKey, ApiUsage, ApiBilling, init_db
+from app.database import get_db, User, Subscription, LoginHistory, UserActivity, FileProcessingHistory, ConsentLog, ApiKey, ApiUsage, ApiBilling, init_db, SessionLocal
 from app.utils.auth import (
     authenticate_user, create_access_token, get_current_user, get_current_admin_user,
-    get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_current_principal, hash_password, ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from app.utils.password_hasher import PasswordHasherBusy, get_password_hasher, shutdown_password_hasher
+from app.utils.principal_cache import get_principal_cache, invalidate_principal
 from app.services.ai_service import (
     invoke_llm, generate_image, generate_formula, analyze_data, suggest_chart_type,
     generate_transform, explain_sql
 )
 from app.services.zip_processor import ZipProcessorService
-from app.services.excel_to_ppt import ExcelToPPTService
+from app.services.excel_to_ppt import ExcelToPPTService, CHART_AGGREGATIONS
 from app.services.ocr_service import (
     OCRService,
     OCR_SPACE_MAX_BYTES,
     extract_with_layout_ocrspace,
+    ocrspace_result_key,
     pdf_from_image,
+    tesseract_result_key,
+)
+from app.services.ocr_pool import OCRPoolFull, get_ocr_pool, shutdown_ocr_pool
+from app.services.ocr_hedge import LOCAL_ENGINE, REMOTE_ENGINE, get_hedged_ocr
+from app.services.ocr_result_cache import get_ocr_result_cache
+from app.services.page_raster_cache import document_hash, shutdown_page_raster_cache
+from app.services.http_client import close_http_client
+from app.services.geo_enrichment import get_geo_enricher, ip_cache_get, ip_cache_set, is_private_ip, shutdown_geo_enricher
+from app.services.document_source import read_source
+from app.services.upload_spool import SpooledUpload, UploadTooLarge, spool_upload
+from app.services.job_queue import (
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    TERMINAL_STATES,
+    Job,
+    JobOutput,
+    JobQueueFull,
+    get_job_manager,
+    shutdown_job_manager,
 )
 from app.services.file_analyzer import FileAnalyzerService
 from app.services.pl_builder import PLBuilderService
@@ -147,6 +169,17 @@ async def startup_event():
     logger.info("Database initialized")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs, release worker pools, caches and outbound HTTP connections on shutdown"""
+    await shutdown_job_manager()
+    await shutdown_geo_enricher()
+    shutdown_ocr_pool()
+    shutdown_page_raster_cache()
+    shutdown_password_hasher()
+    await close_http_client()
+
+
 # Pydantic Models
 class UserRegister(BaseModel):
     email: EmailStr
@@ -267,7 +300,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         verification_expires = datetime.utcnow() + timedelta(hours=24)  # Token expires in 24 hours
         
         # Create new user (unverified by default)
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         new_user = User(
             email=user_data.email,
             full_name=user_data.full_name,
@@ -292,6 +325,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
         db.add(subscription)
         db.commit()
+        invalidate_principal(user_data.email)
 
         logger.info(f"New user registered (unverified): {user_data.email}")
         
@@ -315,6 +349,12 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         import traceback
         error_traceback = traceback.format_exc()
@@ -330,7 +370,7 @@ async def login(user_data: UserLogin, request: Request, db: Session = Depends(ge
     """Login user and return JWT token"""
     try:
         # Authenticate user
-        user = authenticate_user(db, user_data.email, user_data.password)
+        user = await authenticate_user(db, user_data.email, user_data.password)
 
         if not user:
             # Log failed login (IP + geo + browser/device for security and compliance)
@@ -343,12 +383,13 @@ async def login(user_data: UserLogin, request: Request, db: Session = Depends(ge
                 user_email=user_data.email,  # Tracks the email that attempted login
                 event_type="failed_login",
                 ip_address=client_ip or None,  # Tracks IP of ALL users
-                location=_resolve_geolocation(client_ip) if client_ip else None,
                 browser=browser_info.get("browser"),
                 device=browser_info.get("device")
             )
             db.add(login_history)
             db.commit()
+            # Location is filled in by the background enrichment worker, off the login path
+            get_geo_enricher().enqueue(login_history.id, client_ip)
             logger.info(f"Failed login tracked for ALL users: {user_data.email} from IP {client_ip}")
 
             raise HTTPException(
@@ -384,12 +425,12 @@ async def login(user_data: UserLogin, request: Request, db: Session = Depends(ge
             user_email=user.email,  # Tracks the email of the user who logged in
             event_type="login",
             ip_address=client_ip or None,  # Tracks IP of ALL users who log in
-            location=_resolve_geolocation(client_ip) if client_ip else None,
             browser=browser_info.get("browser"),
             device=browser_info.get("device")
         )
         db.add(login_history)
         db.commit()
+        get_geo_enricher().enqueue(login_history.id, client_ip)
         logger.info(f"Login tracked for ALL users: {user.email} from IP {client_ip} - All signups are tracked in login_history table")
 
         logger.info(f"User logged in: {user.email}")
@@ -428,6 +469,12 @@ async def login(user_data: UserLogin, request: Request, db: Session = Depends(ge
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         raise HTTPException(
@@ -570,7 +617,7 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
         
         # Update password (get_password_hash handles truncation internally, but we validate first)
         try:
-            user.hashed_password = get_password_hash(request.new_password)
+            user.hashed_password = await hash_password(request.new_password)
         except ValueError as e:
             # If bcrypt still complains, provide user-friendly error
             logger.error(f"Bcrypt error during password hash: {str(e)}")
@@ -596,6 +643,7 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
             logger.info(f"Email automatically verified for {user.email} after password reset (proved email ownership)")
             
         db.commit()
+        invalidate_principal(user.email)
         
         logger.info(f"Password reset successful for {user.email}")
         
@@ -605,6 +653,12 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
         
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Password reset error: {str(e)}")
         raise HTTPException(
@@ -1148,10 +1202,33 @@ async def predict_anomalies(
 # AI/LLM ENDPOINTS
 # ============================================================================
 
+def _check_ai_quota(current_user: dict, db: Session) -> Optional[Subscription]:
+    """
+    Check the principal's AI query quota. Premium is unlimited and needs no query; otherwise
+    returns the Subscription row so the caller can count the query once it succeeds.
+    """
+    if current_user["plan"] is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    if current_user["is_premium"]:
+        return None
+
+    subscription = db.query(Subscription).filter(
+        Subscription.user_email == current_user["email"]
+    ).first()
+    if not subscription:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    if subscription.ai_queries_used >= subscription.ai_queries_limit:
+        raise HTTPException(
+            status_code=429,
+            detail=f"AI query limit reached. Upgrade to Premium for unlimited queries."
+        )
+    return subscription
+
+
 @app.post("/api/integrations/llm/invoke")
 async def invoke_llm_endpoint(
     request: LLMRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -1159,21 +1236,8 @@ async def invoke_llm_endpoint(
     ZERO STORAGE: Prompt NOT stored, response NOT stored
     """
     try:
-        # Check subscription and limits
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-
-        if not subscription:
-            raise HTTPException(status_code=404, detail="Subscription not found")
-
         # Check AI query limit (unlimited for premium)
-        if subscription.plan != "premium":
-            if subscription.ai_queries_used >= subscription.ai_queries_limit:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"AI query limit reached. Upgrade to Premium for unlimited queries."
-                )
+        subscription = _check_ai_quota(current_user, db)
 
         # Invoke LLM
         try:
@@ -1190,7 +1254,7 @@ async def invoke_llm_endpoint(
             )
 
         # Update usage (only if not premium)
-        if subscription.plan != "premium":
+        if subscription is not None:
             subscription.ai_queries_used += 1
             db.commit()
 
@@ -1217,17 +1281,13 @@ async def invoke_llm_endpoint(
 @app.post("/api/integrations/image/generate")
 async def generate_image_endpoint(
     request: ImageGenerationRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Generate image using DALL-E"""
     try:
         # Check subscription
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-
-        if subscription.plan != "premium":
+        if not current_user["is_premium"]:
             raise HTTPException(
                 status_code=403,
                 detail="Image generation is a Premium feature"
@@ -1392,70 +1452,115 @@ class OCRExportRequest(BaseModel):
     image_base64: Optional[str] = None  # required when preserve_image=True
 
 
+async def _read_upload(file: UploadFile, max_size_mb: int) -> SpooledUpload:
+    """Spool an upload in chunks, answering 413 as soon as it exceeds max_size_mb. Close the result when done."""
+    try:
+        return await spool_upload(file, max_size_mb * 1024 * 1024)
+    except UploadTooLarge as e:
+        if e.size is not None:
+            detail = f"File size ({e.size / (1024 * 1024):.1f}MB) exceeds {max_size_mb}MB limit"
+        else:
+            detail = f"File size exceeds {max_size_mb}MB limit"
+        raise HTTPException(status_code=413, detail=detail)
+
+
 @app.post("/api/files/ocr-extract")
 async def ocr_extract(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
-    Extract text from an image using OCR (JPG, PNG, WebP, BMP, TIFF, GIF). Generic: any form, invoice, or document.
+    Extract text from an image using OCR (JPG, PNG, WebP, BMP, TIFF, GIF) or from a PDF. Generic: any form, invoice, or document.
+    Multi-page TIFF/GIF and PDFs are processed page by page; PDF pages with a text layer are read without OCR.
     ZERO STORAGE: File content not stored. Returns text, layout, tables for editing; use ocr-export to get DOC/PDF.
+    layout/tables/image size are for the first page; "pages" has them per page.
     """
     ocr_space_error = None
+    upload = None
     try:
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-        max_size_mb = 500 if subscription and subscription.plan == "premium" else 10
-        max_size_bytes = max_size_mb * 1024 * 1024
-
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
-        if len(file_content) > max_size_bytes:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size ({file_size_mb:.1f}MB) exceeds {max_size_mb}MB limit"
-            )
+        max_size_mb = current_user["max_upload_mb"]
 
         ext = (os.path.splitext(file.filename or "")[1] or "").lower()
-        if ext not in OCRService.ALLOWED_IMAGE_EXTENSIONS:
+        if ext not in OCRService.ALLOWED_DOCUMENT_EXTENSIONS:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid file type. Allowed: {', '.join(OCRService.ALLOWED_IMAGE_EXTENSIONS)}"
+                detail=f"Invalid file type. Allowed: {', '.join(sorted(OCRService.ALLOWED_DOCUMENT_EXTENSIONS))}"
             )
 
-        out = None
+        upload = await _read_upload(file, max_size_mb)
+        file_size_mb = upload.size / (1024 * 1024)
+        # The OCR engines take bytes; an in-memory upload is handed over without a copy
+        file_content = upload.read_bytes()
+
         api_key = (os.getenv("OCR_SPACE_API_KEY") or "").strip()
+        use_ocr_space = False
 
         if not api_key:
             logger.info("OCR.space skipped: OCR_SPACE_API_KEY not set. Using Tesseract. Set OCR_SPACE_API_KEY in Railway to use the API.")
         elif len(file_content) > OCR_SPACE_MAX_BYTES:
             logger.info("OCR.space skipped: file > 1MB. Using Tesseract.")
+        elif ext == ".pdf":
+            logger.info("OCR.space skipped: PDF input. Using text layer / Tesseract per page.")
         else:
             try:
                 img = Image.open(io.BytesIO(file_content))
                 iw, ih = img.size
-                out = await extract_with_layout_ocrspace(
-                    api_key, file_content, iw, ih, file.filename or "image.png"
-                )
-                logger.info(f"OCR extract via OCR.space: {file.filename}")
+                if getattr(img, "n_frames", 1) > 1:
+                    logger.info("OCR.space skipped: multi-page image. Using Tesseract per page.")
+                else:
+                    use_ocr_space = True
             except Exception as e:
                 ocr_space_error = f"{type(e).__name__}: {e}"
-                logger.warning("OCR.space failed, falling back to Tesseract: %s", ocr_space_error)
+                logger.warning("OCR.space skipped, using Tesseract: %s", ocr_space_error)
 
-        if out is None:
-            ocr = OCRService()
+        async def _ocr_space():
+            nonlocal ocr_space_error
             try:
-                out = await asyncio.wait_for(
-                    asyncio.to_thread(ocr.extract_with_layout, io.BytesIO(file_content)),
-                    55.0
+                return await extract_with_layout_ocrspace(
+                    api_key, file_content, iw, ih, file.filename or "image.png"
                 )
-            except asyncio.TimeoutError:
-                msg = "OCR is taking too long. Try a smaller or simpler image, or try again later."
-                if ocr_space_error:
-                    msg += f" (OCR.space had failed: {ocr_space_error})"
-                raise HTTPException(status_code=503, detail=msg)
+            except Exception as e:
+                ocr_space_error = f"{type(e).__name__}: {e}"
+                logger.warning("OCR.space failed: %s", ocr_space_error)
+                raise
+
+        async def _tesseract():
+            # Runs on the shared OCR pool (warm engines, bounded queue)
+            return await asyncio.wait_for(
+                get_ocr_pool().run(OCRService().extract_document, file_content, file.filename),
+                55.0
+            )
+
+        # Same bytes and engine settings as a recent run: reuse its derived text/layout
+        doc_hash = upload.sha256
+        result_keys = {LOCAL_ENGINE: tesseract_result_key(doc_hash)}
+        if use_ocr_space:
+            result_keys[REMOTE_ENGINE] = ocrspace_result_key(doc_hash)
+        result_cache = get_ocr_result_cache()
+        out = None
+        for key in result_keys.values():
+            out = result_cache.get(key)
+            if out is not None:
+                logger.info(f"OCR extract from result cache ({key[1]}): {file.filename}")
+                break
+
+        try:
+            if out is None and use_ocr_space:
+                # OCR.space first; Tesseract joins after the hedge delay or when it fails
+                engine, out = await get_hedged_ocr().run(_ocr_space, _tesseract)
+                logger.info(f"OCR extract via {engine}: {file.filename}")
+                result_cache.put(result_keys[engine], out)
+            elif out is None:
+                out = await _tesseract()
+                result_cache.put(result_keys[LOCAL_ENGINE], out)
+        except OCRPoolFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except asyncio.TimeoutError:
+            msg = "OCR is taking too long. Try a smaller or simpler image, or try again later."
+            if ocr_space_error:
+                msg += f" (OCR.space had failed: {ocr_space_error})"
+            raise HTTPException(status_code=503, detail=msg)
 
         processing_history = FileProcessingHistory(
             user_email=current_user["email"],
@@ -1474,9 +1579,14 @@ async def ocr_extract(
             "image_width": out.get("image_width"),
             "image_height": out.get("image_height"),
             "tables": out.get("tables"),
+            "page_count": out.get("page_count", 1),
+            "pages": out.get("pages"),
         }
     except HTTPException:
         raise
+    except ValueError as e:
+        # Unreadable or over-long input (e.g. too many pages)
+        raise HTTPException(status_code=400, detail=str(e))
     except RuntimeError as e:
         if "Tesseract" in str(e) or "not installed" in str(e).lower():
             detail = str(e)
@@ -1499,6 +1609,9 @@ async def ocr_extract(
         db.add(processing_history)
         db.commit()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload is not None:
+            upload.close()
 
 
 @app.post("/api/files/ocr-export")
@@ -1608,8 +1721,6 @@ async def ocr_export(
 # ============================================================================
 # DOCUMENT CONVERTER (in-app, no API key): PDF↔DOC, DOC↔PDF, PPT↔PDF, PDF↔PPT
 # ============================================================================
-_MAX_CONVERT_MB = 25  # max file size for convert endpoints (free); premium uses 100
-
 
 def _ascii_safe_filename(s: str) -> str:
     """Make a string safe for Content-Disposition filename= (HTTP headers must be latin-1)."""
@@ -1634,20 +1745,15 @@ async def _convert_endpoint(
     processing_type: str,
 ):
     """Shared logic for /api/convert/* endpoints. Returns (data_bytes, out_filename) or raises HTTPException."""
-    subscription = db.query(Subscription).filter(Subscription.user_email == current_user["email"]).first()
-    max_mb = 100 if (subscription and subscription.plan == "premium") else _MAX_CONVERT_MB
-    max_bytes = max_mb * 1024 * 1024
-
-    raw = await file.read()
-    size_mb = len(raw) / (1024 * 1024)
-    if len(raw) > max_bytes:
-        raise HTTPException(status_code=413, detail=f"File size ({size_mb:.1f}MB) exceeds {max_mb}MB limit")
+    max_mb = current_user["max_convert_mb"]
 
     ext = (os.path.splitext(file.filename or "")[1] or "").lower()
     if ext not in in_ext:
         raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(in_ext)}")
 
-    data, err = converter_fn(raw)
+    with await _read_upload(file, max_mb) as upload:
+        size_mb = upload.size / (1024 * 1024)
+        data, err = converter_fn(upload.source())
     if err:
         raise HTTPException(status_code=400, detail=err)
 
@@ -1670,7 +1776,7 @@ async def _convert_endpoint(
 @app.post("/api/convert/pdf-to-doc")
 async def convert_pdf_to_doc(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """Convert PDF to DOCX. In-app, no API key. File not stored."""
@@ -1692,7 +1798,7 @@ async def convert_pdf_to_doc(
 @app.post("/api/convert/doc-to-pdf")
 async def convert_doc_to_pdf(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """Convert DOCX to PDF. In-app, no API key. File not stored."""
@@ -1714,7 +1820,7 @@ async def convert_doc_to_pdf(
 @app.post("/api/convert/ppt-to-pdf")
 async def convert_ppt_to_pdf(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """Convert PPTX to PDF. In-app, no API key. File not stored."""
@@ -1736,16 +1842,20 @@ async def convert_ppt_to_pdf(
 @app.post("/api/convert/pdf-to-ppt")
 async def convert_pdf_to_ppt(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    dpi: Optional[int] = None,
+    image_format: Optional[str] = None,  # png, jpeg (smaller for photos/scans) or auto
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     """Convert PDF to PPTX (one slide per page as image). In-app, no API key. File not stored."""
+    if dpi is not None and not 36 <= dpi <= 300:
+        raise HTTPException(status_code=400, detail="dpi must be between 36 and 300")
     data, out_name, media = await _convert_endpoint(
         file, current_user, db,
         in_ext=[".pdf"],
         out_ext=".pptx",
         media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        converter_fn=pdf_to_pptx,
+        converter_fn=lambda raw: pdf_to_pptx(raw, dpi=dpi, image_format=image_format),
         processing_type="pdf_to_ppt",
     )
     return StreamingResponse(
@@ -1758,42 +1868,35 @@ async def convert_pdf_to_ppt(
 @app.post("/api/files/excel-to-ppt")
 async def excel_to_ppt(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    chart_aggregation: str = "mean",  # mean, sum or count per category
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Convert Excel file to PowerPoint
     ZERO STORAGE: File content NOT stored, only processing history
     """
+    if chart_aggregation not in CHART_AGGREGATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chart_aggregation must be one of: {', '.join(CHART_AGGREGATIONS)}"
+        )
+    upload = None
     try:
         # Check file size based on subscription
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-
-        max_size_mb = 500 if subscription and subscription.plan == "premium" else 10
-        max_size_bytes = max_size_mb * 1024 * 1024
-
-        # Read file size
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
-
-        if len(file_content) > max_size_bytes:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size ({file_size_mb:.1f}MB) exceeds {max_size_mb}MB limit"
-            )
+        max_size_mb = current_user["max_upload_mb"]
 
         # Validate file type
         if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
             raise HTTPException(status_code=400, detail="Invalid file type")
 
+        # Read file in chunks, enforcing the size limit as it arrives
+        upload = await _read_upload(file, max_size_mb)
+        file_size_mb = upload.size / (1024 * 1024)
+
         # Convert to PPT
-        ppt_service = ExcelToPPTService()
-        ppt_data = await ppt_service.convert_excel_to_ppt(
-            io.BytesIO(file_content),
-            file.filename
-        )
+        ppt_service = ExcelToPPTService(chart_aggregation=chart_aggregation)
+        ppt_data = await ppt_service.convert_excel_to_ppt(upload.source(), file.filename)
 
         # Log processing history (NO file content)
         processing_history = FileProcessingHistory(
@@ -1836,47 +1939,37 @@ async def excel_to_ppt(
         db.commit()
 
         raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
 
 
 @app.post("/api/files/analyze")
 async def analyze_file(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Analyze Excel/CSV file and provide AI-powered insights
     ZERO STORAGE: File content NOT stored, only analysis results
     """
+    upload = None
     try:
         # Check file size based on subscription
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-
-        max_size_mb = 500 if subscription and subscription.plan == "premium" else 10
-        max_size_bytes = max_size_mb * 1024 * 1024
-
-        # Read file content
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
-
-        if len(file_content) > max_size_bytes:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size ({file_size_mb:.1f}MB) exceeds {max_size_mb}MB limit"
-            )
+        max_size_mb = current_user["max_upload_mb"]
 
         # Validate file type
         if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
             raise HTTPException(status_code=400, detail="Invalid file type. Only .xlsx, .xls, and .csv files are supported.")
 
+        # Read file content in chunks, enforcing the size limit as it arrives
+        upload = await _read_upload(file, max_size_mb)
+        file_size_mb = upload.size / (1024 * 1024)
+
         # Analyze file
         analyzer = FileAnalyzerService()
-        analysis_result = await analyzer.analyze_excel_file(
-            io.BytesIO(file_content),
-            file.filename
-        )
+        analysis_result = await analyzer.analyze_excel_file(upload.source(), file.filename)
 
         # Log processing history (NO file content)
         processing_history = FileProcessingHistory(
@@ -1898,12 +1991,15 @@ async def analyze_file(
     except Exception as e:
         logger.error(f"File analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
 
 
 @app.post("/api/files/generate-pl")
 async def generate_pl(
     request: Request,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -1918,21 +2014,8 @@ async def generate_pl(
         if not prompt:
             raise HTTPException(status_code=400, detail="Prompt is required")
 
-        # Check subscription and limits
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-
-        if not subscription:
-            raise HTTPException(status_code=404, detail="Subscription not found")
-
         # Check AI query limit (unlimited for premium)
-        if subscription.plan != "premium":
-            if subscription.ai_queries_used >= subscription.ai_queries_limit:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"AI query limit reached. Upgrade to Premium for unlimited queries."
-                )
+        subscription = _check_ai_quota(current_user, db)
 
         # Generate P&L
         pl_service = PLBuilderService()
@@ -1942,7 +2025,7 @@ async def generate_pl(
         )
 
         # Update usage (only if not premium)
-        if subscription.plan != "premium":
+        if subscription is not None:
             subscription.ai_queries_used += 1
             db.commit()
 
@@ -1976,37 +2059,27 @@ async def generate_pl(
 async def process_zip(
     file: UploadFile = File(...),
     options: str = None,  # JSON string of options
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Process ZIP file with filename cleaning
     ZERO STORAGE: File content NOT stored
     """
+    upload = None
     try:
         import json
 
         # Check file size
-        subscription = db.query(Subscription).filter(
-            Subscription.user_email == current_user["email"]
-        ).first()
-
-        max_size_mb = 500 if subscription and subscription.plan == "premium" else 10
-        max_size_bytes = max_size_mb * 1024 * 1024
-
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
-
-        if len(file_content) > max_size_bytes:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size ({file_size_mb:.1f}MB) exceeds {max_size_mb}MB limit"
-            )
+        max_size_mb = current_user["max_upload_mb"]
 
         # Validate file type
         if not file.filename.endswith('.zip'):
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload a ZIP file.")
 
+        upload = await _read_upload(file, max_size_mb)
+        file_size_mb = upload.size / (1024 * 1024)
+
         # Parse options
         processing_options = json.loads(options) if options else {}
 
@@ -2019,7 +2092,7 @@ async def process_zip(
         processing_options['language_replacements'] = language_replacements
 
         # Process ZIP
-        processed_data = await zip_service.process_zip(io.BytesIO(file_content), processing_options)
+        processed_data = await zip_service.process_zip(upload.source(), processing_options)
 
         # Log processing history
         processing_history = FileProcessingHistory(
@@ -2055,6 +2128,383 @@ async def process_zip(
     except Exception as e:
         logger.error(f"ZIP processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+_ZIP_BATCH_MAX_ARCHIVES = 50
+
+
+@app.post("/api/files/process-zip-batch")
+async def process_zip_batch(
+    files: List[UploadFile] = File(...),
+    options: str = None,  # JSON string of options, applied to every archive
+    current_user: dict = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Clean several ZIP files in one call (multiple uploads, or one outer ZIP of ZIPs).
+    Archives are processed concurrently; the response is one ZIP holding each cleaned
+    archive plus batch_report.json. Size limit applies to the whole batch.
+    ZERO STORAGE: File content NOT stored
+    """
+    import json
+    import shutil
+    import tempfile
+
+    max_size_mb = current_user["max_upload_mb"]
+
+    for upload in files:
+        if not (upload.filename or "").lower().endswith('.zip'):
+            raise HTTPException(status_code=400, detail=f"Invalid file type: {upload.filename}. Please upload ZIP files.")
+
+    try:
+        processing_options = json.loads(options) if options else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid options JSON")
+
+    spooled: List[SpooledUpload] = []
+    temp_dir = tempfile.mkdtemp(prefix='zipbatch_out_')
+    output_path = os.path.join(temp_dir, "batch.zip")
+    try:
+        # Each part is spooled against what is left of the batch limit, so an oversized batch
+        # is rejected while reading instead of after holding it all in memory
+        remaining = max_size_mb * 1024 * 1024
+        for upload in files:
+            try:
+                part = await spool_upload(upload, remaining)
+            except UploadTooLarge:
+                raise HTTPException(status_code=413, detail=f"Batch size exceeds {max_size_mb}MB limit")
+            spooled.append(part)
+            remaining -= part.size
+        archives = [(part.filename, part.source()) for part in spooled]
+
+        zip_service = ZipProcessorService()
+        try:
+            # A single upload that only wraps other ZIPs is treated as the batch itself
+            if len(archives) == 1:
+                nested = await asyncio.get_running_loop().run_in_executor(
+                    None, zip_service.extract_nested_archives, archives[0][1], temp_dir
+                )
+                if nested:
+                    archives = nested
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if len(archives) > _ZIP_BATCH_MAX_ARCHIVES:
+            raise HTTPException(status_code=400, detail=f"Too many archives (max {_ZIP_BATCH_MAX_ARCHIVES} per batch)")
+
+        processing_options['language_replacements'] = zip_service.get_language_replacements(
+            processing_options.get('languages', [])
+        )
+
+        try:
+            results = await zip_service.process_zip_batch(archives, processing_options, output_path)
+        except Exception as e:
+            logger.error(f"ZIP batch processing error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    finally:
+        for part in spooled:
+            part.close()
+
+    # One bulk history insert for the whole batch (NO file content)
+    db.bulk_save_objects([
+        FileProcessingHistory(
+            user_email=current_user["email"],
+            processing_type="zip_cleaning",
+            original_filename=r['filename'],
+            file_size_mb=r['size_bytes'] / (1024 * 1024),
+            status=r['status'],
+            error_message=r['error']
+        )
+        for r in results
+    ])
+    db.commit()
+
+    failed = sum(1 for r in results if r['status'] != 'success')
+    logger.info(f"ZIP batch processing: {len(results)} archives ({failed} failed) by {current_user['email']}")
+
+    def stream_and_cleanup():
+        try:
+            with open(output_path, 'rb') as f:
+                while True:
+                    chunk = f.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    return StreamingResponse(
+        stream_and_cleanup(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=cleaned_batch_{timestamp}.zip",
+            "Content-Length": str(os.path.getsize(output_path)),
+            "X-Batch-Archives": str(len(results)),
+            "X-Batch-Failed": str(failed),
+        }
+    )
+
+
+# ============================================================================
+# BACKGROUND JOBS: submit, poll / SSE, download the result once
+# ============================================================================
+# kind -> accepted extensions, principal's size limit (same as the synchronous endpoint), processing_type for history
+_JOB_KINDS = {
+    "pdf-to-doc": ((".pdf",), "max_convert_mb", "pdf_to_doc"),
+    "excel-to-ppt": ((".xlsx", ".xls", ".csv"), "max_upload_mb", "excel_to_ppt"),
+    "ocr-extract": (tuple(sorted(OCRService.ALLOWED_DOCUMENT_EXTENSIONS)), "max_upload_mb", "ocr_extract"),
+    "process-zip": ((".zip",), "max_upload_mb", "zip_cleaning"),
+}
+# Seconds between SSE keep-alive comments while a job is unchanged
+_JOB_EVENTS_KEEPALIVE = 15
+
+
+def _job_basename(filename: str, *suffixes: str) -> str:
+    base = filename or "file"
+    for suffix in suffixes:
+        if base.lower().endswith(suffix):
+            base = base[: -len(suffix)]
+            break
+    return _ascii_safe_filename(base.rstrip(".") or "file")
+
+
+async def _pdf_to_doc_job(job: Job, path: str) -> JobOutput:
+    job.update(0.05, "Converting PDF to Word")
+    out, err = await asyncio.get_running_loop().run_in_executor(None, pdf_to_docx, path)
+    if err:
+        raise ValueError(err)
+    return JobOutput(
+        out,
+        f"{_job_basename(job.filename, '.pdf')}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.docx",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    )
+
+
+async def _excel_to_ppt_job(job: Job, path: str) -> JobOutput:
+    job.update(0.05, "Building slides")
+    ppt_service = ExcelToPPTService(chart_aggregation=job.options.get("chart_aggregation", "mean"))
+    ppt_data = await ppt_service.convert_excel_to_ppt(path, job.filename)
+    return JobOutput(
+        ppt_data,
+        f"{_job_basename(job.filename, '.xlsx', '.xls', '.csv')}_presentation.pptx",
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    )
+
+
+async def _ocr_extract_job(job: Job, path: str) -> JobOutput:
+    # Local Tesseract only (jobs are for files too large or slow for OCR.space); no 55s limit here
+    loop = asyncio.get_running_loop()
+    key = tesseract_result_key(await loop.run_in_executor(None, document_hash, path))
+    result_cache = get_ocr_result_cache()
+    out = result_cache.get(key)
+    if out is None:
+        job.update(0.05, "Running OCR")
+        data = await loop.run_in_executor(None, read_source, path)
+        out = await get_ocr_pool().run(OCRService().extract_document, data, job.filename)
+        result_cache.put(key, out)
+    body = {
+        "text": out["text"],
+        "layout": out.get("layout"),
+        "image_width": out.get("image_width"),
+        "image_height": out.get("image_height"),
+        "tables": out.get("tables"),
+        "page_count": out.get("page_count", 1),
+        "pages": out.get("pages"),
+    }
+    return JobOutput(
+        json.dumps(body).encode("utf-8"),
+        f"{_job_basename(os.path.splitext(job.filename or 'file')[0])}_ocr.json",
+        "application/json",
+    )
+
+
+async def _process_zip_job(job: Job, path: str) -> JobOutput:
+    job.update(0.05, "Cleaning archive")
+    zip_service = ZipProcessorService()
+    processing_options = dict(job.options)
+    processing_options["language_replacements"] = zip_service.get_language_replacements(
+        processing_options.get("languages", [])
+    )
+    processed_data = await zip_service.process_zip(path, processing_options)
+    original_name = _job_basename(job.filename, ".zip").replace(" ", "_")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    return JobOutput(processed_data, f"{original_name}_{timestamp}.zip", "application/zip")
+
+
+def _record_job_history(job: Job) -> None:
+    """Processing history for a finished job (NO file content), like the synchronous endpoints."""
+    db = SessionLocal()
+    try:
+        db.add(FileProcessingHistory(
+            user_email=job.owner,
+            processing_type=_JOB_KINDS[job.kind][2],
+            original_filename=job.filename,
+            file_size_mb=job.size / (1024 * 1024),
+            status="success" if job.status == SUCCEEDED else "failed",
+            error_message=job.error,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+_job_manager = get_job_manager()
+_job_manager.register("pdf-to-doc", _pdf_to_doc_job)
+_job_manager.register("excel-to-ppt", _excel_to_ppt_job)
+_job_manager.register("ocr-extract", _ocr_extract_job)
+_job_manager.register("process-zip", _process_zip_job)
+_job_manager.on_finished = _record_job_history
+
+
+def _job_response(job: Job) -> dict:
+    return {
+        **job.snapshot(),
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+        "result_url": f"/api/jobs/{job.id}/result",
+    }
+
+
+def _get_own_job(job_id: str, current_user: dict) -> Job:
+    job = get_job_manager().get(job_id, owner=current_user["email"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@app.post("/api/jobs/{kind}", status_code=202)
+async def submit_job(
+    kind: str,
+    file: UploadFile = File(...),
+    options: str = None,  # JSON string: {"chart_aggregation": ...} for excel-to-ppt, ZIP options for process-zip
+    current_user: dict = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a long-running conversion (pdf-to-doc, excel-to-ppt, ocr-extract, process-zip) and return
+    its job id at once. Poll status_url or follow events_url (SSE), then download result_url once.
+    ZERO STORAGE: the upload and result are temp files, deleted once processed / downloaded.
+    """
+    spec = _JOB_KINDS.get(kind)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job type. Available: {', '.join(_JOB_KINDS)}")
+    extensions, size_limit, _ = spec
+
+    try:
+        job_options = json.loads(options) if options else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="options must be a JSON object")
+    if not isinstance(job_options, dict):
+        raise HTTPException(status_code=400, detail="options must be a JSON object")
+    if kind == "excel-to-ppt" and job_options.get("chart_aggregation", "mean") not in CHART_AGGREGATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chart_aggregation must be one of: {', '.join(CHART_AGGREGATIONS)}"
+        )
+
+    max_size_mb = current_user[size_limit]
+
+    ext = (os.path.splitext(file.filename or "")[1] or "").lower()
+    if ext not in extensions:
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(extensions)}")
+
+    # The spooled upload is moved into the job spool, not copied
+    with await _read_upload(file, max_size_mb) as upload:
+        try:
+            job = await get_job_manager().submit(
+                kind, current_user["email"], file.filename, upload, job_options
+            )
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    return _job_response(job)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Job status and progress"""
+    return _job_response(_get_own_job(job_id, current_user))
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Server-sent events: a "status" event on every change until the job finishes"""
+    job = _get_own_job(job_id, current_user)
+
+    async def _events():
+        version = job.version
+        yield f"event: status\ndata: {json.dumps(_job_response(job))}\n\n"
+        while job.status not in TERMINAL_STATES:
+            new_version = await job.wait_changed(version, _JOB_EVENTS_KEEPALIVE)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            yield f"event: status\ndata: {json.dumps(_job_response(job))}\n\n"
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Download the result once; it is deleted as soon as it has been sent (410 on a repeat download)"""
+    job = _get_own_job(job_id, current_user)
+    if job.status in (QUEUED, RUNNING):
+        raise HTTPException(status_code=409, detail="Job has not finished yet")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=job.error or f"Job {job.status}")
+    try:
+        chunks = get_job_manager().open_result(job)
+    except LookupError:
+        raise HTTPException(status_code=410, detail="Result was already downloaded")
+    return StreamingResponse(
+        chunks,
+        media_type=job.result_media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={job.result_filename}",
+            "Content-Length": str(job.result_size),
+        }
+    )
+
+
+@app.delete("/api/jobs/{job_id}")
+async def delete_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Cancel a queued job, or discard a finished job and its result"""
+    job = _get_own_job(job_id, current_user)
+    if job.status == RUNNING:
+        raise HTTPException(status_code=409, detail="Job is running and cannot be cancelled")
+    get_job_manager().cancel(job)
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/api/admin/jobs")
+async def get_admin_jobs(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Job queue depth and job counts by status (admin only)"""
+    return get_job_manager().stats()
 
 
 # ============================================================================
@@ -2083,6 +2533,7 @@ async def get_my_subscription(
         db.add(subscription)
         db.commit()
         db.refresh(subscription)
+        invalidate_principal(current_user["email"])
 
     return {
         "id": subscription.id,
@@ -2113,6 +2564,7 @@ async def upgrade_subscription(
         subscription.payment_status = "paid"
         subscription.subscription_start_date = datetime.utcnow()
         db.commit()
+        invalidate_principal(current_user["email"])
 
     return {"message": "Subscription upgraded to Premium"}
 
@@ -2187,18 +2639,19 @@ async def create_login_history(
     """Create login history entry. IP and location are always set server-side for security and compliance."""
     try:
         client_ip = _get_client_ip(request)
-        loc = _resolve_geolocation(client_ip) if client_ip else login_data.get("location")
         login_history = LoginHistory(
             user_email=login_data.get("user_email", current_user["email"]),
             event_type=login_data.get("event_type", "login"),
             ip_address=client_ip or None,
-            location=loc,
+            # With a client IP, the enrichment worker sets the location server-side
+            location=None if client_ip else login_data.get("location"),
             browser=login_data.get("browser"),
             device=login_data.get("device"),
             session_duration=login_data.get("session_duration")
         )
         db.add(login_history)
         db.commit()
+        get_geo_enricher().enqueue(login_history.id, client_ip)
         
         return {"message": "Login history created", "id": login_history.id}
     except Exception as e:
@@ -2422,6 +2875,38 @@ async def get_all_subscriptions(
     ]
 
 
+@app.get("/api/admin/ocr-pool")
+async def get_admin_ocr_pool(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """OCR worker pool size, queue depth, per-job queue-wait / run-time metrics and result cache stats (admin only)"""
+    return {**get_ocr_pool().stats(), "result_cache": get_ocr_result_cache().stats()}
+
+
+@app.get("/api/admin/auth-pool")
+async def get_admin_auth_pool(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """bcrypt pool load, rejections and wait / run latency, plus principal cache stats (admin only)"""
+    return {**get_password_hasher().stats(), "principal_cache": get_principal_cache().stats()}
+
+
+@app.get("/api/admin/geo-enrichment")
+async def get_admin_geo_enrichment(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Login geolocation enrichment queue, cache hits, provider requests and throttling (admin only)"""
+    return get_geo_enricher().stats()
+
+
+@app.get("/api/admin/ocr-hedge")
+async def get_admin_ocr_hedge(
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """OCR.space vs Tesseract race counts, win rates and winning latencies (admin only)"""
+    return get_hedged_ocr().stats()
+
+
 @app.get("/api/admin/ip-tracking")
 async def get_admin_ip_tracking(
     current_user: dict = Depends(get_current_admin_user),
@@ -2530,15 +3015,9 @@ async def get_subscription_ip_summary(
 
 
 # ============================================================================
-# IP LOOKUP (proxy for ipapi.co / ip-api.com to avoid CORS; 429 fallback + cache)
+# IP LOOKUP (proxy for ipapi.co / ip-api.com to avoid CORS; 429 fallback + cache shared with geo enrichment)
 # ============================================================================
 
-_IP_LOOKUP_CACHE: dict = {}
-_IP_LOOKUP_CACHE_LOCK = threading.Lock()
-_IP_LOOKUP_TTL = 3600  # 1 hour
-_IP_LOOKUP_CACHE_MAX = 5000
-
-
 def _get_client_ip(request: Request) -> str:
     """Resolve client IP from X-Forwarded-For, X-Real-IP, or request.client. Required for security and compliance."""
     forwarded = request.headers.get("x-forwarded-for")
@@ -2594,69 +3073,6 @@ def _parse_user_agent(user_agent: str) -> Dict[str, Optional[str]]:
     return {"browser": browser, "device": device}
 
 
-def _resolve_geolocation(ip: str) -> Optional[str]:
-    """Resolve IP to 'City, Country' for security and compliance. Returns None on failure or for private IPs."""
-    if not ip or _is_private_ip(ip):
-        return None
-    try:
-        import requests
-        url = f"https://ipapi.co/{ip}/json/"
-        r = requests.get(url, timeout=2)
-        if r.ok:
-            j = r.json()
-            city = j.get("city") or ""
-            country = j.get("country_name") or j.get("country_code") or ""
-            if city or country:
-                return f"{city}, {country}".strip(", ")
-        if r.status_code == 429:
-            r2 = requests.get(f"http://ip-api.com/json/{ip}", timeout=2)
-            if r2.ok and r2.json().get("status") == "success":
-                j = r2.json()
-                return f"{j.get('city') or ''}, {j.get('country') or ''}".strip(", ")
-    except Exception:
-        pass
-    return None
-
-
-def _is_private_ip(ip: str) -> bool:
-    if not ip or ip in ("127.0.0.1", "::1"):
-        return True
-    parts = ip.split(".")
-    if len(parts) == 4:
-        try:
-            a, b, c, d = (int(x) & 0xFF for x in parts)
-            if a == 10:
-                return True
-            if a == 172 and 16 <= b <= 31:
-                return True
-            if a == 192 and b == 168:
-                return True
-        except ValueError:
-            pass
-    return False
-
-
-def _ip_cache_get(key: str):
-    with _IP_LOOKUP_CACHE_LOCK:
-        ent = _IP_LOOKUP_CACHE.get(key)
-        if ent is None:
-            return None
-        if time.time() - ent[1] > _IP_LOOKUP_TTL:
-            del _IP_LOOKUP_CACHE[key]
-            return None
-        return ent[0]
-
-
-def _ip_cache_set(key: str, obj: dict):
-    with _IP_LOOKUP_CACHE_LOCK:
-        _IP_LOOKUP_CACHE[key] = (obj, time.time())
-        if len(_IP_LOOKUP_CACHE) > _IP_LOOKUP_CACHE_MAX:
-            now = time.time()
-            expired = [k for k, v in _IP_LOOKUP_CACHE.items() if now - v[1] > _IP_LOOKUP_TTL]
-            for k in expired[:500]:
-                del _IP_LOOKUP_CACHE[k]
-
-
 @app.get("/api/ip-lookup")
 async def ip_lookup(request: Request):
     """Proxy to ipapi.co (or ip-api.com on 429) for IP/location. Uses client IP; 1h cache to reduce 429."""
@@ -2665,37 +3081,37 @@ async def ip_lookup(request: Request):
     client_ip = _get_client_ip(request)
     cache_key = client_ip or "no_ip"
 
-    cached = _ip_cache_get(cache_key)
+    cached = ip_cache_get(cache_key)
     if cached is not None:
         return cached
 
     # Prefer ipapi.co with client IP so we get user's location; avoid lookup for private IPs
-    url = f"https://ipapi.co/{client_ip}/json/" if (client_ip and not _is_private_ip(client_ip)) else "https://ipapi.co/json/"
+    url = f"https://ipapi.co/{client_ip}/json/" if (client_ip and not is_private_ip(client_ip)) else "https://ipapi.co/json/"
     try:
         r = requests.get(url, timeout=5)
         if r.status_code == 429:
             # Rate limited: try ip-api.com (only for a valid public client IP)
-            if client_ip and not _is_private_ip(client_ip):
+            if client_ip and not is_private_ip(client_ip):
                 try:
                     r2 = requests.get(f"http://ip-api.com/json/{client_ip}", timeout=5)
                     if r2.ok:
                         j = r2.json()
                         if j.get("status") == "success":
                             out = {"ip": j.get("query"), "city": j.get("city"), "country_name": j.get("country"), "country_code": (j.get("countryCode") or "XX")}
-                            _ip_cache_set(cache_key, out)
+                            ip_cache_set(cache_key, out)
                             return out
                 except Exception:
                     pass
             logger.info("ip-lookup: ipapi.co 429 (rate limit); returning fallback")
-            _ip_cache_set(cache_key, fallback)
+            ip_cache_set(cache_key, fallback)
             return fallback
         r.raise_for_status()
         j = r.json()
-        _ip_cache_set(cache_key, j)
+        ip_cache_set(cache_key, j)
         return j
     except Exception as e:
         logger.warning(f"ip-lookup proxy failed: {e}")
-        _ip_cache_set(cache_key, fallback)
+        ip_cache_set(cache_key, fallback)
         return fallback
 
 
@@ -3,10 +3,41 @@ Document Converter Service — in-app PDF, DOC, PPT conversions (no external API
 """
 import io
 import logging
-from typing import Tuple
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
+
+from app.services.document_source import DocumentSource, open_source, source_path
+from app.services.page_raster_cache import (
+    PageRaster,
+    document_hash,
+    get_page_raster_cache,
+    render_pdf_page,
+)
 
 logger = logging.getLogger(__name__)
 
+# Worker processes shared by all page-parallel PDF conversions (PDF_TO_DOCX_WORKERS, its
+# earlier name, is still read as a fallback)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS") or os.getenv("PDF_TO_DOCX_WORKERS") or str(min(4, os.cpu_count() or 1)))
+
+# PDF -> DOCX: page count from which a conversion is split across PDF_WORKERS
+PDF_TO_DOCX_PARALLEL_MIN_PAGES = int(os.getenv("PDF_TO_DOCX_PARALLEL_MIN_PAGES", "20"))
+_PDF_TO_DOCX_MIN_PAGES_PER_WORKER = 5
+
+# PDF -> PPTX: page raster settings ("png", "jpeg", or "auto" = JPEG for photo-heavy pages)
+PDF_TO_PPTX_DPI = int(os.getenv("PDF_TO_PPTX_DPI", "150"))
+PDF_TO_PPTX_FORMAT = os.getenv("PDF_TO_PPTX_FORMAT", "png").lower()
+PDF_TO_PPTX_JPEG_QUALITY = int(os.getenv("PDF_TO_PPTX_JPEG_QUALITY", "85"))
+PDF_TO_PPTX_PARALLEL_MIN_PAGES = int(os.getenv("PDF_TO_PPTX_PARALLEL_MIN_PAGES", "8"))
+_PDF_TO_PPTX_PAGES_PER_TASK = 4
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
 # Optional imports
 try:
     from pdf2docx import Converter
@@ -27,28 +58,97 @@ except ImportError:
     PPTX_AVAILABLE = False
 
 try:
+    from reportlab.lib import colors
     from reportlab.lib.pagesizes import letter
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
     from reportlab.lib.units import inch
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
+# DOCX -> PDF: long tables are emitted as consecutive Table flowables of this many rows,
+# because ReportLab re-measures every remaining row each time a table splits across pages
+_DOCX_TABLE_ROWS_PER_FLOWABLE = 100
+_docx_pdf_styles = None
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Process pool for page-parallel conversions. Spawned (not forked) so workers never inherit server threads."""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=max(1, PDF_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pdf_pool
+
+
+def _reset_pdf_pool() -> None:
+    """Drop a broken pool so the next parallel conversion starts fresh workers."""
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
 
-def pdf_to_docx(pdf_bytes: bytes) -> Tuple[bytes, str]:
-    """Convert PDF to .docx. Returns (docx_bytes, error). error is '' on success."""
+
+def _convert_pages_parallel(cv, pdf_path: str, work_dir: str, page_count: int, workers: int, docx_buf) -> None:
+    """
+    Parse page ranges in worker processes, then build the DOCX once in this process.
+    Same split as pdf2docx's own multi_processing mode, but with per-call JSON files in
+    work_dir (pdf2docx writes pages-N.json into the CWD, which collides across requests)
+    and on the shared, bounded pool.
+    """
+    segments = max(1, min(workers, page_count // _PDF_TO_DOCX_MIN_PAGES_PER_WORKER))
+    settings = cv.default_settings
+    vectors = [
+        (i, segments, 0, page_count, pdf_path, cv.password, settings, os.path.join(work_dir, f"pages-{i}.json"))
+        for i in range(segments)
+    ]
+    pool = _get_pdf_pool()
+    list(pool.map(Converter._parse_pages_per_cpu, vectors))
+    for vector in vectors:
+        json_path = vector[-1]
+        if os.path.exists(json_path):
+            cv.deserialize(json_path)
+    cv.make_docx(docx_buf, **settings)
+
+
+def pdf_to_docx(
+    pdf: DocumentSource,
+    workers: Optional[int] = None,
+    parallel_min_pages: Optional[int] = None,
+) -> Tuple[bytes, str]:
+    """
+    Convert PDF (bytes, mmap or file path) to .docx. Returns (docx_bytes, error). error is '' on success.
+    A path is parsed in place; bytes / mmap are written to the work dir once for pdf2docx.
+    PDFs with at least parallel_min_pages pages are parsed page-parallel on up to
+    `workers` processes (defaults: PDF_TO_DOCX_PARALLEL_MIN_PAGES / PDF_WORKERS).
+    """
     if not PDF2DOCX_AVAILABLE:
         return b'', "PDF to DOC requires pdf2docx. Install: pip install pdf2docx"
+    workers = PDF_WORKERS if workers is None else workers
+    parallel_min_pages = PDF_TO_DOCX_PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
     try:
         docx_buf = io.BytesIO()
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=True) as tmp_pdf:
-            tmp_pdf.write(pdf_bytes)
-            tmp_pdf.flush()
-            cv = Converter(tmp_pdf.name)
+        with tempfile.TemporaryDirectory(prefix="pdf2docx_") as work_dir:
+            pdf_path = source_path(pdf, os.path.join(work_dir, "input.pdf"))
+            cv = Converter(pdf_path)
             try:
-                cv.convert(docx_buf, start=0, end=None)
+                page_count = len(cv.fitz_doc)
+                converted = False
+                if workers > 1 and page_count >= max(parallel_min_pages, 2):
+                    try:
+                        _convert_pages_parallel(cv, pdf_path, work_dir, page_count, workers, docx_buf)
+                        converted = True
+                    except BrokenProcessPool:
+                        logger.warning("pdf_to_docx worker pool broke; converting %d pages serially", page_count)
+                        _reset_pdf_pool()
+                        cv.close()
+                        cv = Converter(pdf_path)
+                        docx_buf = io.BytesIO()
+                if not converted:
+                    cv.convert(docx_buf, start=0, end=None)
             finally:
                 cv.close()
         docx_buf.seek(0)
@@ -66,39 +166,145 @@ def _sanitize_for_reportlab(s: str) -> str:
     return t
 
 
-def docx_to_pdf(docx_bytes: bytes) -> Tuple[bytes, str]:
-    """Convert .docx to PDF. Returns (pdf_bytes, error)."""
+def _get_docx_pdf_styles() -> dict:
+    """ReportLab styles for docx_to_pdf, built once per process and shared by every conversion."""
+    global _docx_pdf_styles
+    if _docx_pdf_styles is None:
+        sheet = getSampleStyleSheet()
+        normal = sheet['Normal']
+        _docx_pdf_styles = {
+            'normal': normal,
+            'title': sheet['Title'],
+            'heading1': sheet['Heading1'],
+            'heading2': sheet['Heading2'],
+            'heading3': sheet['Heading3'],
+            'cell': ParagraphStyle('DocxCell', parent=normal, fontSize=8, leading=10),
+            'table': TableStyle([
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('FONTNAME', (0, 0), (-1, -1), normal.fontName),
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('LEADING', (0, 0), (-1, -1), 10),
+                ('LEFTPADDING', (0, 0), (-1, -1), 3),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+                ('TOPPADDING', (0, 0), (-1, -1), 2),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ]),
+        }
+    return _docx_pdf_styles
+
+
+def _docx_paragraph_style(style_name: str, styles: dict):
+    name = (style_name or '').lower()
+    if name == 'title':
+        return styles['title']
+    if name.startswith('heading'):
+        level = name[len('heading'):].strip()
+        return styles.get(f'heading{level}', styles['heading3'])
+    return styles['normal']
+
+
+def _safe_paragraph(text: str, style, fallback: str):
+    try:
+        return Paragraph(_sanitize_for_reportlab(text), style)
+    except Exception:
+        return Paragraph(fallback, style)
+
+
+def _docx_table_flowables(tbl, body_width: float, styles: dict) -> list:
+    """
+    Turn one w:tbl element into Table flowables. Rows are read straight from the XML (python-docx's
+    row.cells rebuilds the cell grid on every call). Short cell text stays a plain string; only text
+    that needs wrapping becomes a Paragraph. Horizontal merges (gridSpan) become SPAN commands.
+    """
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph as DocxParagraph
+
+    grid_span = qn('w:gridSpan')
+    rows = []
+    spans = []
+    for r, tr in enumerate(tbl.tr_lst):
+        row = []
+        for tc in tr.tc_lst:
+            text = '\n'.join(DocxParagraph(p, None).text for p in tc.p_lst).strip()
+            span = 1
+            tc_pr = tc.tcPr
+            if tc_pr is not None:
+                gs = tc_pr.find(grid_span)
+                if gs is not None:
+                    span = max(1, int(gs.get(qn('w:val'), '1')))
+            if span > 1:
+                spans.append((len(row), r, len(row) + span - 1))
+            row.append(text)
+            row.extend([''] * (span - 1))
+        rows.append(row)
+    if not rows:
+        return []
+
+    n_cols = max(len(row) for row in rows) or 1
+    col_width = body_width / n_cols
+    # Rough characters per line for an 8pt font; longer text is wrapped with a Paragraph
+    max_plain_chars = max(4, int(col_width / 4.5))
+    cell_style = styles['cell']
+    data = []
+    for row in rows:
+        cells = []
+        for text in row:
+            if len(text) > max_plain_chars or '\n' in text:
+                cells.append(_safe_paragraph(text, cell_style, '(cell)'))
+            else:
+                cells.append(text.replace('\x00', ''))
+        cells.extend([''] * (n_cols - len(cells)))
+        data.append(cells)
+
+    flowables = []
+    for start in range(0, len(data), _DOCX_TABLE_ROWS_PER_FLOWABLE):
+        chunk = data[start:start + _DOCX_TABLE_ROWS_PER_FLOWABLE]
+        # splitInRow lets a row taller than the page (a very long cell) continue on the next page
+        table = Table(chunk, colWidths=[col_width] * n_cols, splitInRow=1)
+        commands = [
+            ('SPAN', (c0, r - start), (c1, r - start))
+            for c0, r, c1 in spans
+            if start <= r < start + len(chunk)
+        ]
+        table.setStyle(styles['table'])
+        if commands:
+            table.setStyle(TableStyle(commands))
+        flowables.append(table)
+    flowables.append(Spacer(1, 12))
+    return flowables
+
+
+def docx_to_pdf(docx: DocumentSource) -> Tuple[bytes, str]:
+    """
+    Convert .docx (bytes, mmap or file path) to PDF. Returns (pdf_bytes, error).
+    Walks the document body once, in order, so tables appear where they are in the document
+    and are rendered as real tables (not one paragraph per cell).
+    """
     if not DOCX_AVAILABLE or not REPORTLAB_AVAILABLE:
         return b'', "DOC to PDF requires python-docx and reportlab"
     try:
-        doc = Document(io.BytesIO(docx_bytes))
+        from docx.oxml.ns import qn
+        from docx.text.paragraph import Paragraph as DocxParagraph
+
+        doc = Document(open_source(docx))
         buf = io.BytesIO()
         doc_pdf = SimpleDocTemplate(buf, pagesize=letter, rightMargin=inch, leftMargin=inch, topMargin=inch, bottomMargin=inch)
-        styles = getSampleStyleSheet()
+        styles = _get_docx_pdf_styles()
+        p_tag, tbl_tag = qn('w:p'), qn('w:tbl')
         story = []
-        for p in doc.paragraphs:
-            raw = (p.text if p.text is not None else '').strip()
-            if raw:
-                try:
-                    story.append(Paragraph(_sanitize_for_reportlab(raw), styles['Normal']))
-                    story.append(Spacer(1, 6))
-                except Exception:
-                    story.append(Paragraph("(paragraph)", styles['Normal']))
+        for child in doc.element.body.iterchildren():
+            if child.tag == p_tag:
+                p = DocxParagraph(child, doc)
+                raw = (p.text or '').strip()
+                if raw:
+                    style = _docx_paragraph_style(p.style.name if p.style is not None else '', styles)
+                    story.append(_safe_paragraph(raw, style, "(paragraph)"))
                     story.append(Spacer(1, 6))
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    raw = (cell.text if cell.text is not None else '').strip()
-                    if raw:
-                        try:
-                            story.append(Paragraph(_sanitize_for_reportlab(raw), styles['Normal']))
-                            story.append(Spacer(1, 4))
-                        except Exception:
-                            story.append(Paragraph("(cell)", styles['Normal']))
-                            story.append(Spacer(1, 4))
-            story.append(Spacer(1, 12))
+            elif child.tag == tbl_tag:
+                story.extend(_docx_table_flowables(child, doc_pdf.width, styles))
         if not story:
-            story.append(Paragraph("(No content)", styles['Normal']))
+            story.append(Paragraph("(No content)", styles['normal']))
         doc_pdf.build(story)
         buf.seek(0)
         return buf.read(), ''
@@ -107,12 +313,12 @@ def docx_to_pdf(docx_bytes: bytes) -> Tuple[bytes, str]:
         return b'', str(e)
 
 
-def pptx_to_pdf(pptx_bytes: bytes) -> Tuple[bytes, str]:
-    """Convert .pptx to PDF (one page per slide, text only). Returns (pdf_bytes, error)."""
+def pptx_to_pdf(pptx: DocumentSource) -> Tuple[bytes, str]:
+    """Convert .pptx (bytes, mmap or file path) to PDF (one page per slide, text only). Returns (pdf_bytes, error)."""
     if not PPTX_AVAILABLE or not REPORTLAB_AVAILABLE:
         return b'', "PPT to PDF requires python-pptx and reportlab"
     try:
-        prs = Presentation(io.BytesIO(pptx_bytes))
+        prs = Presentation(open_source(pptx))
         buf = io.BytesIO()
         doc_pdf = SimpleDocTemplate(buf, pagesize=letter, rightMargin=inch, leftMargin=inch, topMargin=inch, bottomMargin=inch)
         styles = getSampleStyleSheet()
@@ -141,46 +347,242 @@ def pptx_to_pdf(pptx_bytes: bytes) -> Tuple[bytes, str]:
         return b'', str(e)
 
 
-def pdf_to_pptx(pdf_bytes: bytes) -> Tuple[bytes, str]:
-    """Convert PDF to .pptx: one slide per page, each page rendered as an image. Uses PyMuPDF and python-pptx."""
+_SLIDE_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">'
+    '<p:cSld><p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+    '<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/><a:chOff x="0" y="0"/><a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>'
+    '<p:pic><p:nvPicPr><p:cNvPr id="2" name="Page {page}"/><p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+    '<p:blipFill><a:blip r:embed="rId2"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+    '<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm><a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr>'
+    '</p:pic></p:spTree></p:cSld><p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>'
+)
+_SLIDE_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout" Target="../slideLayouts/{layout}"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="../media/{image}"/>'
+    '</Relationships>'
+)
+_SLIDE_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+_SLIDE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+
+
+class _StreamingPptxWriter:
+    """
+    Writes a picture-per-slide .pptx straight into a ZIP on disk, one page at a time.
+    python-pptx keeps every image blob in memory until save(); here only the slide being
+    written is held. Masters, layouts and theme come from python-pptx's default template,
+    and the package-level parts (presentation.xml, its rels, content types) are written
+    last, once the slide count is known.
+    """
+
+    def __init__(self, out_path: str):
+        prs = Presentation()
+        self.slide_width = prs.slide_width
+        self.slide_height = prs.slide_height
+        self._layout_name = os.path.basename(str(prs.slide_layouts[6].part.partname))  # Blank
+        template = io.BytesIO()
+        prs.save(template)
+        self._template = zipfile.ZipFile(template)
+        self._zip = zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED)
+        self._slide_count = 0
+        self._image_exts = set()
+
+    def add_picture_slide(self, image: bytes, ext: str, width_px: int, height_px: int) -> None:
+        """Add a slide with the image scaled to fit and centred (aspect ratio kept)."""
+        n = self._slide_count + 1
+        scale = min(self.slide_width / width_px, self.slide_height / height_px) if width_px and height_px else 1.0
+        cx = int(width_px * scale)
+        cy = int(height_px * scale)
+        x = (self.slide_width - cx) // 2
+        y = (self.slide_height - cy) // 2
+        image_name = f"image{n}.{ext}"
+        # Images are already compressed; deflating them again only costs CPU
+        self._zip.writestr(f"ppt/media/{image_name}", image, compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr(f"ppt/slides/slide{n}.xml", _SLIDE_XML.format(page=n, x=x, y=y, cx=cx, cy=cy))
+        self._zip.writestr(
+            f"ppt/slides/_rels/slide{n}.xml.rels",
+            _SLIDE_RELS_XML.format(layout=self._layout_name, image=image_name),
+        )
+        self._image_exts.add(ext)
+        self._slide_count = n
+
+    def close(self) -> None:
+        """Write the package-level parts and close the ZIP."""
+        try:
+            rewritten = {"[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels"}
+            for name in self._template.namelist():
+                if name not in rewritten:
+                    self._zip.writestr(name, self._template.read(name))
+
+            rels = self._template.read("ppt/_rels/presentation.xml.rels").decode("utf-8")
+            first_rid = rels.count("<Relationship ") + 1
+            slide_rels = "".join(
+                f'<Relationship Id="rId{first_rid + i}" Type="{_SLIDE_REL_TYPE}" Target="slides/slide{i + 1}.xml"/>'
+                for i in range(self._slide_count)
+            )
+            self._zip.writestr(
+                "ppt/_rels/presentation.xml.rels",
+                rels.replace("</Relationships>", slide_rels + "</Relationships>"),
+            )
+
+            presentation = self._template.read("ppt/presentation.xml").decode("utf-8")
+            if self._slide_count:
+                sld_ids = "".join(
+                    f'<p:sldId id="{256 + i}" r:id="rId{first_rid + i}"/>' for i in range(self._slide_count)
+                )
+                presentation = presentation.replace(
+                    "</p:sldMasterIdLst>", f"</p:sldMasterIdLst><p:sldIdLst>{sld_ids}</p:sldIdLst>", 1
+                )
+            self._zip.writestr("ppt/presentation.xml", presentation)
+
+            content_types = self._template.read("[Content_Types].xml").decode("utf-8")
+            defaults = "".join(
+                f'<Default Extension="{ext}" ContentType="image/{ext}"/>'
+                for ext in sorted(self._image_exts)
+                if f'Extension="{ext}"' not in content_types
+            )
+            overrides = "".join(
+                f'<Override PartName="/ppt/slides/slide{i + 1}.xml" ContentType="{_SLIDE_CONTENT_TYPE}"/>'
+                for i in range(self._slide_count)
+            )
+            content_types = content_types.replace("<Override ", defaults + "<Override ", 1)
+            self._zip.writestr("[Content_Types].xml", content_types.replace("</Types>", overrides + "</Types>"))
+        finally:
+            self._zip.close()
+            self._template.close()
+
+
+def _page_is_photo(page) -> bool:
+    """True when embedded images cover most of the page (scans, photos): JPEG suits those better than PNG."""
+    page_area = (page.rect.width * page.rect.height) or 1.0
+    image_area = 0.0
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        image_area += max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    return image_area / page_area > 0.5
+
+
+def _render_pdf_pages(args) -> List[PageRaster]:
+    """Worker entry point: render a few (page_index, format) pages of the PDF at pdf_path."""
+    pdf_path, pages, dpi, jpeg_quality = args
+    import fitz  # PyMuPDF
+    doc = fitz.open(pdf_path)
+    try:
+        return [render_pdf_page(doc, i, dpi, fmt, jpeg_quality) for i, fmt in pages]
+    finally:
+        doc.close()
+
+
+def _iter_rendered_pages_parallel(pdf_path: str, pages: List[Tuple[int, str]], dpi: int,
+                                  jpeg_quality: int, workers: int) -> Iterator[PageRaster]:
+    """
+    Render pages on the shared pool, yielding them in the given order. Only about two tasks
+    per worker are in flight at once, so memory stays bounded however long the PDF is.
+    """
+    pool = _get_pdf_pool()
+    tasks = iter(
+        (pdf_path, pages[start:start + _PDF_TO_PPTX_PAGES_PER_TASK], dpi, jpeg_quality)
+        for start in range(0, len(pages), _PDF_TO_PPTX_PAGES_PER_TASK)
+    )
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(_render_pdf_pages, task))
+        if len(pending) >= workers * 2:
+            break
+    try:
+        while pending:
+            rendered = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(_render_pdf_pages, task))
+            yield from rendered
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def pdf_to_pptx(
+    pdf: DocumentSource,
+    dpi: Optional[int] = None,
+    image_format: Optional[str] = None,
+    workers: Optional[int] = None,
+    parallel_min_pages: Optional[int] = None,
+) -> Tuple[bytes, str]:
+    """
+    Convert PDF (bytes, mmap or file path) to .pptx: one slide per page, each page rendered as
+    an image. Uses PyMuPDF, which opens a path in place.
+    Pages already in the shared page raster cache are reused; the rest are rendered on worker
+    processes (from parallel_min_pages pages) and streamed into the package on disk, so memory
+    does not grow with page count.
+    dpi / image_format ("png", "jpeg", "auto") default to PDF_TO_PPTX_DPI / PDF_TO_PPTX_FORMAT.
+    """
     if not PPTX_AVAILABLE:
         return b'', "PDF to PPT requires python-pptx"
     try:
         import fitz  # PyMuPDF
     except ImportError:
         return b'', "PDF to PPT requires PyMuPDF. Install: pip install PyMuPDF"
+    dpi = dpi or PDF_TO_PPTX_DPI
+    image_format = (image_format or PDF_TO_PPTX_FORMAT).lower()
+    if image_format == "jpg":
+        image_format = "jpeg"
+    if image_format not in ("png", "jpeg", "auto"):
+        return b'', f"Unsupported image format '{image_format}'. Use png, jpeg or auto."
+    workers = PDF_WORKERS if workers is None else workers
+    parallel_min_pages = PDF_TO_PPTX_PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
+    quality = PDF_TO_PPTX_JPEG_QUALITY
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        if len(doc) == 0:
-            doc.close()
-            return b'', "PDF has no pages."
-        prs = Presentation()
-        # EMU: 914400 per inch (OOXML)
-        EMU_PER_INCH = 914400
-        slide_w_inch = prs.slide_width / EMU_PER_INCH
-        slide_h_inch = prs.slide_height / EMU_PER_INCH
-        from pptx.util import Inches
-
-        for i in range(len(doc)):
-            page = doc[i]
-            blank = prs.slide_layouts[6]  # Blank
-            slide = prs.slides.add_slide(blank)
-            pix = page.get_pixmap(dpi=150, alpha=False)
-            img_bytes = pix.tobytes("png")
-            stream = io.BytesIO(img_bytes)
-            img_w_inch = pix.width / 150.0
-            img_h_inch = pix.height / 150.0
-            scale = min(slide_w_inch / img_w_inch, slide_h_inch / img_h_inch) if img_w_inch and img_h_inch else 1.0
-            w = img_w_inch * scale
-            h = img_h_inch * scale
-            left = (slide_w_inch - w) / 2.0
-            top = (slide_h_inch - h) / 2.0
-            slide.shapes.add_picture(stream, Inches(left), Inches(top), width=Inches(w), height=Inches(h))
-        doc.close()
-        buf = io.BytesIO()
-        prs.save(buf)
-        buf.seek(0)
-        return buf.read(), ''
+        with tempfile.TemporaryDirectory(prefix="pdf2pptx_") as work_dir:
+            pdf_path = source_path(pdf, os.path.join(work_dir, "input.pdf"))
+            out_path = os.path.join(work_dir, "output.pptx")
+
+            doc = fitz.open(pdf_path)
+            try:
+                page_count = len(doc)
+                if page_count == 0:
+                    return b'', "PDF has no pages."
+
+                cache = get_page_raster_cache()
+                doc_hash = document_hash(pdf)
+                keys = []
+                for i in range(page_count):
+                    fmt = image_format
+                    if fmt == "auto":
+                        fmt = "jpeg" if _page_is_photo(doc[i]) else "png"
+                    keys.append((doc_hash, i, dpi, fmt))
+                missing = [(i, fmt) for (_, i, _, fmt) in keys if not cache.contains((doc_hash, i, dpi, fmt))]
+                missing_pages = {i for i, _ in missing}
+
+                if workers > 1 and len(missing) >= parallel_min_pages:
+                    rendered = _iter_rendered_pages_parallel(pdf_path, missing, dpi, quality, workers)
+                else:
+                    rendered = (render_pdf_page(doc, i, dpi, fmt, quality) for i, fmt in missing)
+
+                writer = _StreamingPptxWriter(out_path)
+                try:
+                    for key in keys:
+                        _, i, _, fmt = key
+                        if i in missing_pages:
+                            raster = next(rendered)
+                            cache.put(key, raster)
+                        else:
+                            # Cached at planning time; re-render if evicted since
+                            raster = cache.get_or_render(key, lambda: render_pdf_page(doc, i, dpi, fmt, quality))
+                        writer.add_picture_slide(raster.data, raster.ext, raster.width, raster.height)
+                        raster = None
+                finally:
+                    writer.close()
+            finally:
+                doc.close()
+
+            with open(out_path, "rb") as f:
+                return f.read(), ''
     except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _reset_pdf_pool()
         logger.exception("pdf_to_pptx failed")
         return b'', str(e)
@@ -0,0 +1,119 @@
+"""
+Document Sources for InsightSheet-lite
+The converters and analyzers take a document as any of:
+
+- bytes (small uploads held in memory),
+- a read-only mmap.mmap of a spooled file,
+- the path (str / os.PathLike) of a file holding it.
+
+These helpers hand each library the cheapest form it accepts: a path for PyMuPDF, pdf2docx,
+zipfile, openpyxl and xlrd when there is one, otherwise a seekable view over the bytes or
+mapping, so no service copies an upload just to open it.
+"""
+import hashlib
+import io
+import mmap
+import os
+from typing import BinaryIO, Union
+
+DocumentSource = Union[bytes, bytearray, memoryview, mmap.mmap, str, os.PathLike]
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def as_source(obj) -> DocumentSource:
+    """Services that also take a file object: read it into bytes; sources (mmap included, though it has read()) pass through."""
+    if isinstance(obj, mmap.mmap) or not hasattr(obj, "read"):
+        return obj
+    return obj.read()
+
+
+def is_path(source: DocumentSource) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def open_source(source: DocumentSource) -> Union[str, BinaryIO]:
+    """What to pass to zipfile / openpyxl / python-docx / pandas: the path, or a seekable reader over the data."""
+    if is_path(source):
+        return os.fspath(source)
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return _MappedReader(source)
+
+
+def source_path(source: DocumentSource, dest_path: str) -> str:
+    """A path holding the document: its own path, or dest_path after writing the data there."""
+    if is_path(source):
+        return os.fspath(source)
+    with open(dest_path, "wb") as f:
+        f.write(source)
+    return dest_path
+
+
+def read_source(source: DocumentSource) -> bytes:
+    """The document as bytes; bytes are returned as is."""
+    if isinstance(source, bytes):
+        return source
+    if is_path(source):
+        with open(source, "rb") as f:
+            return f.read()
+    return bytes(source)
+
+
+def hash_source(source: DocumentSource) -> str:
+    """SHA-256 hex digest; files are hashed in chunks, buffers (bytes, mmap) without a copy."""
+    if not is_path(source):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _MappedReader(io.RawIOBase):
+    """Seekable, read-only file object over a buffer (mmap, bytearray, memoryview) that does not copy it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        n = len(chunk)
+        b[:n] = chunk
+        self._pos += n
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        data = self._view[self._pos:end].tobytes() if end > self._pos else b""
+        self._pos = max(self._pos, end)
+        return data
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
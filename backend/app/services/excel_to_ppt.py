@@ -10,19 +10,178 @@ from pptx.enum.text import PP_ALIGN
 from pptx.chart.data import CategoryChartData
 from pptx.enum.chart import XL_CHART_TYPE
 from pptx.dml.color import RGBColor
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml.ns import qn
+from pptx.parts.chart import ChartPart
+from pptx.parts.embeddedpackage import EmbeddedXlsxPart
+from pptx.text.text import TextFrame
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional, BinaryIO
+from typing import List, Dict, Any, Optional, BinaryIO, Callable, Iterator, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from copy import deepcopy
+import asyncio
 import io
+import itertools
+import multiprocessing
+import os
+import re
+import tempfile
 import logging
 from datetime import datetime
 
+from app.services.document_source import DocumentSource, as_source, is_path, open_source
+
 logger = logging.getLogger(__name__)
 
+# How chart series summarise a numeric column per category
+CHART_AGGREGATIONS = ('mean', 'sum', 'count')
+CHART_MAX_CATEGORIES = 15
+
+# Sheets are analysed in this many worker processes; the slides are assembled in sheet order here
+EXCEL_TO_PPT_WORKERS = int(os.getenv("EXCEL_TO_PPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Workbooks with fewer sheets are converted in-process
+EXCEL_TO_PPT_PARALLEL_MIN_SHEETS = int(os.getenv("EXCEL_TO_PPT_PARALLEL_MIN_SHEETS", "4"))
+
+_CHART_TYPES = (
+    (XL_CHART_TYPE.BAR_CLUSTERED, "Bar Chart"),
+    (XL_CHART_TYPE.LINE, "Line Chart"),
+    (XL_CHART_TYPE.PIE, "Pie Chart"),
+)
+
+_STATISTICS_HEADERS = ('Column', 'Average', 'Min', 'Max', 'Std Dev', 'Count')
+_CELL_PLACEHOLDER = '-'
+# lxml rejects most control characters; python-pptx escapes them (and splits on newlines)
+_CONTROL_CHARS = re.compile(r'[\x00-\x1f\x7f]')
+
+
+def _placeholder(name: str) -> str:
+    return '{{' + name + '}}'
+
+
+class _SlideTemplates:
+    """
+    Slide prototypes built once and cloned per slide
+
+    Each prototype is built by the usual python-pptx calls on a scratch slide, with
+    {{name}} placeholders for variable text. Cloning copies the background and shape XML
+    into a new blank slide, so fonts, fills and table layout are not rebuilt per slide.
+    """
+
+    def __init__(self):
+        self._scratch: Optional[Presentation] = None
+        self._prototypes: Dict[Any, Tuple[Any, List[Any]]] = {}
+
+    def clone(self, prs: Presentation, key: Any, build: Callable[[Any], None]):
+        """Add a slide to prs that copies the prototype for key, building it with build(slide) first if needed."""
+        prototype = self._prototypes.get(key)
+        if prototype is None:
+            if self._scratch is None:
+                self._scratch = Presentation()
+            scratch_slide = self._scratch.slides.add_slide(self._scratch.slide_layouts[6])
+            build(scratch_slide)
+            c_sld = scratch_slide._element.cSld
+            shapes = [el for el in c_sld.spTree if el.tag not in (qn('p:nvGrpSpPr'), qn('p:grpSpPr'))]
+            prototype = self._prototypes[key] = (c_sld.find(qn('p:bg')), shapes)
+
+        background, shapes = prototype
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        c_sld = slide._element.cSld
+        if background is not None:
+            c_sld.insert(0, deepcopy(background))
+        c_sld.spTree.extend(deepcopy(el) for el in shapes)
+        return slide
+
+    def fill_text(self, slide, values: Dict[str, str]):
+        """Replace {{name}} placeholders in a cloned slide's text boxes."""
+        found = [
+            (t, values[t.text[2:-2]])
+            for t in slide._element.cSld.spTree.iter(qn('a:t'))
+            if t.text and t.text.startswith('{{') and t.text[2:-2] in values
+        ]
+        for t, value in found:
+            _set_paragraph_text(t.getparent().getparent(), value)
+
+    def fill_table(self, slide, values: List[str], first_row: int = 0):
+        """Write values into the cloned slide's table cells in row-major order, from first_row on."""
+        tbl = next(slide._element.cSld.spTree.iter(qn('a:tbl')))
+        for tr, row_values in zip(tbl.tr_lst[first_row:], _chunks(values, len(tbl.tblGrid.gridCol_lst))):
+            for tc, value in zip(tr.tc_lst, row_values):
+                _set_paragraph_text(tc.txBody.find(qn('a:p')), value)
+
+
+def _chunks(values: List[str], size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _set_paragraph_text(p, value: str):
+    """Set the text of a prototype paragraph holding one run, keeping its paragraph style."""
+    run = p.find(qn('a:r'))
+    if not _CONTROL_CHARS.search(value):
+        if value:
+            run.find(qn('a:t')).text = value
+        else:
+            p.remove(run)
+        return
+
+    # Same result as setting text_frame.text and styling the first paragraph
+    tx_body = p.getparent()
+    p_pr = p.find(qn('a:pPr'))
+    TextFrame(tx_body, None).text = value
+    if p_pr is not None:
+        tx_body.find(qn('a:p')).insert(0, p_pr)
+
+
+_sheet_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_sheet_pool() -> ProcessPoolExecutor:
+    """Process pool for per-sheet analysis. Spawned (not forked) so workers never inherit server threads."""
+    global _sheet_pool
+    if _sheet_pool is None:
+        _sheet_pool = ProcessPoolExecutor(
+            max_workers=max(1, EXCEL_TO_PPT_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _sheet_pool
+
+
+def _reset_sheet_pool() -> None:
+    """Drop a broken pool so the next conversion starts fresh workers."""
+    global _sheet_pool
+    if _sheet_pool is not None:
+        _sheet_pool.shutdown(wait=False, cancel_futures=True)
+        _sheet_pool = None
+
+
+def _sheet_contents_task(args) -> List[Optional[Dict]]:
+    """
+    Worker entry point: slide content for some sheets of the workbook saved at excel_path
+
+    Loading a read-only workbook scans every sheet's dimensions, so each task opens it once for
+    all its sheets, and closes it before returning: a workbook left open would keep the deleted
+    upload's spool file (and its disk space) alive in the worker.
+    """
+    excel_path, sheet_names, chart_aggregation = args
+    workbook = openpyxl.load_workbook(excel_path, data_only=True, read_only=True)
+    try:
+        service = ExcelToPPTService(chart_aggregation)
+        return [service._sheet_content(workbook[sheet_name]) for sheet_name in sheet_names]
+    finally:
+        workbook.close()
+
 
 class ExcelToPPTService:
     """Service to convert Excel files to PowerPoint presentations"""
 
-    def __init__(self):
+    def __init__(self, chart_aggregation: str = 'mean'):
+        if chart_aggregation not in CHART_AGGREGATIONS:
+            raise ValueError(f"chart_aggregation must be one of: {', '.join(CHART_AGGREGATIONS)}")
+        self.chart_aggregation = chart_aggregation
+        self._templates = _SlideTemplates()
         self.theme_colors = {
             'primary': RGBColor(99, 102, 241),  # Indigo
             'secondary': RGBColor(139, 92, 246),  # Purple
@@ -35,76 +194,166 @@ class ExcelToPPTService:
 
     async def convert_excel_to_ppt(
         self,
-        excel_file: BinaryIO,
+        excel_file: Union[BinaryIO, DocumentSource],
         filename: str
     ) -> bytes:
         """
         Convert Excel file to PowerPoint presentation
 
         Args:
-            excel_file: Excel file binary data
+            excel_file: Excel file as a file object, bytes, mmap or path (a path or mmap is read in place)
             filename: Original filename
 
         Returns:
             bytes: PowerPoint file data
         """
         try:
-            # Read Excel file
-            excel_data = excel_file.read() if hasattr(excel_file, 'read') else excel_file
-            workbook = openpyxl.load_workbook(io.BytesIO(excel_data), data_only=True)
+            # Workbook parsing and slide building are synchronous; run them off the event loop
+            loop = asyncio.get_running_loop()
+            excel_data = as_source(excel_file)
+            sheet_names, contents = await loop.run_in_executor(None, self._read_sheet_contents, excel_data, True)
+            if contents is None:
+                contents = await self._sheet_contents_parallel(excel_data, sheet_names)
+            if contents is None:
+                sheet_names, contents = await loop.run_in_executor(None, self._read_sheet_contents, excel_data, False)
+            return await loop.run_in_executor(None, self._build_presentation, filename, sheet_names, contents)
 
-            # Create PowerPoint presentation
-            prs = Presentation()
-            prs.slide_width = Inches(10)
-            prs.slide_height = Inches(5.625)  # 16:9 aspect ratio
+        except Exception as e:
+            logger.error(f"Error converting Excel to PPT: {str(e)}")
+            raise Exception(f"Excel to PPT conversion failed: {str(e)}")
 
-            # Add title slide
-            self._add_title_slide(prs, filename)
+    def _read_sheet_contents(self, excel_data: DocumentSource, allow_parallel: bool) -> Tuple[List[str], Optional[List[Optional[Dict]]]]:
+        """
+        Sheet names and each sheet's slide content, read in this thread
 
-            # Process each worksheet
-            for sheet_name in workbook.sheetnames:
+        Contents are None when allow_parallel is set and the workbook is large enough for the
+        worker pool, so the caller computes them there instead.
+        """
+        # Read-only mode streams rows instead of building a cell object per value
+        workbook = openpyxl.load_workbook(open_source(excel_data), data_only=True, read_only=True)
+        try:
+            sheet_names = workbook.sheetnames
+            if allow_parallel and EXCEL_TO_PPT_WORKERS > 1 and len(sheet_names) >= EXCEL_TO_PPT_PARALLEL_MIN_SHEETS:
+                return sheet_names, None
+            contents = []
+            for sheet_name in sheet_names:
                 logger.info(f"Processing sheet: {sheet_name}")
-                worksheet = workbook[sheet_name]
-
-                # Get data from worksheet
-                data = self._extract_worksheet_data(worksheet)
-
-                if not data['rows']:
-                    logger.warning(f"Skipping empty sheet: {sheet_name}")
-                    continue
-
-                # Analyze data
-                analysis = self._analyze_data(data)
+                contents.append(self._sheet_content(workbook[sheet_name]))
+            return sheet_names, contents
+        finally:
+            workbook.close()
+
+    def _build_presentation(self, filename: str, sheet_names: List[str], contents: List[Optional[Dict]]) -> bytes:
+        # Create PowerPoint presentation
+        prs = Presentation()
+        prs.slide_width = Inches(10)
+        prs.slide_height = Inches(5.625)  # 16:9 aspect ratio
+
+        # Add title slide
+        self._add_title_slide(prs, filename)
+
+        # Slides are added in workbook order whatever order the sheets finished in
+        chart_numbers = itertools.count(1)
+        for sheet_name, content in zip(sheet_names, contents):
+            if content is None:
+                logger.warning(f"Skipping empty sheet: {sheet_name}")
+                continue
+            self._add_sheet_slides(prs, sheet_name, content, chart_numbers)
 
-                # Add section slide
-                self._add_section_slide(prs, sheet_name, analysis)
+        # Save to bytes
+        output = io.BytesIO()
+        prs.save(output)
+        output.seek(0)
 
-                # Add data table slide
-                self._add_data_table_slide(prs, sheet_name, data)
+        return output.read()
 
-                # Add chart slides
-                if analysis['numeric_columns'] and analysis['categorical_columns']:
-                    self._add_chart_slides(prs, sheet_name, data, analysis)
+    async def _sheet_contents_parallel(self, excel_data: DocumentSource, sheet_names: List[str]) -> Optional[List[Optional[Dict]]]:
+        """
+        Compute every sheet's slide content in the worker pool
 
-                # Add statistics slide
-                if analysis['numeric_columns']:
-                    self._add_statistics_slide(prs, sheet_name, data, analysis)
+        Workers read the workbook from a file rather than receiving the bytes per task: its own
+        path if it has one, otherwise a temp file.
+        Returns None if the pool broke, so the caller can fall back to in-process conversion.
+        """
+        if is_path(excel_data):
+            excel_path, temp_path = os.fspath(excel_data), None
+        else:
+            fd, temp_path = tempfile.mkstemp(suffix='.xlsx')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(excel_data)
+            excel_path = temp_path
+        try:
+            logger.info(f"Processing {len(sheet_names)} sheets in {EXCEL_TO_PPT_WORKERS} worker processes")
+            loop = asyncio.get_running_loop()
+            pool = _get_sheet_pool()
+            # One task per worker, with sheets dealt out in turn so large and small ones mix
+            task_count = min(EXCEL_TO_PPT_WORKERS, len(sheet_names))
+            try:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(
+                        pool, _sheet_contents_task,
+                        (excel_path, sheet_names[i::task_count], self.chart_aggregation)
+                    )
+                    for i in range(task_count)
+                ))
+                contents = [None] * len(sheet_names)
+                for i, task_contents in enumerate(results):
+                    contents[i::task_count] = task_contents
+                return contents
+            except BrokenProcessPool:
+                logger.warning("Excel to PPT worker pool broke; converting sheets in-process")
+                _reset_sheet_pool()
+                return None
+        finally:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
 
-            # Save to bytes
-            output = io.BytesIO()
-            prs.save(output)
-            output.seek(0)
+    def _sheet_content(self, worksheet) -> Optional[Dict]:
+        """
+        Analyse one worksheet and compute everything its slides show
 
-            return output.read()
+        Returns a picklable dict (None for an empty sheet): row and column counts, the
+        data table cells, pre-rendered charts and the statistics cells. No slides are
+        built here, so this runs in worker processes.
+        """
+        data = self._extract_worksheet_data(worksheet)
+        if data['frame'].empty:
+            return None
+
+        analysis = self._analyze_data(data)
+        return {
+            'row_count': analysis['row_count'],
+            'column_count': analysis['column_count'],
+            'chart_count': len(analysis.get('chart_candidates', [])),
+            'table': self._table_content(data),
+            'charts': (
+                self._chart_contents(data, analysis)
+                if analysis['numeric_columns'] and analysis['categorical_columns'] else []
+            ),
+            'statistics': self._statistics_content(data, analysis) if analysis['numeric_columns'] else None,
+        }
 
-        except Exception as e:
-            logger.error(f"Error converting Excel to PPT: {str(e)}")
-            raise Exception(f"Excel to PPT conversion failed: {str(e)}")
+    def _add_sheet_slides(self, prs: Presentation, sheet_name: str, content: Dict, chart_numbers: Iterator[int]):
+        """Add the section, data table, chart and statistics slides for one sheet"""
+        self._add_section_slide(prs, sheet_name, content)
+        self._add_data_table_slide(prs, sheet_name, content['table'])
+        if content['charts']:
+            self._add_chart_slides(prs, sheet_name, content['charts'], chart_numbers)
+        if content['statistics'] is not None:
+            self._add_statistics_slide(prs, sheet_name, content['statistics'])
 
     def _add_title_slide(self, prs: Presentation, filename: str):
         """Add title slide to presentation"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
+        slide = self._templates.clone(prs, 'title', self._build_title_template)
+        self._templates.fill_text(slide, {
+            'subtitle': filename.replace('.xlsx', '').replace('.xls', ''),
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        })
 
+    def _build_title_template(self, slide):
         # Background
         background = slide.background
         fill = background.fill
@@ -128,7 +377,7 @@ class ExcelToPPTService:
             Inches(0.5), Inches(3.2), Inches(9), Inches(0.6)
         )
         subtitle_frame = subtitle_box.text_frame
-        subtitle_frame.text = filename.replace('.xlsx', '').replace('.xls', '')
+        subtitle_frame.text = _placeholder('subtitle')
         subtitle_para = subtitle_frame.paragraphs[0]
         subtitle_para.font.size = Pt(24)
         subtitle_para.font.color.rgb = self.theme_colors['secondary']
@@ -139,16 +388,21 @@ class ExcelToPPTService:
             Inches(0.5), Inches(4.5), Inches(9), Inches(0.5)
         )
         footer_frame = footer_box.text_frame
-        footer_frame.text = f"Generated by InsightSheet-lite\n{datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        footer_frame.text = f"Generated by InsightSheet-lite\n{_placeholder('generated')}"
         footer_para = footer_frame.paragraphs[0]
         footer_para.font.size = Pt(14)
         footer_para.font.color.rgb = RGBColor(148, 163, 184)
         footer_para.alignment = PP_ALIGN.CENTER
 
-    def _add_section_slide(self, prs: Presentation, sheet_name: str, analysis: Dict):
+    def _add_section_slide(self, prs: Presentation, sheet_name: str, content: Dict):
         """Add section slide for worksheet"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        slide = self._templates.clone(prs, 'section', self._build_section_template)
+        self._templates.fill_text(slide, {
+            'title': sheet_name,
+            'stats': f"{content['chart_count']} charts • {content['row_count']} rows • {content['column_count']} columns",
+        })
 
+    def _build_section_template(self, slide):
         # Background
         background = slide.background
         fill = background.fill
@@ -160,7 +414,7 @@ class ExcelToPPTService:
             Inches(0.5), Inches(2.5), Inches(9), Inches(1)
         )
         title_frame = title_box.text_frame
-        title_frame.text = sheet_name
+        title_frame.text = _placeholder('title')
         title_para = title_frame.paragraphs[0]
         title_para.font.size = Pt(48)
         title_para.font.bold = True
@@ -168,39 +422,51 @@ class ExcelToPPTService:
         title_para.alignment = PP_ALIGN.CENTER
 
         # Stats
-        stats_text = f"{len(analysis.get('chart_candidates', []))} charts • {analysis['row_count']} rows • {analysis['column_count']} columns"
         stats_box = slide.shapes.add_textbox(
             Inches(0.5), Inches(3.8), Inches(9), Inches(0.5)
         )
         stats_frame = stats_box.text_frame
-        stats_frame.text = stats_text
+        stats_frame.text = _placeholder('stats')
         stats_para = stats_frame.paragraphs[0]
         stats_para.font.size = Pt(20)
         stats_para.font.color.rgb = self.theme_colors['secondary']
         stats_para.alignment = PP_ALIGN.CENTER
 
-    def _add_data_table_slide(self, prs: Presentation, sheet_name: str, data: Dict):
+    def _table_content(self, data: Dict) -> Dict:
+        """Header and preview cells (first 20 rows, 10 columns) for the data table slide"""
+        frame = data['frame']
+        max_rows = min(len(frame), 20)
+        max_cols = min(len(data['headers']), 10)
+        preview = frame.iloc[:max_rows, :max_cols].to_numpy()
+
+        cells = [str(header) for header in data['headers'][:max_cols]]
+        cells.extend(str(value) if value is not None else '' for value in preview.ravel())
+        # +1 row for the header
+        return {'rows': max_rows + 1, 'cols': max_cols, 'cells': cells}
+
+    def _add_data_table_slide(self, prs: Presentation, sheet_name: str, table: Dict):
         """Add data table slide"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        # Table layouts are cached per (rows, columns)
+        slide = self._templates.clone(
+            prs, ('table', table['rows'], table['cols']),
+            lambda proto: self._build_data_table_template(proto, table['rows'], table['cols'])
+        )
+        self._templates.fill_text(slide, {'title': f"{sheet_name} - Data Overview"})
+        self._templates.fill_table(slide, table['cells'])
 
+    def _build_data_table_template(self, slide, rows_count: int, cols_count: int):
         # Title
         title_box = slide.shapes.add_textbox(
             Inches(0.5), Inches(0.3), Inches(9), Inches(0.5)
         )
         title_frame = title_box.text_frame
-        title_frame.text = f"{sheet_name} - Data Overview"
+        title_frame.text = _placeholder('title')
         title_para = title_frame.paragraphs[0]
         title_para.font.size = Pt(28)
         title_para.font.bold = True
         title_para.font.color.rgb = self.theme_colors['dark']
 
         # Create table
-        max_rows = min(len(data['rows']), 20)
-        max_cols = min(len(data['headers']), 10)
-
-        rows_count = max_rows + 1  # +1 for header
-        cols_count = max_cols
-
         table = slide.shapes.add_table(
             rows_count, cols_count,
             Inches(0.4), Inches(1),
@@ -211,10 +477,10 @@ class ExcelToPPTService:
         for col_idx in range(cols_count):
             table.columns[col_idx].width = Inches(9.2 / cols_count)
 
-        # Add headers
-        for col_idx in range(max_cols):
+        # Header style
+        for col_idx in range(cols_count):
             cell = table.cell(0, col_idx)
-            cell.text = str(data['headers'][col_idx])
+            cell.text = _CELL_PLACEHOLDER
             cell.fill.solid()
             cell.fill.fore_color.rgb = self.theme_colors['primary']
             paragraph = cell.text_frame.paragraphs[0]
@@ -222,120 +488,147 @@ class ExcelToPPTService:
             paragraph.font.bold = True
             paragraph.font.color.rgb = RGBColor(255, 255, 255)
 
-        # Add data rows
-        for row_idx in range(max_rows):
-            for col_idx in range(max_cols):
-                cell = table.cell(row_idx + 1, col_idx)
-                value = data['rows'][row_idx][col_idx] if col_idx < len(data['rows'][row_idx]) else ''
-                cell.text = str(value) if value is not None else ''
+        # Data row style
+        for row_idx in range(1, rows_count):
+            for col_idx in range(cols_count):
+                cell = table.cell(row_idx, col_idx)
+                cell.text = _CELL_PLACEHOLDER
                 paragraph = cell.text_frame.paragraphs[0]
                 paragraph.font.size = Pt(9)
 
-    def _add_chart_slides(self, prs: Presentation, sheet_name: str, data: Dict, analysis: Dict):
-        """Add chart slides for data visualization"""
-        chart_types = [
-            (XL_CHART_TYPE.BAR_CLUSTERED, "Bar Chart"),
-            (XL_CHART_TYPE.LINE, "Line Chart"),
-            (XL_CHART_TYPE.PIE, "Pie Chart"),
-        ]
-
+    def _chart_contents(self, data: Dict, analysis: Dict) -> List[Dict]:
+        """Render the chart XML and embedded chart workbook for up to three numeric columns"""
         numeric_cols = analysis['numeric_columns'][:3]  # Max 3 charts
-        categorical_col = analysis['categorical_columns'][0] if analysis['categorical_columns'] else None
-
-        if not categorical_col:
-            return
-
-        cat_idx = data['headers'].index(categorical_col['name'])
-
-        for idx, num_col in enumerate(numeric_cols):
-            if idx >= len(chart_types):
-                break
-
-            chart_type, chart_name = chart_types[idx]
-            num_idx = data['headers'].index(num_col['name'])
+        cat_idx = analysis['categorical_columns'][0]['index']
+
+        charts = []
+        for (chart_type, chart_name), num_col in zip(_CHART_TYPES, numeric_cols):
+            chart_data = self._chart_data(data, cat_idx, num_col['index'])
+            charts.append({
+                'name': chart_name,
+                'xml': chart_data.xml_bytes(chart_type),
+                'xlsx': chart_data.xlsx_blob,
+                'has_legend': chart_type == XL_CHART_TYPE.PIE,
+            })
+        return charts
+
+    def _chart_data(self, data: Dict, cat_idx: int, num_idx: int) -> CategoryChartData:
+        """Chart series for one numeric column, aggregated per category"""
+        chart_data = CategoryChartData()
 
-            self._add_chart_slide(
-                prs, sheet_name, data, cat_idx, num_idx,
-                chart_type, chart_name, idx + 1, len(numeric_cols)
-            )
+        # Aggregate the whole column per category (group-by), then keep the top categories.
+        # nlargest is a partial sort and keeps first-seen order for ties.
+        numbers = data['numeric'][num_idx]
+        valid = numbers.notna()
+        categories = data['frame'][cat_idx][valid].map(str).str[:30]
+        aggregated = numbers[valid].groupby(categories, sort=False).agg(self.chart_aggregation)
+        sorted_data = list(aggregated.nlargest(CHART_MAX_CATEGORIES).items())
+
+        # Categories must be assigned as a whole (the Categories object has no append)
+        chart_data.categories = [category for category, _ in sorted_data]
+        series_name = data['headers'][num_idx]
+        if self.chart_aggregation != 'mean':
+            series_name = f"{series_name} ({self.chart_aggregation})"
+        chart_data.add_series(series_name, [round(float(value), 2) for _, value in sorted_data])
+        return chart_data
+
+    def _add_chart_slides(self, prs: Presentation, sheet_name: str, charts: List[Dict], chart_numbers: Iterator[int]):
+        """Add chart slides for data visualization"""
+        for idx, chart in enumerate(charts):
+            self._add_chart_slide(prs, sheet_name, chart, idx + 1, len(charts), next(chart_numbers))
 
     def _add_chart_slide(
-        self, prs: Presentation, sheet_name: str, data: Dict,
-        cat_idx: int, num_idx: int, chart_type, chart_name: str,
-        chart_num: int, total_charts: int
+        self, prs: Presentation, sheet_name: str, chart: Dict,
+        chart_num: int, total_charts: int, part_number: int
     ):
         """Add individual chart slide"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        # The title and chart frame come from the template; the chart part is built per slide
+        slide = self._templates.clone(prs, 'chart', self._build_chart_template)
+        self._templates.fill_text(slide, {
+            'title': f"{sheet_name} - {chart['name']} ({chart_num}/{total_charts})",
+        })
+
+        # Same parts as shapes.add_chart, from the pre-rendered XML and workbook. Part names
+        # are numbered here because package.next_partname walks every part in the package.
+        package = prs.part.package
+        chart_part = ChartPart.load(
+            PackURI(ChartPart.partname_template % part_number), CT.DML_CHART,
+            package=package, blob=chart['xml']
+        )
+        chart_part.chart_workbook.xlsx_part = EmbeddedXlsxPart(
+            PackURI(EmbeddedXlsxPart.partname_template % part_number), CT.SML_SHEET,
+            package=package, blob=chart['xlsx']
+        )
+        chart_part.chart.has_legend = chart['has_legend']
 
+        # The cloned frame still references the template's chart; point it at this slide's part
+        rId = slide.part.relate_to(chart_part, RT.CHART)
+        next(slide._element.cSld.spTree.iter(qn('c:chart'))).set(qn('r:id'), rId)
+
+    def _build_chart_template(self, slide):
         # Title
-        title_text = f"{sheet_name} - {chart_name} ({chart_num}/{total_charts})"
         title_box = slide.shapes.add_textbox(
             Inches(0.5), Inches(0.3), Inches(9), Inches(0.5)
         )
         title_frame = title_box.text_frame
-        title_frame.text = title_text
+        title_frame.text = _placeholder('title')
         title_para = title_frame.paragraphs[0]
         title_para.font.size = Pt(24)
         title_para.font.bold = True
 
-        # Prepare chart data
+        # Chart frame, built with the public add_chart; each slide relinks it to its own chart part
         chart_data = CategoryChartData()
-        chart_data.categories = []
-        values = []
-
-        # Aggregate data
-        data_map = {}
-        for row in data['rows'][:50]:  # Max 50 rows
-            if cat_idx < len(row) and num_idx < len(row):
-                category = str(row[cat_idx])[:30]
-                try:
-                    value = float(row[num_idx])
-                    if category not in data_map:
-                        data_map[category] = {'sum': 0, 'count': 0}
-                    data_map[category]['sum'] += value
-                    data_map[category]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-
-        # Sort and limit
-        sorted_data = sorted(
-            [(k, v['sum'] / v['count']) for k, v in data_map.items()],
-            key=lambda x: x[1],
-            reverse=True
-        )[:15]
-
-        for category, value in sorted_data:
-            chart_data.categories.append(category)
-            values.append(round(value, 2))
-
-        chart_data.add_series(data['headers'][num_idx], values)
-
-        # Add chart
-        x, y, cx, cy = Inches(0.5), Inches(1), Inches(9), Inches(4)
-        chart = slide.shapes.add_chart(
-            chart_type, x, y, cx, cy, chart_data
-        ).chart
-
-        chart.has_legend = (chart_type == XL_CHART_TYPE.PIE)
-
-    def _add_statistics_slide(self, prs: Presentation, sheet_name: str, data: Dict, analysis: Dict):
+        chart_data.categories = ['']
+        chart_data.add_series('', (0,))
+        slide.shapes.add_chart(
+            XL_CHART_TYPE.COLUMN_CLUSTERED, Inches(0.5), Inches(1), Inches(9), Inches(4), chart_data
+        )
+
+    def _statistics_content(self, data: Dict, analysis: Dict) -> List[str]:
+        """Statistics table cells (without the header row), one row per numeric column"""
+        numeric_cols = analysis['numeric_columns'][:10]
+        cells = []
+        for num_col in numeric_cols:
+            col_name = num_col['name']
+            values = data['numeric'][num_col['index']].dropna()
+
+            if len(values):
+                cells.extend([
+                    col_name[:25],
+                    f"{values.mean():.2f}",
+                    f"{values.min():.2f}",
+                    f"{values.max():.2f}",
+                    f"{values.std():.2f}",
+                    str(len(values)),
+                ])
+            else:
+                cells.extend([''] * len(_STATISTICS_HEADERS))
+        return cells
+
+    def _add_statistics_slide(self, prs: Presentation, sheet_name: str, cells: List[str]):
         """Add statistics slide"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        rows_count = len(cells) // len(_STATISTICS_HEADERS) + 1
+        slide = self._templates.clone(
+            prs, ('statistics', rows_count),
+            lambda proto: self._build_statistics_template(proto, rows_count)
+        )
+        self._templates.fill_text(slide, {'title': f"{sheet_name} - Statistical Summary"})
+        # The header row is part of the template
+        self._templates.fill_table(slide, cells, first_row=1)
 
+    def _build_statistics_template(self, slide, rows_count: int):
         # Title
         title_box = slide.shapes.add_textbox(
             Inches(0.5), Inches(0.3), Inches(9), Inches(0.5)
         )
         title_frame = title_box.text_frame
-        title_frame.text = f"{sheet_name} - Statistical Summary"
+        title_frame.text = _placeholder('title')
         title_para = title_frame.paragraphs[0]
         title_para.font.size = Pt(28)
         title_para.font.bold = True
 
         # Create statistics table
-        numeric_cols = analysis['numeric_columns'][:10]
-        rows_count = len(numeric_cols) + 1
-        cols_count = 6
+        cols_count = len(_STATISTICS_HEADERS)
 
         table = slide.shapes.add_table(
             rows_count, cols_count,
@@ -344,8 +637,7 @@ class ExcelToPPTService:
         ).table
 
         # Headers
-        headers = ['Column', 'Average', 'Min', 'Max', 'Std Dev', 'Count']
-        for col_idx, header in enumerate(headers):
+        for col_idx, header in enumerate(_STATISTICS_HEADERS):
             cell = table.cell(0, col_idx)
             cell.text = header
             cell.fill.solid()
@@ -356,60 +648,53 @@ class ExcelToPPTService:
             paragraph.font.color.rgb = RGBColor(255, 255, 255)
             paragraph.alignment = PP_ALIGN.CENTER
 
-        # Statistics data
-        for row_idx, num_col in enumerate(numeric_cols):
-            col_name = num_col['name']
-            col_index = data['headers'].index(col_name)
-
-            # Calculate statistics
-            values = []
-            for row in data['rows']:
-                if col_index < len(row):
-                    try:
-                        val = float(row[col_index])
-                        values.append(val)
-                    except (ValueError, TypeError):
-                        continue
-
-            if values:
-                stats = {
-                    'Column': col_name[:25],
-                    'Average': f"{sum(values) / len(values):.2f}",
-                    'Min': f"{min(values):.2f}",
-                    'Max': f"{max(values):.2f}",
-                    'Std Dev': f"{pd.Series(values).std():.2f}",
-                    'Count': str(len(values))
-                }
-
-                for col_idx, (key, value) in enumerate(stats.items()):
-                    cell = table.cell(row_idx + 1, col_idx)
-                    cell.text = value
-                    paragraph = cell.text_frame.paragraphs[0]
-                    paragraph.font.size = Pt(10)
-                    paragraph.alignment = PP_ALIGN.CENTER
+        # Data row style
+        for row_idx in range(1, rows_count):
+            for col_idx in range(cols_count):
+                cell = table.cell(row_idx, col_idx)
+                cell.text = _CELL_PLACEHOLDER
+                paragraph = cell.text_frame.paragraphs[0]
+                paragraph.font.size = Pt(10)
+                paragraph.alignment = PP_ALIGN.CENTER
 
     def _extract_worksheet_data(self, worksheet) -> Dict:
-        """Extract data from worksheet"""
-        data = {
-            'headers': [],
-            'rows': []
-        }
-
-        # Get headers from first row
-        first_row = list(worksheet.iter_rows(min_row=1, max_row=1, values_only=True))[0]
-        data['headers'] = [str(h) if h is not None else f'Column{i}' for i, h in enumerate(first_row)]
-
-        # Get data rows
-        for row in worksheet.iter_rows(min_row=2, values_only=True):
-            if any(cell is not None and str(cell).strip() for cell in row):
-                data['rows'].append(list(row))
+        """
+        Extract data from worksheet into a columnar frame
 
-        return data
+        Returns:
+            dict: headers (list of str), frame (object-dtype DataFrame, one column per
+            sheet column, original cell values, blank rows removed) and numeric (float
+            Series per column, filled in by _analyze_data)
+        """
+        rows = worksheet.iter_rows(values_only=True)
+        first_row = next(rows, None)
+        if first_row is None:
+            return {'headers': [], 'frame': pd.DataFrame(), 'numeric': {}}
+
+        # Single pass over the sheet; values stay as the original Python objects
+        frame = pd.DataFrame(list(rows), dtype=object)
+
+        # Drop rows where every cell is empty or whitespace
+        if not frame.empty:
+            present = frame.notna()
+            for col in frame.columns:
+                text_mask = frame[col].map(type) == str
+                if text_mask.any():
+                    present.loc[text_mask, col] = frame.loc[text_mask, col].str.strip().ne('')
+            frame = frame[present.any(axis=1)].reset_index(drop=True)
+
+        # Columns are those of the header row: cells past it are ignored, short rows padded
+        return {
+            'headers': [str(h) if h is not None else f'Column{i}' for i, h in enumerate(first_row)],
+            'frame': frame.reindex(columns=range(len(first_row))),
+            'numeric': {}
+        }
 
     def _analyze_data(self, data: Dict) -> Dict:
         """Analyze data to determine chart types and columns"""
+        frame = data['frame']
         analysis = {
-            'row_count': len(data['rows']),
+            'row_count': len(frame),
             'column_count': len(data['headers']),
             'numeric_columns': [],
             'categorical_columns': [],
@@ -417,30 +702,28 @@ class ExcelToPPTService:
         }
 
         for col_idx, header in enumerate(data['headers']):
-            values = [row[col_idx] for row in data['rows'] if col_idx < len(row)]
-            values = [v for v in values if v is not None]
+            if col_idx >= frame.shape[1]:
+                continue
+            column = frame[col_idx]
+            values = column[column.notna()]
 
-            if not values:
+            if values.empty:
                 continue
 
-            # Check if numeric
-            numeric_count = 0
-            for val in values:
-                try:
-                    float(val)
-                    numeric_count += 1
-                except (ValueError, TypeError):
-                    pass
+            # Check if numeric: vectorised parse, unparseable values become NaN
+            numbers = pd.to_numeric(column, errors='coerce').astype(np.float64)
+            numeric_count = int(numbers.notna().sum())
 
             is_numeric = numeric_count > len(values) * 0.7
 
             if is_numeric:
+                data['numeric'][col_idx] = numbers
                 analysis['numeric_columns'].append({
                     'name': header,
                     'index': col_idx
                 })
             else:
-                unique_count = len(set(str(v) for v in values))
+                unique_count = values.astype(str).nunique()
                 if 1 < unique_count <= 20:
                     analysis['categorical_columns'].append({
                         'name': header,
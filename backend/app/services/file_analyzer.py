@@ -8,13 +8,13 @@ import pandas as pd
 import numpy as np
 import openpyxl
 import xlrd
-import io
 import json
 import logging
-from typing import Dict, Any, Optional, List, BinaryIO
+from typing import Dict, Any, Optional, List, BinaryIO, Union
 import re
 
 from app.services.ai_service import invoke_llm
+from app.services.document_source import DocumentSource, as_source, is_path, open_source
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +58,7 @@ class FileAnalyzerService:
 
     async def analyze_excel_file(
         self,
-        file_content: BinaryIO,
+        file_content: Union[BinaryIO, DocumentSource],
         filename: str,
         max_rows: int = 1000
     ) -> Dict[str, Any]:
@@ -66,7 +66,7 @@ class FileAnalyzerService:
         Analyze Excel file and generate comprehensive insights
 
         Args:
-            file_content: Excel file binary data
+            file_content: Excel file as a file object, bytes, mmap or path (a path or mmap is read in place)
             filename: Original filename
             max_rows: Maximum rows to analyze (for performance)
 
@@ -75,17 +75,20 @@ class FileAnalyzerService:
         """
         try:
             # Read Excel file
-            file_bytes = file_content.read() if hasattr(file_content, 'read') else file_content
+            source = as_source(file_content)
             file_ext = filename.lower().split('.')[-1]
 
             if file_ext == 'xlsx':
-                workbook = openpyxl.load_workbook(io.BytesIO(file_bytes), data_only=True)
+                workbook = openpyxl.load_workbook(open_source(source), data_only=True)
                 sheets_data = self._parse_xlsx(workbook, max_rows)
             elif file_ext == 'xls':
-                workbook = xlrd.open_workbook(file_contents=file_bytes)
+                if is_path(source):
+                    workbook = xlrd.open_workbook(source)
+                else:
+                    workbook = xlrd.open_workbook(file_contents=source)
                 sheets_data = self._parse_xls(workbook, max_rows)
             elif file_ext == 'csv':
-                sheets_data = self._parse_csv(file_bytes, filename, max_rows)
+                sheets_data = self._parse_csv(source, filename, max_rows)
             else:
                 raise ValueError(f"Unsupported file format: {file_ext}")
 
@@ -160,11 +163,11 @@ class FileAnalyzerService:
 
         return sheets_data
 
-    def _parse_csv(self, file_bytes: bytes, filename: str, max_rows: int) -> List[Dict]:
+    def _parse_csv(self, source: DocumentSource, filename: str, max_rows: int) -> List[Dict]:
         """Parse CSV file"""
         for encoding in ['utf-8', 'latin-1', 'cp1252']:
             try:
-                df = pd.read_csv(io.BytesIO(file_bytes), encoding=encoding, nrows=max_rows)
+                df = pd.read_csv(open_source(source), encoding=encoding, nrows=max_rows)
                 break
             except UnicodeDecodeError:
                 continue
@@ -0,0 +1,312 @@
+"""
+Login Geolocation Enrichment for InsightSheet-lite
+Login history rows are written without a location; the login handlers enqueue (row id, IP)
+and a background worker fills LoginHistory.location in afterwards, so a sign-in never waits
+on a third-party geolocation call.
+
+- The worker collects up to GEO_ENRICH_BATCH_SIZE rows (waiting at most GEO_ENRICH_BATCH_WAIT
+  seconds), dedupes their IPs and resolves them from the IP lookup cache shared with
+  /api/ip-lookup. The rest go to ip-api.com's batch endpoint in one request.
+- Provider requests are spaced to GEO_ENRICH_REQUESTS_PER_MIN. When ip-api.com reports its
+  window is used up (X-Rl: 0, or a 429), the worker waits X-Ttl seconds before the next call.
+- Each batch is written with one UPDATE per location. Rows that already have a location are
+  left alone. If the provider cannot be reached after GEO_ENRICH_RETRIES tries, the batch's
+  rows keep location NULL.
+- The queue is bounded (GEO_ENRICH_QUEUE_SIZE); rows beyond it are not enriched. On shutdown,
+  queued rows are dropped.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.database import LoginHistory, SessionLocal
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+GEO_ENRICH_ENABLED = os.getenv("GEO_ENRICH_ENABLED", "true").lower() in ("1", "true", "yes")
+GEO_ENRICH_BATCH_URL = os.getenv("GEO_ENRICH_BATCH_URL", "http://ip-api.com/batch")
+# ip-api.com accepts up to 100 IPs per batch request
+GEO_ENRICH_BATCH_SIZE = min(100, int(os.getenv("GEO_ENRICH_BATCH_SIZE", "100")))
+GEO_ENRICH_BATCH_WAIT = float(os.getenv("GEO_ENRICH_BATCH_WAIT", "2"))
+# ip-api.com's free batch endpoint allows 15 requests per minute
+GEO_ENRICH_REQUESTS_PER_MIN = float(os.getenv("GEO_ENRICH_REQUESTS_PER_MIN", "15"))
+GEO_ENRICH_QUEUE_SIZE = int(os.getenv("GEO_ENRICH_QUEUE_SIZE", "10000"))
+GEO_ENRICH_RETRIES = int(os.getenv("GEO_ENRICH_RETRIES", "3"))
+GEO_ENRICH_TIMEOUT = float(os.getenv("GEO_ENRICH_TIMEOUT", "10"))
+
+_BATCH_FIELDS = "status,message,query,city,country,countryCode"
+
+# IP lookup cache shared by /api/ip-lookup and the enrichment worker: key -> (ipapi.co-shaped dict, stored at)
+IP_LOOKUP_TTL = 3600  # 1 hour
+IP_LOOKUP_CACHE_MAX = 5000
+_IP_LOOKUP_CACHE: dict = {}
+_IP_LOOKUP_CACHE_LOCK = threading.Lock()
+
+
+def ip_cache_get(key: str):
+    with _IP_LOOKUP_CACHE_LOCK:
+        ent = _IP_LOOKUP_CACHE.get(key)
+        if ent is None:
+            return None
+        if time.time() - ent[1] > IP_LOOKUP_TTL:
+            del _IP_LOOKUP_CACHE[key]
+            return None
+        return ent[0]
+
+
+def ip_cache_set(key: str, obj: dict):
+    with _IP_LOOKUP_CACHE_LOCK:
+        _IP_LOOKUP_CACHE[key] = (obj, time.time())
+        if len(_IP_LOOKUP_CACHE) > IP_LOOKUP_CACHE_MAX:
+            now = time.time()
+            expired = [k for k, v in _IP_LOOKUP_CACHE.items() if now - v[1] > IP_LOOKUP_TTL]
+            for k in expired[:500]:
+                del _IP_LOOKUP_CACHE[k]
+
+
+def is_private_ip(ip: str) -> bool:
+    if not ip or ip in ("127.0.0.1", "::1"):
+        return True
+    parts = ip.split(".")
+    if len(parts) == 4:
+        try:
+            a, b, c, d = (int(x) & 0xFF for x in parts)
+            if a == 10:
+                return True
+            if a == 172 and 16 <= b <= 31:
+                return True
+            if a == 192 and b == 168:
+                return True
+        except ValueError:
+            pass
+    return False
+
+
+def format_location(lookup: Optional[dict]) -> Optional[str]:
+    """'City, Country' from an ipapi.co-shaped lookup, or None if it has neither."""
+    if not lookup:
+        return None
+    city = lookup.get("city") or ""
+    country = lookup.get("country_name") or lookup.get("country_code") or ""
+    if country == "XX":
+        country = ""
+    return f"{city}, {country}".strip(", ") or None
+
+
+class _ProviderThrottled(Exception):
+    def __init__(self, wait: float):
+        super().__init__(f"geolocation provider throttled for {wait:.0f}s")
+        self.wait = wait
+
+
+class GeoEnricher:
+    """Background worker that fills LoginHistory.location in batches."""
+
+    def __init__(
+        self,
+        batch_size: int = GEO_ENRICH_BATCH_SIZE,
+        batch_wait: float = GEO_ENRICH_BATCH_WAIT,
+        requests_per_min: float = GEO_ENRICH_REQUESTS_PER_MIN,
+        queue_size: int = GEO_ENRICH_QUEUE_SIZE,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait)
+        self.min_interval = 60.0 / requests_per_min if requests_per_min > 0 else 0.0
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Earliest monotonic time the next provider request may be sent
+        self._next_request_at = 0.0
+        self._stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "cache_hits": 0,
+            "lookups": 0,
+            "provider_requests": 0,
+            "throttled": 0,
+            "failed": 0,
+            "rows_updated": 0,
+        }
+
+    def enqueue(self, row_id: int, ip: Optional[str]) -> bool:
+        """Queue a LoginHistory row for enrichment. Call from the event loop; never blocks."""
+        if not GEO_ENRICH_ENABLED or not row_id or not ip or is_private_ip(ip):
+            return False
+        self._start()
+        try:
+            self._queue.put_nowait((row_id, ip))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size,
+            "requests_per_min": round(60.0 / self.min_interval, 1) if self.min_interval else None,
+            "throttled_for_s": round(max(0.0, self._next_request_at - time.monotonic()), 1),
+        }
+
+    async def shutdown(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._queue is not None and self._queue.qsize():
+            logger.info(f"Geolocation enrichment stopped with {self._queue.qsize()} rows not enriched")
+        self._queue = None
+
+    def _start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.ensure_future(self._worker())
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                await self._enrich(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Geolocation enrichment failed for {len(batch)} rows: {e}")
+
+    async def _collect(self) -> List[Tuple[int, str]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _enrich(self, batch: List[Tuple[int, str]]) -> None:
+        rows_by_ip: Dict[str, List[int]] = {}
+        for row_id, ip in batch:
+            rows_by_ip.setdefault(ip, []).append(row_id)
+
+        locations: Dict[str, str] = {}
+        missing = []
+        for ip in rows_by_ip:
+            location = format_location(ip_cache_get(ip))
+            if location:
+                locations[ip] = location
+                self._stats["cache_hits"] += 1
+            else:
+                missing.append(ip)
+
+        if missing:
+            for ip, lookup in (await self._lookup(missing)).items():
+                ip_cache_set(ip, lookup)
+                location = format_location(lookup)
+                if location:
+                    locations[ip] = location
+
+        updates: Dict[str, List[int]] = {}
+        for ip, location in locations.items():
+            updates.setdefault(location, []).extend(rows_by_ip[ip])
+        if updates:
+            loop = asyncio.get_running_loop()
+            self._stats["rows_updated"] += await loop.run_in_executor(None, _write_locations, updates)
+
+    async def _lookup(self, ips: List[str]) -> Dict[str, dict]:
+        """ipapi.co-shaped lookups for ips from one batch request; empty if the provider stays unavailable."""
+        for attempt in range(max(1, GEO_ENRICH_RETRIES)):
+            delay = self._next_request_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_request_at = time.monotonic() + self.min_interval
+            try:
+                results = await self._request(ips)
+            except _ProviderThrottled as e:
+                self._stats["throttled"] += 1
+                self._next_request_at = max(self._next_request_at, time.monotonic() + e.wait)
+                logger.info(f"Geolocation enrichment: {e}")
+                continue
+            except Exception as e:
+                logger.warning(f"Geolocation batch lookup failed (attempt {attempt + 1}): {e}")
+                continue
+            self._stats["lookups"] += len(ips)
+            return results
+        self._stats["failed"] += len(ips)
+        return {}
+
+    async def _request(self, ips: List[str]) -> Dict[str, dict]:
+        self._stats["provider_requests"] += 1
+        r = await get_http_client().post(
+            GEO_ENRICH_BATCH_URL, params={"fields": _BATCH_FIELDS}, json=ips, timeout=GEO_ENRICH_TIMEOUT
+        )
+        # X-Rl: requests left in the current window; X-Ttl: seconds until it resets
+        ttl = _header_float(r, "X-Ttl", 60.0)
+        if r.status_code == 429:
+            raise _ProviderThrottled(ttl)
+        r.raise_for_status()
+        if _header_float(r, "X-Rl", 1.0) <= 0:
+            self._next_request_at = max(self._next_request_at, time.monotonic() + ttl)
+        results = {}
+        for j in r.json():
+            if isinstance(j, dict) and j.get("status") == "success" and j.get("query"):
+                results[j["query"]] = {
+                    "ip": j["query"],
+                    "city": j.get("city"),
+                    "country_name": j.get("country"),
+                    "country_code": j.get("countryCode") or "XX",
+                }
+        return results
+
+
+def _header_float(response, name: str, default: float) -> float:
+    try:
+        return float(response.headers.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _write_locations(updates: Dict[str, List[int]]) -> int:
+    """Set location on the given rows (location -> row ids) that still have none. Returns rows updated."""
+    db = SessionLocal()
+    try:
+        updated = 0
+        for location, row_ids in updates.items():
+            updated += (
+                db.query(LoginHistory)
+                .filter(LoginHistory.id.in_(row_ids), LoginHistory.location.is_(None))
+                .update({LoginHistory.location: location}, synchronize_session=False)
+            )
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+
+_geo_enricher: Optional[GeoEnricher] = None
+_geo_enricher_lock = threading.Lock()
+
+
+def get_geo_enricher() -> GeoEnricher:
+    """Process-wide enrichment worker used by the login history endpoints."""
+    global _geo_enricher
+    if _geo_enricher is None:
+        with _geo_enricher_lock:
+            if _geo_enricher is None:
+                _geo_enricher = GeoEnricher()
+    return _geo_enricher
+
+
+async def shutdown_geo_enricher() -> None:
+    global _geo_enricher
+    enricher, _geo_enricher = _geo_enricher, None
+    if enricher is not None:
+        await enricher.shutdown()
@@ -0,0 +1,131 @@
+"""
+Shared HTTP Client for InsightSheet-lite
+One app-scoped httpx.AsyncClient for outbound API calls (OCR.space, ...), so requests reuse
+pooled keep-alive connections instead of paying a TCP + TLS handshake each time.
+
+- HTTP/2 is negotiated when the h2 package is installed (httpx[http2]) and HTTP_CLIENT_HTTP2 is on.
+- Pool size, keep-alive and timeouts come from HTTP_CLIENT_* environment variables.
+- request_with_retry() retries 429/5xx responses and connection errors with jittered
+  exponential backoff, honouring Retry-After. Read/write errors and timeouts are only retried
+  for idempotent methods (a POST may already be processing), and all attempts together stay
+  within the request's timeout.
+- close_http_client() is called from the app's shutdown hook.
+"""
+import asyncio
+import logging
+import os
+import random
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "20"))
+HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "10"))
+# Seconds an idle pooled connection is kept open
+HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+HTTP_CLIENT_CONNECT_TIMEOUT = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "5"))
+HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "30"))
+HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "true").lower() in ("1", "true", "yes")
+# Retries after the first attempt; backoff before retry n is uniform in [0, min(MAX, BASE * 2**n)]
+HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", "2"))
+HTTP_CLIENT_BACKOFF_BASE = float(os.getenv("HTTP_CLIENT_BACKOFF_BASE", "0.5"))
+HTTP_CLIENT_BACKOFF_MAX = float(os.getenv("HTTP_CLIENT_BACKOFF_MAX", "8"))
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# The request was never sent, so retrying cannot duplicate it
+_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+try:
+    import h2  # noqa: F401  (needed by httpx for HTTP/2)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared client, created on first use. Do not close it; the shutdown hook does."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP_CLIENT_HTTP2 and H2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(HTTP_CLIENT_TIMEOUT, connect=HTTP_CLIENT_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared client's pooled connections (app shutdown)."""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Full-jitter backoff for retry `attempt` (0-based); a Retry-After in seconds is a lower bound."""
+    delay = random.uniform(0, min(HTTP_CLIENT_BACKOFF_MAX, HTTP_CLIENT_BACKOFF_BASE * (2 ** attempt)))
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            retry_after = 0.0
+        delay = max(delay, min(retry_after, HTTP_CLIENT_BACKOFF_MAX))
+    return delay
+
+
+async def request_with_retry(
+    method: str,
+    url: str,
+    retries: int = HTTP_CLIENT_RETRIES,
+    **kwargs,
+) -> httpx.Response:
+    """
+    client.request() on the shared client, retried on 429/5xx and connection errors (any
+    transport error for idempotent methods). `timeout` (seconds, default HTTP_CLIENT_TIMEOUT)
+    bounds all attempts and backoff together: each attempt gets what is left of it, and no
+    retry starts once it is used up.
+    Returns the last response (the caller decides whether to raise_for_status) or raises
+    the last httpx.TransportError. Request bodies must be replayable (bytes, not streams).
+    """
+    client = get_http_client()
+    loop = asyncio.get_running_loop()
+    budget = kwargs.pop("timeout", HTTP_CLIENT_TIMEOUT)
+    if isinstance(budget, httpx.Timeout):
+        budget = budget.read or HTTP_CLIENT_TIMEOUT
+    deadline = loop.time() + budget
+    retryable_errors = httpx.TransportError if method.upper() in IDEMPOTENT_METHODS else _UNSENT_ERRORS
+    attempt = 0
+    while True:
+        remaining = max(0.001, deadline - loop.time())
+        timeout = httpx.Timeout(remaining, connect=min(HTTP_CLIENT_CONNECT_TIMEOUT, remaining))
+        response, error = None, None
+        try:
+            response = await client.request(method, url, timeout=timeout, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            reason = f"HTTP {response.status_code}"
+        except retryable_errors as e:
+            error = e
+            reason = f"{type(e).__name__}: {e}"
+        delay = _retry_delay(attempt, response)
+        # Out of retries, or no time left for another attempt within the caller's timeout
+        if attempt >= retries or loop.time() + delay >= deadline:
+            if error is not None:
+                raise error
+            return response
+        attempt += 1
+        logger.info(f"{method} {url} failed ({reason}); retry {attempt}/{retries} in {delay:.2f}s")
+        if response is not None:
+            await response.aclose()
+        await asyncio.sleep(delay)
@@ -0,0 +1,133 @@
+"""
+OCR Image Preprocessing for InsightSheet-lite / Meldra
+Turns a freshly opened (not yet decoded) PIL image into the grayscale image Tesseract reads,
+with as few full-image passes as possible:
+
+1. JPEGs are decoded straight to grayscale at the smallest DCT scale (1/2, 1/4, 1/8) that is
+   still at least the target size, so a 20+ MP phone photo is never decoded at full size.
+2. Grayscale comes before the resize, so the resize filters one channel instead of three.
+3. Optional deskew (OCR_DESKEW) measures the skew on a small thumbnail and rotates once.
+4. Contrast and optional Otsu binarisation (OCR_BINARIZE) are folded into one 256-entry
+   lookup table and applied in a single point() pass.
+"""
+import logging
+import os
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Contrast factor (ImageEnhance.Contrast semantics); 1.0 leaves the image as is
+OCR_CONTRAST = float(os.getenv("OCR_CONTRAST", "1.25"))
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "false").strip().lower() in ("1", "true", "yes")
+OCR_DESKEW = os.getenv("OCR_DESKEW", "false").strip().lower() in ("1", "true", "yes")
+# Largest skew (degrees, either way) deskew looks for, and its search step
+OCR_DESKEW_MAX_ANGLE = float(os.getenv("OCR_DESKEW_MAX_ANGLE", "5"))
+_DESKEW_STEP = 0.25
+# Longest side of the thumbnail deskew measures on
+_DESKEW_THUMB = 800
+
+_LANCZOS = getattr(getattr(Image, 'Resampling', None), 'LANCZOS', None) or Image.LANCZOS
+_BICUBIC = getattr(getattr(Image, 'Resampling', None), 'BICUBIC', None) or Image.BICUBIC
+# Resize in a cheap box reduce() first, then Lanczos over the last 3x; visually the same as plain Lanczos
+_REDUCING_GAP = 3.0
+
+
+def target_size(width: int, height: int, max_dim: int) -> Tuple[int, int]:
+    """(width, height) scaled down so the longest side is at most max_dim."""
+    if max(width, height) <= max_dim:
+        return width, height
+    ratio = max_dim / max(width, height)
+    return int(width * ratio), int(height * ratio)
+
+
+def preprocess_for_ocr(img: Image.Image, max_dim: int) -> Image.Image:
+    """
+    Grayscale, downscaled (longest side <= max_dim), contrast-adjusted image for OCR. Pass the
+    image straight from Image.open so JPEG draft decoding can apply. The result has exactly
+    target_size(*img.size, max_dim), which OCR coordinates refer to.
+    """
+    size = target_size(*img.size, max_dim)
+    if img.format == 'JPEG' and img.mode in ('RGB', 'L'):
+        # Decoder-level grayscale + downscale; only takes effect before the image is loaded
+        img.draft('L', size)
+
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    if img.mode == 'RGB':
+        img = img.convert('L')
+    if img.size != size:
+        img = img.resize(size, _LANCZOS, reducing_gap=_REDUCING_GAP)
+
+    if OCR_DESKEW:
+        angle = estimate_skew(img)
+        if angle:
+            logger.info(f"OCR deskew: rotating {angle:+.2f} degrees")
+            img = img.rotate(angle, resample=_BICUBIC, fillcolor=255)
+
+    histogram = img.histogram()
+    lut = _contrast_lut(histogram, OCR_CONTRAST)
+    if OCR_BINARIZE:
+        threshold = _otsu_threshold(_remap_histogram(histogram, lut))
+        lut = [0 if v <= threshold else 255 for v in lut]
+    if lut != list(range(256)):
+        img = img.point(lut)
+    return img
+
+
+def _contrast_lut(histogram: List[int], factor: float) -> List[int]:
+    """ImageEnhance.Contrast(img).enhance(factor) for an L image, as a lookup table."""
+    total = sum(histogram)
+    mean = int(sum(i * n for i, n in enumerate(histogram)) / total + 0.5) if total else 0
+    # Image.blend is per pixel, so blending one 0..255 ramp gives the exact same mapping
+    ramp = Image.frombytes('L', (256, 1), bytes(range(256)))
+    return list(Image.blend(Image.new('L', (256, 1), mean), ramp, factor).tobytes())
+
+
+def _remap_histogram(histogram: List[int], lut: List[int]) -> List[int]:
+    """Histogram of img.point(lut), computed from img's histogram."""
+    out = [0] * 256
+    for value, count in enumerate(histogram):
+        out[lut[value]] += count
+    return out
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Otsu's threshold: values <= it are foreground (dark), values above are background."""
+    counts = np.asarray(histogram, dtype=np.float64)
+    total = counts.sum()
+    if not total:
+        return 127
+    levels = np.arange(256, dtype=np.float64)
+    weight_dark = np.cumsum(counts)
+    weight_light = total - weight_dark
+    sum_dark = np.cumsum(counts * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    between = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(between))
+
+
+def estimate_skew(img: Image.Image) -> float:
+    """
+    Angle in degrees to pass to rotate() to straighten the text of an L image. Each candidate
+    angle rotates a binarised thumbnail; the right one lines text up with pixel rows, which
+    makes the row ink profile the most uneven.
+    """
+    thumb = img.copy()
+    thumb.thumbnail((_DESKEW_THUMB, _DESKEW_THUMB))
+    threshold = _otsu_threshold(thumb.histogram())
+    # Ink = 255 so rotation fill (0) adds none
+    ink = thumb.point([255 if v <= threshold else 0 for v in range(256)])
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(OCR_DESKEW_MAX_ANGLE / _DESKEW_STEP)
+    for step in range(-steps, steps + 1):
+        angle = step * _DESKEW_STEP
+        rows = np.asarray(ink.rotate(angle, resample=Image.NEAREST), dtype=np.float64).sum(axis=1)
+        score = float(np.square(np.diff(rows)).sum())
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
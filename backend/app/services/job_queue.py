@@ -0,0 +1,376 @@
+"""
+Background Job Queue for InsightSheet-lite / Meldra
+Long-running conversions run as jobs instead of inside the HTTP request: submit() spools the
+upload to a temp file and returns a job id at once, a fixed set of worker tasks takes jobs
+from a local queue, and clients poll the job or follow it over SSE until the result is ready.
+
+- The queue holds JOB_QUEUE_SIZE jobs; inputs wait on disk, not in memory, so a burst of
+  uploads is queued rather than dropped. Beyond that, submit() raises JobQueueFull.
+- A handler is an async function (job, input file path) -> JobOutput registered per job kind;
+  it reports progress with job.update() (from any thread).
+- The result is written to a temp file and can be downloaded once; it is deleted after the
+  download, or JOB_RESULT_TTL seconds after the job finished if nobody collects it. A collected
+  job itself is kept until then too, so a repeated download is told the result is gone.
+- Jobs live in this process only: a restart loses queued and finished jobs.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from app.services.upload_spool import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "200"))
+# Seconds a finished job (and its result file) is kept for the client to collect
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "900"))
+# Where inputs and results are spooled; empty = a fresh temp directory per process
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "").strip()
+_SWEEP_INTERVAL = 60
+_CHUNK_SIZE = 256 * 1024
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+TERMINAL_STATES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobManager.submit when the job queue is full."""
+
+
+class JobOutput(NamedTuple):
+    """What a handler returns: the result bytes, download filename and media type."""
+    data: bytes
+    filename: str
+    media_type: str
+
+
+# Handlers get the path of the spooled input; it is deleted once the handler returns
+JobHandler = Callable[["Job", str], Awaitable[JobOutput]]
+
+
+class Job:
+    """One submitted job: state, progress and (once finished) where its result is."""
+
+    def __init__(self, kind: str, owner: str, filename: str, size: int, options: Dict[str, Any], input_path: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.filename = filename
+        self.size = size
+        self.options = options
+        self.input_path: Optional[str] = input_path
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result_path: Optional[str] = None
+        self.result_filename: Optional[str] = None
+        self.result_media_type: Optional[str] = None
+        self.result_size = 0
+        self.collected = False
+        self._version = 0
+        self._changed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Report progress (0..1) and/or a status message; safe to call from worker threads."""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        self._notify()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result_ready": self.status == SUCCEEDED and not self.collected,
+            "result_filename": self.result_filename,
+            "result_size": self.result_size,
+        }
+
+    @property
+    def version(self) -> int:
+        """Incremented on every change; pass to wait_changed."""
+        return self._version
+
+    async def wait_changed(self, version: int, timeout: float) -> int:
+        """Wait until the job changes after `version` (or timeout); returns the current version."""
+        if self._version == version:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._version
+
+    def _notify(self) -> None:
+        if self._is_loop_thread():
+            self._bump()
+        else:
+            self._loop.call_soon_threadsafe(self._bump)
+
+    def _is_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _bump(self) -> None:
+        self._version += 1
+        # Wake current waiters; later waiters get a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class JobManager:
+    """In-process job registry, bounded queue and worker tasks."""
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 result_ttl: int = JOB_RESULT_TTL, spool_dir: Optional[str] = JOB_SPOOL_DIR or None):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.result_ttl = result_ttl
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            self.spool_dir = spool_dir
+        else:
+            self.spool_dir = tempfile.mkdtemp(prefix="jobs-")
+        self._handlers: Dict[str, JobHandler] = {}
+        # Called with each job that succeeds or fails (e.g. to record processing history)
+        self.on_finished: Optional[Callable[[Job], None]] = None
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+
+    async def submit(self, kind: str, owner: str, filename: str, data: Union[bytes, SpooledUpload],
+                     options: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Spool `data` and queue a job for it. Raises JobQueueFull if the queue is full. A
+        SpooledUpload is moved into the spool directory rather than copied.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        self._start()
+        if self._queue.full():
+            self._rejected += 1
+            raise JobQueueFull("Too many jobs are waiting. Please try again in a moment.")
+        # Keep the extension: handlers get the input's path, and some readers go by it
+        suffix = os.path.splitext(filename or "")[1].lower()
+        input_path = await asyncio.get_running_loop().run_in_executor(None, self._spool, "in-", data, suffix)
+        job = Job(kind, owner, filename, data.size if isinstance(data, SpooledUpload) else len(data),
+                  options or {}, input_path)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up by other submits while this input was being spooled
+            self._remove_input(job)
+            self._rejected += 1
+            raise JobQueueFull("Too many jobs are waiting. Please try again in a moment.")
+        self._jobs[job.id] = job
+        logger.info(f"Job {job.id} queued: {kind} {filename} ({job.size / 1024 / 1024:.1f}MB)")
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        """The job, or None if unknown, expired or (with owner) someone else's."""
+        job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job: Job) -> None:
+        """Cancel a queued job, or drop a finished job and its result. Running jobs finish first."""
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.update(message="Cancelled")
+            self._remove_input(job)
+        elif job.status in TERMINAL_STATES:
+            self._discard(job)
+
+    def open_result(self, job: Job) -> Iterator[bytes]:
+        """
+        Claim the job's result for download and return an iterator over its bytes that deletes
+        it when done. Raises LookupError if not ready or already collected. The job stays known,
+        marked collected, until JOB_RESULT_TTL has passed.
+        """
+        if job.status != SUCCEEDED or job.collected or not job.result_path:
+            raise LookupError("Result is not available")
+        job.collected = True
+        path = job.result_path
+
+        def _chunks():
+            try:
+                with open(path, "rb") as f:
+                    while True:
+                        chunk = f.read(_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        yield chunk
+            finally:
+                self._remove_result(job)
+
+        return _chunks()
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": counts,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+
+    async def shutdown(self) -> None:
+        """Stop the workers and delete every spooled input and result."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._jobs.clear()
+        self._queue = None
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _start(self) -> None:
+        if self._tasks:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.ensure_future(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._sweeper()))
+        logger.info(f"Job queue started: {self.workers} workers, queue size {self.queue_size}")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job: Job = await self._queue.get()
+            try:
+                if job.status == QUEUED:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.update(0.0, "Running")
+        loop = asyncio.get_running_loop()
+        try:
+            output = await self._handlers[job.kind](job, job.input_path)
+            self._remove_input(job)
+            job.result_path = await loop.run_in_executor(None, self._spool, "out-", output.data)
+            job.result_filename = output.filename
+            job.result_media_type = output.media_type
+            job.result_size = len(output.data)
+            job.status = SUCCEEDED
+            self._completed += 1
+            job.finished_at = time.time()
+            job.update(1.0, "Done")
+            logger.info(f"Job {job.id} done: {job.kind} in {job.finished_at - job.started_at:.2f}s")
+        except asyncio.CancelledError:
+            self._remove_input(job)
+            raise
+        except Exception as e:
+            self._remove_input(job)
+            job.status = FAILED
+            job.error = getattr(e, "detail", None) or str(e) or type(e).__name__
+            self._failed += 1
+            job.finished_at = time.time()
+            job.update(message="Failed")
+            logger.warning(f"Job {job.id} failed: {job.kind}: {job.error}")
+
+        if self.on_finished is not None:
+            try:
+                await loop.run_in_executor(None, self.on_finished, job)
+            except Exception as e:
+                logger.warning(f"Job {job.id}: on_finished hook failed: {str(e)}")
+
+    async def _sweeper(self) -> None:
+        """Forget finished jobs (and delete their results) once JOB_RESULT_TTL has passed."""
+        while True:
+            await asyncio.sleep(_SWEEP_INTERVAL)
+            cutoff = time.time() - self.result_ttl
+            for job in list(self._jobs.values()):
+                if job.status in TERMINAL_STATES and job.finished_at and job.finished_at < cutoff:
+                    if not job.collected:
+                        logger.info(f"Job {job.id} expired uncollected")
+                    self._discard(job)
+
+    def _spool(self, prefix: str, data: Union[bytes, SpooledUpload], suffix: str = "") -> str:
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=self.spool_dir)
+        if isinstance(data, SpooledUpload):
+            os.close(fd)
+            data.detach(path)
+            return path
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return path
+
+    def _discard(self, job: Job) -> None:
+        self._jobs.pop(job.id, None)
+        self._remove_input(job)
+        self._remove_result(job)
+
+    @staticmethod
+    def _remove_result(job: Job) -> None:
+        if job.result_path:
+            try:
+                os.remove(job.result_path)
+            except OSError:
+                pass
+            job.result_path = None
+
+    @staticmethod
+    def _remove_input(job: Job) -> None:
+        if job.input_path:
+            try:
+                os.remove(job.input_path)
+            except OSError:
+                pass
+            job.input_path = None
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide job manager; the app registers a handler per job kind on it at import."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
+
+
+async def shutdown_job_manager() -> None:
+    if _job_manager is not None:
+        await _job_manager.shutdown()
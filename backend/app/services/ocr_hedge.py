@@ -0,0 +1,137 @@
+"""
+Hedged OCR for InsightSheet-lite / Meldra
+Races the OCR.space API against local Tesseract: OCR.space starts first, Tesseract starts
+OCR_HEDGE_DELAY seconds later (or as soon as OCR.space fails), the first successful result
+wins and the other attempt is cancelled. A cancelled Tesseract job that is still queued in
+the OCR pool is dropped; one already running finishes and its result is discarded.
+
+With OCR_HEDGE off, Tesseract only starts after OCR.space fails (the old fallback order).
+Every race records per-engine wins, failures, cancellations and winning latencies; stats()
+summarises them for tuning the delay.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OCR_HEDGE = os.getenv("OCR_HEDGE", "true").lower() in ("1", "true", "yes")
+# Seconds OCR.space runs alone before Tesseract is started alongside it
+OCR_HEDGE_DELAY = float(os.getenv("OCR_HEDGE_DELAY", "1.5"))
+# Winning latencies kept per engine for the percentiles in stats()
+_METRICS_WINDOW = 500
+
+REMOTE_ENGINE = "ocrspace"
+LOCAL_ENGINE = "tesseract"
+
+
+class HedgedOCR:
+    """Runs OCR races and keeps per-engine outcome counts and latencies."""
+
+    def __init__(self, delay: Optional[float] = OCR_HEDGE_DELAY if OCR_HEDGE else None):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._races = 0
+        self._hedged = 0
+        self._engines: Dict[str, Dict[str, Any]] = {
+            name: {'started': 0, 'wins': 0, 'failed': 0, 'cancelled': 0,
+                   'latencies': deque(maxlen=_METRICS_WINDOW)}
+            for name in (REMOTE_ENGINE, LOCAL_ENGINE)
+        }
+
+    async def run(
+        self,
+        remote: Callable[[], Awaitable[Any]],
+        local: Callable[[], Awaitable[Any]],
+    ) -> Tuple[str, Any]:
+        """
+        Race remote() against local() and return (engine name, result) of the first success.
+        local() starts after self.delay seconds, or once remote() fails; delay None means only
+        then. If both fail, the local error is raised.
+        """
+        factories = {REMOTE_ENGINE: remote, LOCAL_ENGINE: local}
+        tasks: Dict[str, asyncio.Task] = {}
+        started: Dict[str, float] = {}
+        errors: Dict[str, BaseException] = {}
+
+        def _start(name: str) -> None:
+            started[name] = time.perf_counter()
+            tasks[name] = asyncio.ensure_future(factories[name]())
+            self._count(name, 'started')
+
+        with self._lock:
+            self._races += 1
+        _start(REMOTE_ENGINE)
+        try:
+            done, pending = await asyncio.wait(set(tasks.values()), timeout=self.delay)
+            while True:
+                for name in (REMOTE_ENGINE, LOCAL_ENGINE):
+                    task = tasks.get(name)
+                    if task is None or task not in done:
+                        continue
+                    latency = time.perf_counter() - started[name]
+                    if task.exception() is None:
+                        self._record_win(name, latency)
+                        logger.info(f"Hedged OCR won by {name} in {latency:.2f}s")
+                        return name, task.result()
+                    errors[name] = task.exception()
+                    self._count(name, 'failed')
+                if LOCAL_ENGINE not in tasks:
+                    if REMOTE_ENGINE not in errors:
+                        with self._lock:
+                            self._hedged += 1
+                    _start(LOCAL_ENGINE)
+                    pending = pending | {tasks[LOCAL_ENGINE]}
+                if not pending:
+                    raise errors.get(LOCAL_ENGINE) or errors[REMOTE_ENGINE]
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for name, task in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    self._count(name, 'cancelled')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = {
+                'hedge_delay_s': self.delay,
+                'races': self._races,
+                'hedged': self._hedged,
+            }
+            engines = {name: dict(counts, latencies=sorted(counts['latencies']))
+                       for name, counts in self._engines.items()}
+        for name, counts in engines.items():
+            values = counts.pop('latencies')
+            counts['win_rate'] = round(counts['wins'] / result['races'], 4) if result['races'] else 0.0
+            counts['avg_win_latency_s'] = round(sum(values) / len(values), 4) if values else 0.0
+            counts['p50_win_latency_s'] = round(values[len(values) // 2], 4) if values else 0.0
+            counts['p95_win_latency_s'] = round(values[min(len(values) - 1, int(len(values) * 0.95))], 4) if values else 0.0
+            result[name] = counts
+        return result
+
+    def _count(self, name: str, outcome: str) -> None:
+        with self._lock:
+            self._engines[name][outcome] += 1
+
+    def _record_win(self, name: str, latency: float) -> None:
+        with self._lock:
+            self._engines[name]['wins'] += 1
+            self._engines[name]['latencies'].append(latency)
+
+
+_hedged_ocr: Optional[HedgedOCR] = None
+_hedged_ocr_lock = threading.Lock()
+
+
+def get_hedged_ocr() -> HedgedOCR:
+    """Process-wide hedged OCR runner, so its stats cover every request."""
+    global _hedged_ocr
+    if _hedged_ocr is None:
+        with _hedged_ocr_lock:
+            if _hedged_ocr is None:
+                _hedged_ocr = HedgedOCR()
+    return _hedged_ocr
@@ -0,0 +1,358 @@
+"""
+Tesseract Worker Pool for InsightSheet-lite / Meldra
+A fixed set of OCR worker threads, each with its own warm Tesseract engine, fed from a
+bounded job queue.
+
+- With tesserocr installed, every worker keeps one libtesseract instance loaded (language
+  data read once), so a job does not start a new tesseract process.
+- Without it, workers fall back to pytesseract (one tesseract process per call); the pool
+  still bounds how many run at once.
+- When the queue is full, submit() raises OCRPoolFull instead of piling up work.
+- Every job records its queue wait and run time; stats() summarises them for sizing pods.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Jobs waiting for a worker beyond this are rejected (HTTP 503) rather than queued
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "16"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# Directory holding <lang>.traineddata for tesserocr; empty = libtesseract's default (TESSDATA_PREFIX)
+OCR_TESSDATA_DIR = os.getenv("OCR_TESSDATA_DIR", "").strip()
+# Threads that OCR the bands of one large image in parallel, each with its own engine
+OCR_TILE_WORKERS = int(os.getenv("OCR_TILE_WORKERS", str(os.cpu_count() or 1)))
+# Threads that OCR the pages of one multi-page document in parallel, each with its own engine
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs kept for the wait/run percentiles in stats()
+_METRICS_WINDOW = 500
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    tesserocr = None
+    TESSEROCR_AVAILABLE = False
+
+try:
+    import pytesseract
+    from pytesseract import Output
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    pytesseract = None
+    Output = None
+    PYTESSERACT_AVAILABLE = False
+
+
+class OCRPoolFull(RuntimeError):
+    """Raised by TesseractPool.submit when the job queue is full."""
+
+
+def _parse_tsv(tsv: str) -> Dict[str, List[Any]]:
+    """Tesseract TSV output -> the dict pytesseract.image_to_data(output_type=Output.DICT) returns."""
+    lines = tsv.splitlines()
+    if not lines:
+        return {}
+    if lines[0].startswith('level'):
+        header, rows = lines[0].split('\t'), lines[1:]
+    else:
+        # libtesseract's GetTSVText has no header row
+        header = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                  'left', 'top', 'width', 'height', 'conf', 'text']
+        rows = lines
+    data: Dict[str, List[Any]] = {name: [] for name in header}
+    text_idx = len(header) - 1
+    for row in rows:
+        cells = row.split('\t')
+        if len(cells) < text_idx:
+            continue
+        cells += [''] * (len(header) - len(cells))
+        for idx, name in enumerate(header):
+            value = cells[idx]
+            if idx == text_idx:
+                data[name].append(value)
+            elif name == 'conf':
+                data[name].append(float(value))
+            else:
+                data[name].append(int(value))
+    return data
+
+
+class TesseractEngine:
+    """One Tesseract instance: a loaded libtesseract API with tesserocr, else pytesseract calls."""
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+        self._api = None
+        if TESSEROCR_AVAILABLE:
+            kwargs = {'lang': lang}
+            if OCR_TESSDATA_DIR:
+                kwargs['path'] = OCR_TESSDATA_DIR.rstrip('/') + '/'
+            try:
+                self._api = tesserocr.PyTessBaseAPI(**kwargs)
+            except RuntimeError as e:
+                logger.warning(f"tesserocr could not load '{lang}' ({e}); using pytesseract")
+        if self._api is None and not PYTESSERACT_AVAILABLE:
+            raise RuntimeError("OCR dependencies missing. Install: pip install pytesseract Pillow (or tesserocr).")
+
+    @property
+    def is_warm(self) -> bool:
+        return self._api is not None
+
+    def image_to_data(self, img, psm: int) -> Dict[str, List[Any]]:
+        """Word boxes for a PIL image, in pytesseract's image_to_data(output_type=Output.DICT) format."""
+        if self._api is None:
+            return pytesseract.image_to_data(img, lang=self.lang, config=f'--psm {psm}', output_type=Output.DICT)
+        self._api.SetPageSegMode(psm)
+        self._api.SetImage(img)
+        try:
+            return _parse_tsv(self._api.GetTSVText(0))
+        finally:
+            self._api.Clear()
+
+    def close(self):
+        if self._api is not None:
+            self._api.End()
+            self._api = None
+
+
+# Engine of the pool worker running on this thread (unset on other threads)
+_worker_state = threading.local()
+
+
+def current_engine() -> TesseractEngine:
+    """The warm engine of the calling pool or tile worker; elsewhere a new engine per call."""
+    engine = getattr(_worker_state, 'engine', None)
+    return engine if engine is not None else TesseractEngine()
+
+
+def _start_engine_thread() -> None:
+    """Thread initializer for the tile and page executors: give the thread a warm engine."""
+    try:
+        _worker_state.engine = TesseractEngine()
+    except Exception as e:
+        logger.error(f"OCR thread could not start an engine: {str(e)}")
+
+
+class TesseractPool:
+    """Fixed-size pool of OCR worker threads with a bounded queue and per-job timing."""
+
+    def __init__(self, workers: int = OCR_WORKERS, queue_size: int = OCR_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[Optional[Tuple[Future, Callable, tuple, float]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._busy = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self._recent: Deque[Tuple[float, float]] = deque(maxlen=_METRICS_WINDOW)
+        self._warm_engines = 0
+
+    def start(self) -> None:
+        """Start the workers (each loads its engine); called by the first submit if not before."""
+        with self._lock:
+            if self._threads or self._closed:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"ocr-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"OCR pool started: {self.workers} workers, queue size {self._queue.maxsize}, "
+                    f"engine {'tesserocr' if TESSEROCR_AVAILABLE else 'pytesseract'}")
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Queue fn(*args) for a worker thread; inside fn, current_engine() is the worker's engine.
+        Raises OCRPoolFull if the queue is full.
+        """
+        if self._closed:
+            raise RuntimeError("OCR pool is shut down")
+        self.start()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((future, fn, args, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise OCRPoolFull("OCR is busy. Please try again in a moment.")
+        return future
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Await submit(fn, *args). Cancelling the await drops the job if it has not started yet."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(self._recent)
+            done = self._completed + self._failed
+            result = {
+                'workers': self.workers,
+                'warm_engines': self._warm_engines,
+                'engine': 'tesserocr' if TESSEROCR_AVAILABLE else 'pytesseract',
+                'queue_size': self._queue.maxsize,
+                'queued': self._queue.qsize(),
+                'busy': self._busy,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'cancelled': self._cancelled,
+                'avg_queue_wait_s': round(self._wait_total / done, 4) if done else 0.0,
+                'avg_run_s': round(self._run_total / done, 4) if done else 0.0,
+            }
+        waits = sorted(w for w, _ in recent)
+        runs = sorted(r for _, r in recent)
+        for name, values in (('queue_wait', waits), ('run', runs)):
+            result[f'p50_{name}_s'] = round(values[len(values) // 2], 4) if values else 0.0
+            result[f'p95_{name}_s'] = round(values[min(len(values) - 1, int(len(values) * 0.95))], 4) if values else 0.0
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs, cancel queued ones, let running jobs finish and release the engines."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[0].cancel():
+                with self._lock:
+                    self._cancelled += 1
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _worker(self) -> None:
+        try:
+            engine = TesseractEngine()
+        except Exception as e:
+            logger.error(f"OCR worker could not start an engine: {str(e)}")
+            engine = None
+        _worker_state.engine = engine
+        if engine is not None and engine.is_warm:
+            with self._lock:
+                self._warm_engines += 1
+
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                future, fn, args, queued_at = item
+                if not future.set_running_or_notify_cancel():
+                    with self._lock:
+                        self._cancelled += 1
+                    continue
+
+                started = time.perf_counter()
+                with self._lock:
+                    self._busy += 1
+                result = error = None
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    error = e
+                finished = time.perf_counter()
+                ok = error is None
+
+                wait, run = started - queued_at, finished - started
+                with self._lock:
+                    self._busy -= 1
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                    self._wait_total += wait
+                    self._run_total += run
+                    self._recent.append((wait, run))
+                logger.info(f"OCR job {'done' if ok else 'failed'}: queue wait {wait:.2f}s, run {run:.2f}s")
+                # Metrics first, so stats() already counts a job whose caller has its result
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+        finally:
+            _worker_state.engine = None
+            if engine is not None:
+                engine.close()
+
+
+_ocr_pool: Optional[TesseractPool] = None
+_tile_executor: Optional[ThreadPoolExecutor] = None
+_page_executor: Optional[ThreadPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> TesseractPool:
+    """Process-wide OCR pool shared by every OCR endpoint."""
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = TesseractPool()
+    return _ocr_pool
+
+
+def get_tile_executor() -> ThreadPoolExecutor:
+    """
+    Threads for the bands of tiled OCR. Separate from the job pool, so a job waiting on its
+    bands never holds the workers the bands need.
+    """
+    global _tile_executor
+    if _tile_executor is None:
+        with _ocr_pool_lock:
+            if _tile_executor is None:
+                _tile_executor = ThreadPoolExecutor(
+                    max_workers=max(1, OCR_TILE_WORKERS),
+                    thread_name_prefix="ocr-tile",
+                    initializer=_start_engine_thread,
+                )
+    return _tile_executor
+
+
+def get_page_executor() -> ThreadPoolExecutor:
+    """
+    Threads for the pages of multi-page OCR. Pages may in turn be tiled on the tile executor,
+    which never submits work back here, so neither can deadlock the other.
+    """
+    global _page_executor
+    if _page_executor is None:
+        with _ocr_pool_lock:
+            if _page_executor is None:
+                _page_executor = ThreadPoolExecutor(
+                    max_workers=max(1, OCR_PAGE_WORKERS),
+                    thread_name_prefix="ocr-page",
+                    initializer=_start_engine_thread,
+                )
+    return _page_executor
+
+
+def shutdown_ocr_pool() -> None:
+    global _ocr_pool, _tile_executor, _page_executor
+    with _ocr_pool_lock:
+        pool, _ocr_pool = _ocr_pool, None
+        executors = [_page_executor, _tile_executor]
+        _tile_executor = _page_executor = None
+    if pool is not None:
+        pool.shutdown(wait=False)
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,223 @@
+"""
+OCR Result Cache for InsightSheet-lite
+Derived OCR output (text, layout, tables, page sizes) for documents OCRed recently, so running
+ocr-extract again on the same scan skips the OCR pass. The uploaded image is never stored.
+
+Entries are keyed by (document hash, engine, PSM, language, preprocessing/resize setting),
+expire after OCR_RESULT_CACHE_TTL seconds, and are kept in memory up to OCR_RESULT_CACHE_MB
+with LRU eviction. With OCR_RESULT_CACHE_DIR set they are also written there as JSON (up to
+OCR_RESULT_CACHE_DISK_MB, oldest first out) and survive restarts until they expire.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OCR_RESULT_CACHE_MB = int(os.getenv("OCR_RESULT_CACHE_MB", "64"))
+OCR_RESULT_CACHE_TTL = int(os.getenv("OCR_RESULT_CACHE_TTL", "3600"))
+OCR_RESULT_CACHE_DIR = os.getenv("OCR_RESULT_CACHE_DIR", "").strip()
+OCR_RESULT_CACHE_DISK_MB = int(os.getenv("OCR_RESULT_CACHE_DISK_MB", "512"))
+
+# (document hash, engine, psm, language, preprocessing/resize setting)
+ResultKey = Tuple[str, str, int, str, str]
+
+
+def _file_name(key: ResultKey) -> str:
+    return hashlib.sha256("\x1f".join(str(part) for part in key).encode("utf-8")).hexdigest() + ".json"
+
+
+class OCRResultCache:
+    """Thread-safe, size-bounded LRU cache of OCR results with TTL and optional disk persistence."""
+
+    def __init__(
+        self,
+        max_bytes: int = OCR_RESULT_CACHE_MB * 1024 * 1024,
+        ttl: int = OCR_RESULT_CACHE_TTL,
+        persist_dir: Optional[str] = OCR_RESULT_CACHE_DIR or None,
+        max_persist_bytes: int = OCR_RESULT_CACHE_DISK_MB * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persist_dir = persist_dir
+        self.max_persist_bytes = max_persist_bytes if persist_dir else 0
+        self._lock = threading.Lock()
+        # key -> (expires_at, JSON bytes); results are stored serialised so every hit is a fresh copy
+        self._memory: "OrderedDict[ResultKey, Tuple[float, bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        # file name -> size, oldest first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def get(self, key: ResultKey) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, blob = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(blob)
+                self._memory.pop(key)
+                self._memory_bytes -= len(blob)
+
+        expires_at, blob = self._read_disk(key, now)
+        with self._lock:
+            if blob is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._put_memory(key, expires_at, blob)
+        return json.loads(blob)
+
+    def put(self, key: ResultKey, result: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        blob = json.dumps(result, separators=(",", ":")).encode("utf-8")
+        self._put_memory(key, time.time() + self.ttl, blob)
+        if self.persist_dir:
+            self._write_disk(key, blob)
+
+    def clear(self) -> None:
+        with self._lock:
+            names = list(self._disk)
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_bytes = 0
+            self._disk_bytes = 0
+        for name in names:
+            self._remove(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _put_memory(self, key: ResultKey, expires_at: float, blob: bytes) -> None:
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+            self._memory[key] = (expires_at, blob)
+            self._memory_bytes += len(blob)
+            while self._memory_bytes > self.max_bytes and self._memory:
+                _, (_, old_blob) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old_blob)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def _load_disk_index(self) -> None:
+        """Index result files left by a previous run, dropping expired ones."""
+        now = time.time()
+        found = []
+        for name in os.listdir(self.persist_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(self._path(name))
+            except OSError:
+                continue
+            if st.st_mtime + self.ttl <= now:
+                self._remove(name)
+            else:
+                found.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(found):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._trim_disk()
+
+    def _read_disk(self, key: ResultKey, now: float) -> Tuple[float, Optional[bytes]]:
+        """(expires_at, JSON bytes) of a persisted result; (0, None) if missing or expired."""
+        if not self.persist_dir:
+            return 0.0, None
+        name = _file_name(key)
+        with self._lock:
+            if name not in self._disk:
+                return 0.0, None
+        path = self._path(name)
+        try:
+            expires_at = os.path.getmtime(path) + self.ttl
+            if expires_at <= now:
+                raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                return expires_at, f.read()
+        except OSError:
+            with self._lock:
+                size = self._disk.pop(name, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            self._remove(name)
+            return 0.0, None
+
+    def _write_disk(self, key: ResultKey, blob: bytes) -> None:
+        if len(blob) > self.max_persist_bytes:
+            return
+        name = _file_name(key)
+        tmp = self._path(name + ".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, self._path(name))
+        except OSError as e:
+            logger.warning(f"OCR result cache: could not write result to disk: {str(e)}")
+            return
+        with self._lock:
+            old = self._disk.pop(name, None)
+            if old is not None:
+                self._disk_bytes -= old
+            self._disk[name] = len(blob)
+            self._disk_bytes += len(blob)
+        self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        stale = []
+        with self._lock:
+            while self._disk_bytes > self.max_persist_bytes and self._disk:
+                name, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                stale.append(name)
+        for name in stale:
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+
+
+_ocr_result_cache: Optional[OCRResultCache] = None
+_ocr_result_cache_lock = threading.Lock()
+
+
+def get_ocr_result_cache() -> OCRResultCache:
+    """Process-wide OCR result cache shared by the OCR endpoints."""
+    global _ocr_result_cache
+    if _ocr_result_cache is None:
+        with _ocr_result_cache_lock:
+            if _ocr_result_cache is None:
+                _ocr_result_cache = OCRResultCache()
+    return _ocr_result_cache
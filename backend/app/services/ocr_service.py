@@ -8,21 +8,53 @@ import io
 import os
 import re
 import logging
-from typing import Union, BinaryIO, List, Dict, Any, Tuple, Optional
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Union, BinaryIO, Callable, Iterable, Iterator, List, Dict, Any, Tuple, Optional
 
 import httpx
 
+from app.services.http_client import request_with_retry
+from app.services.image_preprocess import OCR_BINARIZE, OCR_CONTRAST, OCR_DESKEW, preprocess_for_ocr
+from app.services.ocr_pool import OCR_LANG, OCR_PAGE_WORKERS, OCR_TILE_WORKERS, current_engine, get_page_executor, get_tile_executor
+from app.services.ocr_result_cache import ResultKey
+from app.services.page_raster_cache import cached_pdf_page, document_hash
+
 logger = logging.getLogger(__name__)
 
 # OCR.space: 25k req/mo free, 1MB file limit, 2–5s. Set OCR_SPACE_API_KEY to use.
 OCR_SPACE_API_URL = "https://api.ocr.space/parse/image"
 OCR_SPACE_MAX_BYTES = 1024 * 1024  # 1MB free tier
+OCR_SPACE_ENGINE = 2
+OCR_SPACE_LANGUAGE = "eng"
+
+# PSM 4 = single column of variable-sized text (helps forms with sections/tables)
+OCR_LAYOUT_PSM = 4
+
+# Tiled OCR: large scans keep more resolution (up to OCR_MAX_DIM) and are OCRed as overlapping
+# full-width bands on OCR_TILE_WORKERS threads. With OCR_TILED off, images are downscaled to 1200px.
+# Bands only run in parallel with several tile workers, so by default tiling is on from 4 of them,
+# and OCR_MAX_DIM is 1200 * sqrt(workers) (at most 4000): each worker then OCRs about as many
+# pixels as the 1200px path, keeping large scans within the same 55s budget.
+_OCR_TILED_ENV = os.getenv("OCR_TILED", "").strip().lower()
+OCR_TILED = _OCR_TILED_ENV in ("1", "true", "yes") if _OCR_TILED_ENV else OCR_TILE_WORKERS >= 4
+OCR_MAX_DIM = int(os.getenv("OCR_MAX_DIM", str(min(4000, int(1200 * max(1, OCR_TILE_WORKERS) ** 0.5)))))
+OCR_TILE_HEIGHT = int(os.getenv("OCR_TILE_HEIGHT", "1200"))
+# Must exceed the tallest text line, so every line lies whole inside some band
+OCR_TILE_OVERLAP = int(os.getenv("OCR_TILE_OVERLAP", "160"))
+
+# Multi-page input: PDF pages and TIFF/GIF frames
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "50"))
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "300"))
+# PDF pages whose text layer has at least this many characters are read directly, not OCRed
+OCR_TEXT_LAYER_MIN_CHARS = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", "20"))
 
 # Optional imports - fail gracefully if not available
 try:
     import pytesseract
     from pytesseract import Output
-    from PIL import Image, ImageEnhance
+    from PIL import Image
     PYTESSERACT_AVAILABLE = True
 except ImportError:
     PYTESSERACT_AVAILABLE = False
@@ -101,6 +133,119 @@ def _normalize_ocr_text(s: str) -> str:
     return s
 
 
+def _plain_text_from_data(d: Dict[str, List[Any]]) -> str:
+    """
+    Plain text as image_to_string would return it, rebuilt from image_to_data output:
+    words joined by spaces, one line per text line, a blank line between paragraphs.
+    Saves running Tesseract a second time for the text.
+    """
+    paragraphs: List[List[str]] = []
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    for i in range(len(d.get('text', []))):
+        t = (d['text'][i] or '').strip()
+        if not t:
+            continue
+        para_key = (d['block_num'][i], d['par_num'][i])
+        line_key = para_key + (d['line_num'][i],)
+        words = lines.get(line_key)
+        if words is None:
+            words = lines[line_key] = []
+            if not paragraphs or paragraphs[-1][0] != para_key:
+                paragraphs.append([para_key])
+            paragraphs[-1].append(line_key)
+        words.append(t)
+    return '\n\n'.join(
+        '\n'.join(' '.join(lines[line_key]) for line_key in para[1:])
+        for para in paragraphs
+    )
+
+
+def _band_ranges(height: int, band_height: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Split [0, height) into equal overlapping bands. Returns (top, bottom, own_top, own_bottom)
+    per band: the owned ranges split each overlap in half and together cover the image once.
+    """
+    if height <= band_height:
+        return [(0, height, 0, height)]
+    count = -(-(height - overlap) // (band_height - overlap))
+    size = -(-(height + (count - 1) * overlap) // count)
+    spans = [(top, top + size) for top in (min(i * (size - overlap), height - size) for i in range(count))]
+    # Each owned range ends in the middle of the overlap with the next band
+    cuts = [0] + [(spans[i + 1][0] + spans[i][1]) // 2 for i in range(count - 1)] + [height]
+    return [(top, bottom, cuts[i], cuts[i + 1]) for i, (top, bottom) in enumerate(spans)]
+
+
+def _ocr_tiled(img, psm: int) -> Dict[str, List[Any]]:
+    """
+    image_to_data for a large image, OCRed as overlapping full-width bands on the tile workers.
+    Each word is kept only from the band that owns its vertical centre, so words in an overlap
+    are not duplicated and words cut at a band edge are dropped in favour of the whole copy.
+    Block numbers are offset per band to keep (block_num, line_num) unique.
+    """
+    width, height = img.size
+    bands = _band_ranges(height, OCR_TILE_HEIGHT, OCR_TILE_OVERLAP)
+    if len(bands) == 1:
+        return current_engine().image_to_data(img, psm=psm)
+
+    def _ocr_band(band):
+        top, bottom = band[0], band[1]
+        return current_engine().image_to_data(img.crop((0, top, width, bottom)), psm=psm)
+
+    merged: Dict[str, List[Any]] = {}
+    for band_idx, (band, d) in enumerate(zip(bands, get_tile_executor().map(_ocr_band, bands))):
+        top, _, own_top, own_bottom = band
+        for key in d:
+            merged.setdefault(key, [])
+        for i in range(len(d.get('text', []))):
+            if not (d['text'][i] or '').strip():
+                continue
+            centre = top + d['top'][i] + d['height'][i] / 2
+            if not own_top <= centre < own_bottom:
+                continue
+            for key, values in d.items():
+                merged[key].append(values[i])
+            merged['top'][-1] += top
+            merged['block_num'][-1] += band_idx * 10000
+    return merged
+
+
+def _data_from_text_layer(page, scale: float) -> Dict[str, List[Any]]:
+    """image_to_data-style word boxes from a PDF page's text layer, in pixels at `scale` px/pt."""
+    d: Dict[str, List[Any]] = {
+        key: [] for key in ('text', 'left', 'top', 'width', 'height', 'block_num', 'par_num', 'line_num', 'conf')
+    }
+    for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text('words'):
+        d['text'].append(word)
+        d['left'].append(int(x0 * scale))
+        d['top'].append(int(y0 * scale))
+        d['width'].append(max(1, int((x1 - x0) * scale)))
+        d['height'].append(max(1, int((y1 - y0) * scale)))
+        d['block_num'].append(block_no)
+        d['par_num'].append(0)
+        d['line_num'].append(line_no)
+        d['conf'].append(100.0)
+    return d
+
+
+def _map_bounded(executor: Executor, fn: Callable, items: Iterable, window: int) -> Iterator:
+    """
+    Like executor.map over a lazy iterable, but with at most `window` items taken from it and
+    submitted ahead of the consumer, so rendered pages do not pile up in memory. A Future
+    given as an item is passed through as an already-computed result.
+    """
+    pending: deque = deque()
+    try:
+        for item in items:
+            pending.append(item if isinstance(item, Future) else executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
 def _is_border_or_noise(s: str) -> bool:
     """True if the line is likely a table border, rule, or OCR garbage. Keeps labels and real fields."""
     if not s or not isinstance(s, str):
@@ -225,18 +370,20 @@ def _compute_section_boxes(
     def _key(ln):
         return (ln.get('block_num', 0), ln.get('line_num', 0))
 
+    # Line and table boxes sorted by (block_num, line_num), so each section is one bisected slice
+    def _bbox(item):
+        return (item.get('left', 0), item.get('top', 0), item.get('width', 0), item.get('height', 0))
+
+    entries = [(_key(ln), _bbox(ln)) for ln in layout]
+    entries += [((t.get('block_num', 0), t.get('line_start', 0)), _bbox(t)) for t in (tables or [])]
+    entries.sort(key=lambda e: e[0])
+    keys = [k for k, _ in entries]
+
     boxes = []
     for i, h in enumerate(headers):
         start = _key(h)
         end = _key(headers[i + 1]) if i + 1 < len(headers) else (99999, 99999)
-        bbox_list = []
-        for ln in layout:
-            if start <= _key(ln) < end:
-                bbox_list.append((ln.get('left', 0), ln.get('top', 0), ln.get('width', 0), ln.get('height', 0)))
-        for t in (tables or []):
-            k = (t.get('block_num', 0), t.get('line_start', 0))
-            if start <= k < end:
-                bbox_list.append((t.get('left', 0), t.get('top', 0), t.get('width', 0), t.get('height', 0)))
+        bbox_list = [bbox for _, bbox in entries[bisect_left(keys, start):bisect_left(keys, end)]]
         if not bbox_list:
             continue
         L = max(0, min(l for l, _, _, _ in bbox_list) - pad_px)
@@ -264,14 +411,11 @@ def _detect_tables_from_words(
         key = (w.get('block_num', 0), w.get('line_num', 0))
         by_line.setdefault(key, []).append(w)
 
-    tables: List[Dict[str, Any]] = []
+    # Split every line into cells once; the row scan below only compares cell counts
     sorted_keys = sorted(by_line.keys())
-    i = 0
-    while i < len(sorted_keys):
-        key = sorted_keys[i]
+    line_cells: Dict[Tuple[int, int], List[str]] = {}
+    for key in sorted_keys:
         line_words = sorted(by_line[key], key=lambda w: w.get('left', 0))
-        block_num, line_num = key
-
         # Column boundaries: gap > gap_px
         cells: List[str] = []
         curr: List[str] = []
@@ -287,39 +431,31 @@ def _detect_tables_from_words(
             prev_right = left + width
         if curr:
             cells.append(_normalize_ocr_text(' '.join(curr)))
+        line_cells[key] = cells
+
+    tables: List[Dict[str, Any]] = []
+    i = 0
+    while i < len(sorted_keys):
+        key = sorted_keys[i]
+        block_num, line_num = key
+        cells = line_cells[key]
 
         # Need 2+ columns to be a table row
         if len(cells) < 2:
             i += 1
             continue
 
-        table_rows = [cells]
+        table_rows = [list(cells)]
         table_keys = [key]
         j = i + 1
         while j < len(sorted_keys):
             nkey = sorted_keys[j]
-            nblock, nline = nkey
-            nwords = sorted(by_line[nkey], key=lambda w: w.get('left', 0))
-            ncells = []
-            ncurr = []
-            npr = -1000
-            for w in nwords:
-                left = w.get('left', 0)
-                width = w.get('width', 0)
-                txt = (w.get('text') or '').strip()
-                if left - npr > gap_px and ncurr:
-                    ncells.append(_normalize_ocr_text(' '.join(ncurr)))
-                    ncurr = []
-                ncurr.append(txt)
-                npr = left + width
-            if ncurr:
-                ncells.append(_normalize_ocr_text(' '.join(ncurr)))
-
+            ncells = line_cells[nkey]
             if len(ncells) < 2:
                 break
             if abs(len(ncells) - len(cells)) > 1:
                 break
-            table_rows.append(ncells)
+            table_rows.append(list(ncells))
             table_keys.append(nkey)
             j += 1
 
@@ -330,10 +466,10 @@ def _detect_tables_from_words(
                 while len(r) < max_cols:
                     r.append("")
             # Replace OCR garbage in header row (e.g. "a", "a =" from misread table borders)
-            for j, c in enumerate(table_rows[0]):
+            for ci, c in enumerate(table_rows[0]):
                 cs = (c or "").strip()
                 if len(cs) <= 3 and re.match(r'^[a-zA-Z]\s*=?\s*$', cs):
-                    table_rows[0][j] = "—"
+                    table_rows[0][ci] = "—"
             # Bbox from first/last words
             all_ws = []
             for k in table_keys:
@@ -360,6 +496,35 @@ def _detect_tables_from_words(
     return tables
 
 
+def _tables_by_line(
+    layout: List[Dict[str, Any]],
+    tables: List[Dict[str, Any]],
+) -> Dict[Tuple[Any, Any], Dict[str, Any]]:
+    """
+    Map each layout line's (block_num, line_num) to the first table whose block and
+    line_start..line_end range cover it. Layout line numbers are sorted per block, so each
+    table only visits the lines it covers.
+    """
+    lines_by_block: Dict[Any, List[Any]] = {}
+    for ln in layout:
+        lines_by_block.setdefault(ln.get('block_num', 0), []).append(ln.get('line_num', 0))
+    for bnum, nums in lines_by_block.items():
+        lines_by_block[bnum] = sorted(set(nums))
+
+    found: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    # Reversed, so the earliest matching table is the one left in the map
+    for t in reversed(tables or []):
+        bnum = t.get('block_num')
+        nums = lines_by_block.get(bnum)
+        if not nums:
+            continue
+        lo = bisect_left(nums, t.get('line_start', 0))
+        hi = bisect_right(nums, t.get('line_end', 0))
+        for lnum in nums[lo:hi]:
+            found[(bnum, lnum)] = t
+    return found
+
+
 def _parse_form_like_text(text: str) -> List[Dict[str, Any]]:
     """
     Parse OCR text into structure: section, label (with fill line), table, checkbox, paragraph.
@@ -481,6 +646,20 @@ def _parse_form_like_text(text: str) -> List[Dict[str, Any]]:
     return blocks
 
 
+def tesseract_result_key(doc_hash: str) -> ResultKey:
+    """OCR result cache key for OCRService.extract_document with the current settings."""
+    max_dim = OCR_MAX_DIM if OCR_TILED else 1200
+    setting = (f"max{max_dim}{'-tiled' if OCR_TILED else ''}-contrast{OCR_CONTRAST}"
+               f"-binarize{int(OCR_BINARIZE)}-deskew{int(OCR_DESKEW)}"
+               f"-pdf{OCR_PDF_DPI}dpi-textlayer{OCR_TEXT_LAYER_MIN_CHARS}")
+    return doc_hash, "tesseract", OCR_LAYOUT_PSM, OCR_LANG, setting
+
+
+def ocrspace_result_key(doc_hash: str) -> ResultKey:
+    """OCR result cache key for extract_with_layout_ocrspace (no PSM; sent at original size)."""
+    return doc_hash, f"ocrspace-{OCR_SPACE_ENGINE}", 0, OCR_SPACE_LANGUAGE, "original"
+
+
 def _mime_from_filename(filename: str) -> str:
     ext = (os.path.splitext(filename or "")[1] or "").lower()
     m = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp",
@@ -502,12 +681,11 @@ async def extract_with_layout_ocrspace(
     """
     mime = _mime_from_filename(filename)
     fname = (filename or "image.png").strip() or "image.png"
-    data = {"apikey": api_key, "isOverlayRequired": "true", "OCREngine": "2", "language": "eng"}
+    data = {"apikey": api_key, "isOverlayRequired": "true", "OCREngine": str(OCR_SPACE_ENGINE), "language": OCR_SPACE_LANGUAGE}
     files = {"file": (fname, file_content, mime)}
 
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.post(OCR_SPACE_API_URL, data=data, files=files, timeout=30.0)
+        r = await request_with_retry("POST", OCR_SPACE_API_URL, data=data, files=files, timeout=30.0)
         r.raise_for_status()
     except httpx.HTTPStatusError as e:
         body = (e.response.text or "")[:400]
@@ -615,6 +793,8 @@ class OCRService:
 
     # Image extensions we support
     ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.tif', '.gif'}
+    # extract_document also takes PDFs (text layer or OCR per page)
+    ALLOWED_DOCUMENT_EXTENSIONS = ALLOWED_IMAGE_EXTENSIONS | {'.pdf'}
 
     def __init__(self):
         if not PYTESSERACT_AVAILABLE:
@@ -669,31 +849,21 @@ class OCRService:
             raise RuntimeError("pytesseract or Pillow not installed.")
 
         data = image_data.read() if hasattr(image_data, 'read') else image_data
-        img = Image.open(io.BytesIO(data))
+        return self._extract_image(Image.open(io.BytesIO(data)))
+
+    def _extract_image(self, img) -> Dict[str, Any]:
+        """Preprocess and OCR one opened image (one page); same result as extract_with_layout."""
+        # Untiled: 1200px to finish within 55s on Railway. 1400px timed out; 1000px dropped fields.
+        # Tiled: bands are OCRed in parallel, so the image keeps up to OCR_MAX_DIM (scaled to the tile workers).
+        max_dim = OCR_MAX_DIM if OCR_TILED else 1200
+        # One fused decode/grayscale/resize/contrast stage (see image_preprocess)
+        img = preprocess_for_ocr(img, max_dim)
         iw, ih = img.size
 
-        # Resize: 1200px to finish within 55s on Railway. 1400px timed out; 1000px dropped fields.
-        max_dim = 1200
-        if max(iw, ih) > max_dim:
-            ratio = max_dim / max(iw, ih)
-            new_w, new_h = int(iw * ratio), int(ih * ratio)
-            img = img.resize((new_w, new_h), getattr(getattr(Image, 'Resampling', None), 'LANCZOS', None) or Image.LANCZOS)
-            iw, ih = img.size
-
-        if img.mode not in ('RGB', 'L'):
-            img = img.convert('RGB')
-        # Preprocess: grayscale and slight contrast boost for better form/table OCR
-        if img.mode == 'RGB':
-            img = img.convert('L')
         try:
-            enh = ImageEnhance.Contrast(img)
-            img = enh.enhance(1.25)
-        except Exception:
-            pass
-
-        try:
-            # PSM 4 = single column of variable-sized text (helps forms with sections/tables)
-            d = pytesseract.image_to_data(img, lang='eng', config='--psm 4', output_type=Output.DICT)
+            # Inside the OCR pool this is the worker's warm engine.
+            d = (_ocr_tiled(img, psm=OCR_LAYOUT_PSM) if OCR_TILED
+                 else current_engine().image_to_data(img, psm=OCR_LAYOUT_PSM))
         except pytesseract.TesseractNotFoundError:
             logger.error("Tesseract OCR is not installed or not in PATH.")
             raise RuntimeError(
@@ -701,6 +871,10 @@ class OCRService:
                 "https://github.com/tesseract-ocr/tesseract"
             )
 
+        return self._layout_result(d, iw, ih)
+
+    def _layout_result(self, d: Dict[str, List[Any]], iw: int, ih: int) -> Dict[str, Any]:
+        """Lines, tables and text from image_to_data-style word boxes (OCR or a PDF text layer)."""
         n = len(d['text'])
         words: List[Dict[str, Any]] = []
         lines_map: Dict[Tuple[int, int], Dict[str, Any]] = {}
@@ -749,9 +923,10 @@ class OCRService:
         # Top-to-bottom, left-to-right order for correct reading and export alignment
         layout.sort(key=lambda ln: (ln.get('top', 0), ln.get('left', 0)))
 
-        # Reconstruct text for backward compatibility (form mode / editing); use normalized
+        # Reconstruct text for backward compatibility (form mode / editing); use normalized.
+        # With no layout lines, fall back to the plain text of the same OCR pass.
         text = '\n'.join(ln['text'] for ln in layout) if layout else _normalize_ocr_text(
-            pytesseract.image_to_string(img, lang='eng', config='--psm 4').strip()
+            _plain_text_from_data(d).strip()
         )
 
         return {
@@ -762,6 +937,93 @@ class OCRService:
             'tables': tables,
         }
 
+    def extract_document(self, file_data: Union[bytes, BinaryIO], filename: str) -> Dict[str, Any]:
+        """
+        OCR an image, every frame of a multi-frame TIFF/GIF, or every page of a PDF.
+        Returns the extract_with_layout fields of the first page ("text" covers all pages) plus
+        "page_count" and "pages": one extract_with_layout result per page, with "page" (1-based)
+        and "source" ("ocr", or "text_layer" for PDF pages read without OCR).
+        """
+        data = file_data.read() if hasattr(file_data, 'read') else file_data
+        ext = (os.path.splitext(filename or "")[1] or "").lower()
+        if ext == '.pdf':
+            results = self._extract_pdf_pages(data)
+        else:
+            results = self._extract_image_frames(data)
+
+        pages = [
+            {'page': idx + 1, 'source': source, **result}
+            for idx, (source, result) in enumerate(results)
+        ]
+        if not pages:
+            raise ValueError("The document has no pages.")
+        first = pages[0]
+        return {
+            'text': '\n\n'.join(p['text'] for p in pages if p['text']),
+            'layout': first['layout'],
+            'image_width': first['image_width'],
+            'image_height': first['image_height'],
+            'tables': first['tables'],
+            'page_count': len(pages),
+            'pages': pages,
+        }
+
+    @staticmethod
+    def _check_page_count(count: int) -> None:
+        if count > OCR_MAX_PAGES:
+            raise ValueError(f"Document has {count} pages; OCR supports up to {OCR_MAX_PAGES} pages.")
+
+    def _extract_page(self, item: Tuple[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Page worker: ("text_layer", (word data, width, height)) or ("ocr", image or PNG bytes)."""
+        source, payload = item
+        if source == 'text_layer':
+            return source, self._layout_result(*payload)
+        img = Image.open(io.BytesIO(payload)) if isinstance(payload, bytes) else payload
+        return source, self._extract_image(img)
+
+    def _extract_image_frames(self, data: bytes) -> List[Tuple[str, Dict[str, Any]]]:
+        img = Image.open(io.BytesIO(data))
+        frame_count = getattr(img, 'n_frames', 1)
+        if frame_count <= 1:
+            return [('ocr', self._extract_image(img))]
+        self._check_page_count(frame_count)
+
+        def _frames():
+            # Frames are decoded here, in order (an Image is not thread-safe), and OCRed on the page workers
+            for idx in range(frame_count):
+                img.seek(idx)
+                yield ('ocr', img.copy())
+
+        return list(_map_bounded(get_page_executor(), self._extract_page, _frames(), OCR_PAGE_WORKERS * 2))
+
+    def _extract_pdf_pages(self, data: bytes) -> List[Tuple[str, Dict[str, Any]]]:
+        if not FITZ_AVAILABLE or fitz is None:
+            raise RuntimeError("PyMuPDF is not installed. Install: pip install PyMuPDF")
+        doc = fitz.open(stream=data, filetype='pdf')
+        try:
+            self._check_page_count(doc.page_count)
+            doc_hash = document_hash(data)
+            scale = OCR_PDF_DPI / 72
+
+            def _pages():
+                # PyMuPDF is not thread-safe: text layers and rasters are read here, in order.
+                # Pages with a text layer are finished here; the rest are OCRed on the page workers.
+                for idx in range(doc.page_count):
+                    page = doc[idx]
+                    d = _data_from_text_layer(page, scale)
+                    if sum(len(t) for t in d['text']) >= OCR_TEXT_LAYER_MIN_CHARS:
+                        # Same pixel size as the page rendered at OCR_PDF_DPI
+                        size = (page.rect * fitz.Matrix(scale, scale)).irect
+                        done: Future = Future()
+                        done.set_result(self._extract_page(('text_layer', (d, size.width, size.height))))
+                        yield done
+                    else:
+                        yield ('ocr', cached_pdf_page(doc, doc_hash, idx, OCR_PDF_DPI, 'png').data)
+
+            return list(_map_bounded(get_page_executor(), self._extract_page, _pages(), OCR_PAGE_WORKERS * 2))
+        finally:
+            doc.close()
+
     def _layout_to_page_scale(self, image_width: int, image_height: int) -> Tuple[float, float, float, float]:
         """Fit image to letter; return (scale, page_w_pt, page_h_pt, _). scale keeps aspect."""
         pw, ph = letter
@@ -791,6 +1053,7 @@ class OCRService:
         c = pdf_canvas.Canvas(buf, pagesize=(page_w, page_h))
         c.setTitle(title or "OCR Document")
         tables = tables or []
+        table_at = _tables_by_line(layout, tables)
         drawn = set()  # (block_num, line_start)
         c.setStrokeColorRGB(0, 0, 0)
 
@@ -800,12 +1063,6 @@ class OCRService:
             y = page_h - (box['top'] + box['height']) * scale
             c.rect(x, y, box['width'] * scale, box['height'] * scale)
 
-        def _find_table(bnum: int, lnum: int):
-            for t in tables:
-                if t.get('block_num') == bnum and t.get('line_start', 0) <= lnum <= t.get('line_end', 0):
-                    return t
-            return None
-
         def _prev_is_label(prev: Optional[Dict]) -> bool:
             return bool(prev and ((prev.get('text') or '').strip().endswith(':')))
 
@@ -842,7 +1099,7 @@ class OCRService:
         for idx, ln in enumerate(layout):
             bnum = ln.get('block_num', 0)
             lnum = ln.get('line_num', 0)
-            t = _find_table(bnum, lnum)
+            t = table_at.get((bnum, lnum))
             if t:
                 key = (t.get('block_num', 0), t.get('line_start', 0))
                 if key not in drawn:
@@ -915,19 +1172,14 @@ class OCRService:
         doc.add_heading(title or "OCR Document", level=0)
 
         tables = tables or []
+        table_at = _tables_by_line(layout, tables)
         drawn = set()
 
-        def _find_table(bnum: int, lnum: int):
-            for t in tables:
-                if t.get('block_num') == bnum and t.get('line_start', 0) <= lnum <= t.get('line_end', 0):
-                    return t
-            return None
-
         prev_bottom = 0
         for idx, ln in enumerate(layout):
             bnum = ln.get('block_num', 0)
             lnum = ln.get('line_num', 0)
-            t = _find_table(bnum, lnum)
+            t = table_at.get((bnum, lnum))
             if t:
                 key = (t.get('block_num', 0), t.get('line_start', 0))
                 if key not in drawn:
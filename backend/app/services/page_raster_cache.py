@@ -0,0 +1,238 @@
+"""
+Page Raster Cache for InsightSheet-lite
+Rendered PDF page images shared by converters and OCR, so repeated conversions of the
+same PDF do not rasterise it again.
+
+Entries are keyed by (document hash, page index, DPI, format), kept in memory up to
+PAGE_RASTER_CACHE_MB with LRU eviction, and optionally spilled to PAGE_RASTER_CACHE_DIR
+(up to PAGE_RASTER_CACHE_DISK_MB) instead of being dropped. Each process spills into its own
+subdirectory of PAGE_RASTER_CACHE_DIR, removed on shutdown, so workers sharing the directory
+never touch each other's files.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from app.services.document_source import DocumentSource, hash_source
+
+logger = logging.getLogger(__name__)
+
+PAGE_RASTER_CACHE_MB = int(os.getenv("PAGE_RASTER_CACHE_MB", "128"))
+PAGE_RASTER_CACHE_DIR = os.getenv("PAGE_RASTER_CACHE_DIR", "").strip()
+PAGE_RASTER_CACHE_DISK_MB = int(os.getenv("PAGE_RASTER_CACHE_DISK_MB", "1024"))
+
+# (document hash, page index, dpi, image format)
+PageKey = Tuple[str, int, int, str]
+
+
+class PageRaster(NamedTuple):
+    """One rendered page: encoded image bytes, file extension and pixel size."""
+    data: bytes
+    ext: str
+    width: int
+    height: int
+
+
+def document_hash(data: DocumentSource) -> str:
+    """Content hash identifying a document in cache keys (bytes, mmap or file path)."""
+    return hash_source(data)
+
+
+class PageRasterCache:
+    """Thread-safe, size-bounded LRU cache of rendered pages with optional disk spill."""
+
+    def __init__(
+        self,
+        max_bytes: int = PAGE_RASTER_CACHE_MB * 1024 * 1024,
+        spill_dir: Optional[str] = PAGE_RASTER_CACHE_DIR or None,
+        max_spill_bytes: int = PAGE_RASTER_CACHE_DISK_MB * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.spill_dir = None
+        self.max_spill_bytes = max_spill_bytes if spill_dir else 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[PageKey, PageRaster]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> (path, size, ext, width, height)
+        self._disk: "OrderedDict[PageKey, Tuple[str, int, str, int, int]]" = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if spill_dir:
+            # Spilled files are only indexed in this process's memory, so each process gets a
+            # private subdirectory; the configured directory itself is never cleared
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix=f"rasters-{os.getpid()}-", dir=spill_dir)
+
+    def contains(self, key: PageKey) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def get(self, key: PageKey) -> Optional[PageRaster]:
+        """Return the cached page (promoting spilled entries back to memory), or None."""
+        with self._lock:
+            raster = self._memory.get(key)
+            if raster is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return raster
+            spilled = self._disk.pop(key, None)
+            if spilled is None:
+                self.misses += 1
+                return None
+            path, size, ext, width, height = spilled
+            self._disk_bytes -= size
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Page raster cache: could not read spilled page: {str(e)}")
+            with self._lock:
+                self.misses += 1
+            return None
+
+        raster = PageRaster(data, ext, width, height)
+        with self._lock:
+            self.hits += 1
+        self.put(key, raster)
+        return raster
+
+    def put(self, key: PageKey, raster: PageRaster) -> None:
+        size = len(raster.data)
+        if size > self.max_bytes:
+            return
+        evicted = []
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old.data)
+            self._memory[key] = raster
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_bytes and self._memory:
+                old_key, old_raster = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old_raster.data)
+                evicted.append((old_key, old_raster))
+
+        if self.spill_dir:
+            for old_key, old_raster in evicted:
+                self._spill(old_key, old_raster)
+
+    def get_or_render(self, key: PageKey, render: Callable[[], PageRaster]) -> PageRaster:
+        """Return the cached page, or call render() and cache its result."""
+        raster = self.get(key)
+        if raster is None:
+            raster = render()
+            self.put(key, raster)
+        return raster
+
+    def clear(self) -> None:
+        with self._lock:
+            paths = [entry[0] for entry in self._disk.values()]
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_bytes = 0
+            self._disk_bytes = 0
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self) -> None:
+        """Drop every entry and remove this process's spill subdirectory."""
+        self.clear()
+        spill_dir, self.spill_dir = self.spill_dir, None
+        self.max_spill_bytes = 0
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _spill(self, key: PageKey, raster: PageRaster) -> None:
+        """Move an entry evicted from memory to disk, evicting the oldest spilled entries to make room."""
+        size = len(raster.data)
+        spill_dir = self.spill_dir
+        if not spill_dir or size > self.max_spill_bytes:
+            return
+        doc_hash, page, dpi, fmt = key
+        path = os.path.join(spill_dir, f"{doc_hash}_{page}_{dpi}_{fmt}.{raster.ext}")
+        try:
+            with open(path, "wb") as f:
+                f.write(raster.data)
+        except OSError as e:
+            logger.warning(f"Page raster cache: could not spill page to disk: {str(e)}")
+            return
+
+        stale = []
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old[1]
+            self._disk[key] = (path, size, raster.ext, raster.width, raster.height)
+            self._disk_bytes += size
+            while self._disk_bytes > self.max_spill_bytes and self._disk:
+                _, (old_path, old_size, _, _, _) = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                stale.append(old_path)
+        for old_path in stale:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+_page_raster_cache: Optional[PageRasterCache] = None
+_page_raster_cache_lock = threading.Lock()
+
+
+def get_page_raster_cache() -> PageRasterCache:
+    """Process-wide cache shared by every converter that needs page images."""
+    global _page_raster_cache
+    if _page_raster_cache is None:
+        with _page_raster_cache_lock:
+            if _page_raster_cache is None:
+                _page_raster_cache = PageRasterCache()
+    return _page_raster_cache
+
+
+def shutdown_page_raster_cache() -> None:
+    global _page_raster_cache
+    with _page_raster_cache_lock:
+        if _page_raster_cache is not None:
+            _page_raster_cache.shutdown()
+            _page_raster_cache = None
+
+
+def render_pdf_page(doc, page_index: int, dpi: int, image_format: str = "png", jpeg_quality: int = 85) -> PageRaster:
+    """Rasterise one page of an open PyMuPDF document ("png" or "jpeg")."""
+    pix = doc[page_index].get_pixmap(dpi=dpi, alpha=False)
+    if image_format == "jpeg":
+        data = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+    else:
+        data = pix.tobytes("png")
+    return PageRaster(data, image_format, pix.width, pix.height)
+
+
+def cached_pdf_page(doc, doc_hash: str, page_index: int, dpi: int, image_format: str = "png",
+                    jpeg_quality: int = 85) -> PageRaster:
+    """render_pdf_page through the shared cache. doc_hash comes from document_hash(pdf_bytes)."""
+    return get_page_raster_cache().get_or_render(
+        (doc_hash, page_index, dpi, image_format),
+        lambda: render_pdf_page(doc, page_index, dpi, image_format, jpeg_quality),
+    )
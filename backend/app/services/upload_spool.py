@@ -0,0 +1,170 @@
+"""
+Upload Spooling for InsightSheet-lite
+Reads an UploadFile in chunks instead of one `await file.read()`:
+
+- the size limit is enforced while reading (and up front when the request declares a size),
+  so an oversized upload is rejected after at most limit + one chunk;
+- small uploads stay in memory, larger ones spill to a temp file past UPLOAD_SPOOL_MEMORY_MB;
+- the SHA-256 is computed on the fly, so callers do not hash the content again;
+- services get the spooled file's path or an mmap rather than a bytes copy (source(), mmap()).
+
+Always close() the SpooledUpload (or use it as a context manager) to delete the temp file.
+"""
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+# Uploads up to this size are kept in memory; larger ones are spooled to disk
+UPLOAD_SPOOL_MEMORY_MB = int(os.getenv("UPLOAD_SPOOL_MEMORY_MB", "4"))
+
+
+class UploadTooLarge(ValueError):
+    """Raised by spool_upload when an upload exceeds its size limit."""
+
+    def __init__(self, max_bytes: int, size: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # Declared size of the upload, if the request gave one
+        self.size = size
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+
+
+class SpooledUpload:
+    """An upload's content, in memory or in a temp file, with its size and SHA-256."""
+
+    def __init__(self, filename: Optional[str], memory_limit: int = UPLOAD_SPOOL_MEMORY_MB * 1024 * 1024):
+        self.filename = filename or ""
+        # Spooled files keep the upload's extension; openpyxl, for one, goes by it
+        self.suffix = os.path.splitext(self.filename)[1].lower()
+        self.size = 0
+        self.sha256 = ""
+        self._memory_limit = memory_limit
+        self._hash = hashlib.sha256()
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._data: Optional[bytes] = None
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[str] = None
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._buffer is not None and self._buffer.tell() + len(chunk) > self._memory_limit:
+            self._spill()
+        if self._buffer is not None:
+            self._buffer.write(chunk)
+        else:
+            self._file.write(chunk)
+
+    def finish(self) -> None:
+        """Called once the whole upload has been written."""
+        self.sha256 = self._hash.hexdigest()
+        if self._buffer is not None:
+            self._data = self._buffer.getvalue()
+            self._buffer = None
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def in_memory(self) -> bool:
+        return self._path is None
+
+    @property
+    def path(self) -> str:
+        """Path of a file holding the content (an in-memory upload is written out on first use)."""
+        if self._path is None:
+            fd, self._path = tempfile.mkstemp(prefix="upload-", suffix=self.suffix)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._data or b"")
+            self._data = None
+        return self._path
+
+    def open(self) -> BinaryIO:
+        """A new read handle at the start of the content."""
+        if self._path is None:
+            return io.BytesIO(self._data or b"")
+        return open(self._path, "rb")
+
+    def read_bytes(self) -> bytes:
+        """The content as bytes (no copy when it is held in memory)."""
+        if self._path is None:
+            return self._data or b""
+        with open(self._path, "rb") as f:
+            return f.read()
+
+    def source(self) -> Union[bytes, str]:
+        """The content for the service layer (see document_source): bytes if in memory, else the spooled file's path."""
+        if self._path is None:
+            return self._data or b""
+        return self._path
+
+    def mmap(self) -> Union[mmap.mmap, bytes]:
+        """Read-only memory map of the content (b"" for an empty upload). Close it when done."""
+        if not self.size:
+            return b""
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def detach(self, dest_path: str) -> None:
+        """Move the content to dest_path; the caller then owns that file."""
+        if self._path is None:
+            with open(dest_path, "wb") as f:
+                f.write(self._data or b"")
+            self._data = None
+        else:
+            shutil.move(self._path, dest_path)
+            self._path = None
+
+    def close(self) -> None:
+        self._buffer = None
+        self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+            self._path = None
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _spill(self) -> None:
+        fd, self._path = tempfile.mkstemp(prefix="upload-", suffix=self.suffix)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._buffer.getbuffer())
+        self._buffer = None
+
+
+async def spool_upload(file, max_bytes: int) -> SpooledUpload:
+    """
+    Read a Starlette/FastAPI UploadFile into a SpooledUpload, raising UploadTooLarge as soon as
+    it is known to exceed max_bytes.
+    """
+    declared = getattr(file, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLarge(max_bytes, declared)
+
+    upload = SpooledUpload(file.filename)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadTooLarge(max_bytes, declared)
+            upload.write(chunk)
+        upload.finish()
+    except BaseException:
+        upload.close()
+        raise
+    return upload
@@ -2,6 +2,9 @@
 ZIP File Processor Service for InsightSheet-lite
 Secure filename cleaning with Unicode support
 """
+import asyncio
+import json
+import mmap
 import zipfile
 import os
 import re
@@ -9,12 +12,30 @@ import unicodedata
 import secrets
 import tempfile
 import shutil
-from typing import List, Dict, Optional, BinaryIO
+from typing import List, Dict, Optional, BinaryIO, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
 
+from app.services.document_source import DocumentSource, is_path, open_source, source_path
+
 logger = logging.getLogger(__name__)
 
+# Shared pool for batch ZIP cleaning (zlib releases the GIL, so threads scale)
+ZIP_BATCH_WORKERS = int(os.getenv("ZIP_BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+_batch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor used by process_zip_batch"""
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ThreadPoolExecutor(
+            max_workers=max(1, ZIP_BATCH_WORKERS),
+            thread_name_prefix='zipbatch'
+        )
+    return _batch_executor
+
 
 class ZipProcessorService:
     """Secure ZIP file processor with advanced filename cleaning"""
@@ -23,7 +44,7 @@ class ZipProcessorService:
         self.temp_dir = temp_dir or tempfile.gettempdir()
         self.max_file_size = 2 * 1024 * 1024 * 1024  # 2GB uncompressed limit
 
-    def is_safe_zip(self, zip_path: str) -> bool:
+    def is_safe_zip(self, zip_path: Union[str, BinaryIO]) -> bool:
         """
         Verify ZIP file integrity and content safety
         Prevents ZIP bombs and directory traversal attacks
@@ -148,95 +169,105 @@ class ZipProcessorService:
             logger.error(f"Error sanitizing filename: {str(e)}")
             return f"renamed_file_{secrets.token_hex(4)}"
 
+    def _clean_zip_file(self, input_path: str, output_path: str, options: Dict[str, any]) -> int:
+        """
+        Write a filename-cleaned copy of the ZIP at input_path to output_path
+
+        Entries are copied one at a time from source to target, so only a single
+        file's content is held in memory.
+
+        Returns:
+            int: Number of files written
+        """
+        if not self.is_safe_zip(input_path):
+            raise ValueError("Invalid or unsafe ZIP file")
+
+        written = 0
+        with zipfile.ZipFile(input_path, 'r') as source_zip, \
+                zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as target_zip:
+            for item in source_zip.infolist():
+                # Skip directories
+                if item.filename.endswith('/'):
+                    continue
+
+                try:
+                    # Get original name
+                    original_name = os.path.basename(item.filename)
+
+                    # Sanitize filename
+                    new_name = self.sanitize_filename(
+                        original_name,
+                        allowed_chars=options.get('allowed_chars'),
+                        disallowed_chars=options.get('disallowed_chars'),
+                        replace_char=options.get('replace_char', '_'),
+                        remove_spaces=options.get('remove_spaces', False),
+                        max_length=options.get('max_length', 255),
+                        language_replacements=options.get('language_replacements')
+                    )
+
+                    # Maintain directory structure
+                    new_path = os.path.normpath(
+                        os.path.join(
+                            os.path.dirname(item.filename),
+                            new_name
+                        )
+                    ).replace('\\', '/')
+
+                    # Prevent directory traversal
+                    if '..' in new_path or new_path.startswith('/'):
+                        logger.warning(f"Skipping suspicious path: {new_path}")
+                        continue
+
+                    # Read file content
+                    with source_zip.open(item) as source:
+                        content = source.read()
+
+                    target_zip.writestr(new_path, content)
+                    written += 1
+
+                except Exception as e:
+                    logger.error(f"Error processing file {item.filename}: {str(e)}")
+                    continue
+
+        return written
+
     async def process_zip(
         self,
-        zip_file: BinaryIO,
+        zip_file: Union[BinaryIO, DocumentSource],
         options: Dict[str, any]
     ) -> bytes:
         """
         Process ZIP file with filename cleaning
 
         Args:
-            zip_file: ZIP file binary data
+            zip_file: ZIP file as a file object, bytes, mmap or path (a path is read in place)
             options: Processing options
 
         Returns:
             bytes: Processed ZIP file data
         """
-        temp_input = None
-        temp_output = None
+        # Copying, cleaning and reading back the archive are synchronous; run them off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._process_zip_file, zip_file, options)
+
+    def _process_zip_file(self, zip_file: Union[BinaryIO, DocumentSource], options: Dict[str, any]) -> bytes:
         temp_dir = None
 
         try:
             # Create secure temporary directory
             temp_dir = tempfile.mkdtemp(prefix='zipproc_', dir=self.temp_dir)
 
-            # Save uploaded file
+            # Save uploaded file (unless it is already on disk)
             temp_input = os.path.join(temp_dir, f"input_{secrets.token_hex(8)}.zip")
-            with open(temp_input, 'wb') as f:
-                f.write(zip_file.read() if hasattr(zip_file, 'read') else zip_file)
-
-            # Verify safety
-            if not self.is_safe_zip(temp_input):
-                raise ValueError("Invalid or unsafe ZIP file")
-
-            # Process files
-            processed_files = []
-
-            with zipfile.ZipFile(temp_input, 'r') as source_zip:
-                for item in source_zip.infolist():
-                    # Skip directories
-                    if item.filename.endswith('/'):
-                        continue
-
-                    try:
-                        # Get original name
-                        original_name = os.path.basename(item.filename)
-
-                        # Sanitize filename
-                        new_name = self.sanitize_filename(
-                            original_name,
-                            allowed_chars=options.get('allowed_chars'),
-                            disallowed_chars=options.get('disallowed_chars'),
-                            replace_char=options.get('replace_char', '_'),
-                            remove_spaces=options.get('remove_spaces', False),
-                            max_length=options.get('max_length', 255),
-                            language_replacements=options.get('language_replacements')
-                        )
+            if hasattr(zip_file, 'read') and not isinstance(zip_file, mmap.mmap):
+                with open(temp_input, 'wb') as f:
+                    shutil.copyfileobj(zip_file, f)
+            else:
+                temp_input = source_path(zip_file, temp_input)
 
-                        # Maintain directory structure
-                        new_path = os.path.normpath(
-                            os.path.join(
-                                os.path.dirname(item.filename),
-                                new_name
-                            )
-                        ).replace('\\', '/')
-
-                        # Prevent directory traversal
-                        if '..' in new_path or new_path.startswith('/'):
-                            logger.warning(f"Skipping suspicious path: {new_path}")
-                            continue
-
-                        # Read file content
-                        with source_zip.open(item) as source:
-                            content = source.read()
-
-                        processed_files.append({
-                            'path': new_path,
-                            'content': content,
-                            'original': item.filename
-                        })
-
-                    except Exception as e:
-                        logger.error(f"Error processing file {item.filename}: {str(e)}")
-                        continue
-
-            # Create output ZIP
+            # Process files into output ZIP
             temp_output = os.path.join(temp_dir, f"output_{secrets.token_hex(8)}.zip")
-
-            with zipfile.ZipFile(temp_output, 'w', zipfile.ZIP_DEFLATED) as target_zip:
-                for file_info in processed_files:
-                    target_zip.writestr(file_info['path'], file_info['content'])
+            self._clean_zip_file(temp_input, temp_output, options)
 
             # Read output file
             with open(temp_output, 'rb') as f:
@@ -253,6 +284,124 @@ class ZipProcessorService:
             if temp_dir and os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir, ignore_errors=True)
 
+    def extract_nested_archives(self, outer_zip: DocumentSource, dest_dir: str) -> List[Tuple[str, str]]:
+        """
+        Unpack an outer ZIP that only wraps other ZIPs so they can be batch processed
+
+        Args:
+            outer_zip: Outer ZIP file as bytes, mmap or path (read in place, not copied)
+            dest_dir: Directory the inner archives are extracted to (streamed, not read into memory)
+
+        Returns:
+            list: (archive filename, extracted path) for each inner .zip entry; empty if the
+            outer ZIP holds anything other than .zip files (macOS metadata aside), in which
+            case it is an ordinary archive and should be processed as one
+        """
+        if not self.is_safe_zip(open_source(outer_zip)):
+            raise ValueError("Invalid or unsafe ZIP file")
+
+        with zipfile.ZipFile(open_source(outer_zip), 'r') as zip_ref:
+            entries = [
+                item for item in zip_ref.infolist()
+                if not item.filename.endswith('/')
+                and not item.filename.startswith('__MACOSX/')
+                and os.path.basename(item.filename) != '.DS_Store'
+            ]
+            if not entries or not all(item.filename.lower().endswith('.zip') for item in entries):
+                return []
+            archives = []
+            for index, item in enumerate(entries):
+                path = os.path.join(dest_dir, f"nested_{index}_{secrets.token_hex(4)}.zip")
+                with zip_ref.open(item) as source, open(path, 'wb') as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+                archives.append((os.path.basename(item.filename), path))
+        return archives
+
+    async def process_zip_batch(
+        self,
+        archives: List[Tuple[str, DocumentSource]],
+        options: Dict[str, any],
+        output_path: str
+    ) -> List[Dict[str, any]]:
+        """
+        Clean several ZIP files concurrently and combine them into one ZIP
+
+        Archives are cleaned on the shared batch worker pool. Each cleaned
+        archive is stored (uncompressed, it is already deflated) in the
+        combined ZIP under its own sanitized name, in upload order, next to a
+        batch_report.json summary. One bad archive does not fail the batch.
+
+        Args:
+            archives: (archive filename, archive data) pairs; data is bytes, mmap or a path (read in place)
+            options: Processing options (shared by all archives)
+            output_path: Where to write the combined ZIP
+
+        Returns:
+            list: Per-archive results with filename, status, files and error
+        """
+        temp_dir = tempfile.mkdtemp(prefix='zipbatch_', dir=self.temp_dir)
+        loop = asyncio.get_running_loop()
+
+        def clean_one(index: int, data: DocumentSource) -> Tuple[str, int]:
+            temp_input = os.path.join(temp_dir, f"input_{index}_{secrets.token_hex(4)}.zip")
+            temp_output = os.path.join(temp_dir, f"output_{index}_{secrets.token_hex(4)}.zip")
+            input_path = source_path(data, temp_input)
+            try:
+                count = self._clean_zip_file(input_path, temp_output, options)
+            finally:
+                if input_path == temp_input:
+                    os.remove(temp_input)
+            return temp_output, count
+
+        try:
+            executor = _get_batch_executor()
+            futures = [
+                loop.run_in_executor(executor, clean_one, index, data)
+                for index, (_, data) in enumerate(archives)
+            ]
+            outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+            # Copying hundreds of MB into the combined ZIP is blocking too; keep it off the event loop
+            return await loop.run_in_executor(None, self._write_batch, archives, outcomes, output_path)
+
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _write_batch(self, archives: List[Tuple[str, DocumentSource]], outcomes: List, output_path: str) -> List[Dict[str, any]]:
+        """Store each cleaned archive and batch_report.json in the combined ZIP; returns the per-archive results"""
+        results = []
+        used_names = set()
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED) as combined:
+            for (filename, data), outcome in zip(archives, outcomes):
+                result = {
+                    'filename': filename,
+                    'size_bytes': os.path.getsize(data) if is_path(data) else len(data),
+                    'status': 'success',
+                    'files': 0,
+                    'error': None,
+                }
+                if isinstance(outcome, Exception):
+                    logger.error(f"Error processing ZIP {filename}: {str(outcome)}")
+                    result['status'] = 'failed'
+                    result['error'] = str(outcome)
+                else:
+                    cleaned_path, result['files'] = outcome
+                    base = self.sanitize_filename(os.path.splitext(filename)[0] or 'archive')
+                    entry_name = f"{base}.zip"
+                    suffix = 1
+                    while entry_name in used_names:
+                        suffix += 1
+                        entry_name = f"{base}_{suffix}.zip"
+                    used_names.add(entry_name)
+                    combined.write(cleaned_path, entry_name)
+                    os.remove(cleaned_path)
+                    result['output'] = entry_name
+                results.append(result)
+
+            combined.writestr('batch_report.json', json.dumps(results, indent=2))
+
+        return results
+
     def get_language_replacements(self, languages: List[str]) -> Dict[str, str]:
         """
         Get character replacements for specified languages
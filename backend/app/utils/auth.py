@@ -13,6 +13,8 @@ import logging
 from dotenv import load_dotenv
 
 from app.database import get_db, User
+from app.utils.password_hasher import get_password_hasher
+from app.utils.principal_cache import get_principal_cache
 
 load_dotenv()
 
@@ -23,8 +25,15 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Plan limits: upload size (MB) for file endpoints and for /api/convert/*
+FREE_MAX_UPLOAD_MB = int(os.getenv("FREE_MAX_UPLOAD_MB", "10"))
+PREMIUM_MAX_UPLOAD_MB = int(os.getenv("PREMIUM_MAX_UPLOAD_MB", "500"))
+FREE_MAX_CONVERT_MB = int(os.getenv("FREE_MAX_CONVERT_MB", "25"))
+PREMIUM_MAX_CONVERT_MB = int(os.getenv("PREMIUM_MAX_CONVERT_MB", "100"))
+
+# Password hashing. Hashes with a different cost are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # HTTP Bearer token security
 security = HTTPBearer()
@@ -83,6 +92,11 @@ def get_password_hash(password: str) -> str:
         raise
 
 
+async def hash_password(password: str) -> str:
+    """get_password_hash on the bcrypt pool; raises PasswordHasherBusy if it is saturated"""
+    return await get_password_hasher().run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create JWT access token
@@ -131,23 +145,8 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> dict:
-    """
-    Get current authenticated user from token
-
-    Args:
-        credentials: HTTP Bearer credentials
-        db: Database session
-
-    Returns:
-        dict: User data
-
-    Raises:
-        HTTPException: If authentication fails
-    """
+def _authenticated_principal(credentials: HTTPAuthorizationCredentials, db: Session) -> dict:
+    """Principal (user + subscription plan) for a bearer token; raises 401 if it is not valid."""
     token = credentials.credentials
 
     # Decode token
@@ -161,28 +160,88 @@ async def get_current_user(
             detail="Invalid authentication credentials",
         )
 
-    # Get user from database
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    # Get user (and subscription plan) from the principal cache, or the database on a miss
+    principal = get_principal_cache().get(db, email)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
 
-    if not user.is_active:
+    if not principal["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Inactive user",
         )
 
+    return principal
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Get current authenticated user from token
+
+    Args:
+        credentials: HTTP Bearer credentials
+        db: Database session
+
+    Returns:
+        dict: User data
+
+    Raises:
+        HTTPException: If authentication fails
+    """
+    principal = _authenticated_principal(credentials, db)
+    return {
+        "id": principal["id"],
+        "email": principal["email"],
+        "full_name": principal["full_name"],
+        "role": principal["role"]
+    }
+
+
+def plan_limits(plan: Optional[str]) -> dict:
+    """Limits for a subscription plan (None = no subscription, treated as free)"""
+    premium = plan == "premium"
     return {
-        "id": user.id,
-        "email": user.email,
-        "full_name": user.full_name,
-        "role": user.role
+        "is_premium": premium,
+        "max_upload_mb": PREMIUM_MAX_UPLOAD_MB if premium else FREE_MAX_UPLOAD_MB,
+        "max_convert_mb": PREMIUM_MAX_CONVERT_MB if premium else FREE_MAX_CONVERT_MB,
     }
 
 
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Get current authenticated user together with their subscription and plan limits
+
+    Same user fields as get_current_user, plus plan, subscription_status and
+    ai_queries_limit (None without a subscription), is_premium, max_upload_mb and
+    max_convert_mb. Comes from the principal cache, so handlers need no Subscription
+    query just to check the plan. Usage counters are not included; load the
+    Subscription row to read or update them.
+
+    Args:
+        credentials: HTTP Bearer credentials
+        db: Database session
+
+    Returns:
+        dict: User, subscription and limits
+
+    Raises:
+        HTTPException: If authentication fails
+    """
+    principal = _authenticated_principal(credentials, db)
+    principal.pop("is_active", None)
+    principal.update(plan_limits(principal["plan"]))
+    return principal
+
+
 async def get_current_admin_user(
     current_user: dict = Depends(get_current_user)
 ) -> dict:
@@ -207,10 +266,13 @@ async def get_current_admin_user(
     return current_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """
     Authenticate user with email and password
 
+    The bcrypt check runs on the password hashing pool. A hash made with a cost other
+    than BCRYPT_ROUNDS is replaced with a fresh one after a successful check.
+
     Args:
         db: Database session
         email: User email
@@ -218,13 +280,24 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
 
     Returns:
         User or None: User object if authenticated, None otherwise
+
+    Raises:
+        PasswordHasherBusy: If the password hashing pool is saturated
     """
     user = db.query(User).filter(User.email == email).first()
 
     if not user:
         return None
 
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await get_password_hasher().run(
+        pwd_context.verify_and_update, password, user.hashed_password
+    )
+    if not verified:
         return None
 
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info(f"Password hash rehashed with bcrypt cost {BCRYPT_ROUNDS} for {user.email}")
+
     return user
@@ -0,0 +1,122 @@
+"""
+Password Hashing Pool for InsightSheet-lite
+bcrypt hashing and verification run on a small dedicated thread pool instead of the event
+loop. Each bcrypt operation is tens to hundreds of ms of CPU (bcrypt releases the GIL), so
+running it inline in async handlers stalls every other request during a login burst.
+
+- PASSWORD_HASH_WORKERS threads run bcrypt; at most PASSWORD_HASH_QUEUE_SIZE more calls wait.
+  Beyond that, run() raises PasswordHasherBusy (HTTP 503) instead of queueing without bound,
+  so a credential-stuffing burst is shed rather than piling up.
+- stats() reports in-flight, rejected and completed calls plus wait/run latency.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Calls waiting for a worker beyond this are rejected (HTTP 503) rather than queued
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+# Calls kept for the wait/run percentiles in stats()
+_METRICS_WINDOW = 500
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised by PasswordHasherPool.run when every worker is busy and the queue is full."""
+
+
+class PasswordHasherPool:
+    """Bounded thread pool for bcrypt calls."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+        # (wait seconds, run seconds) of recent calls
+        self._timings: Deque[Tuple[float, float]] = deque(maxlen=_METRICS_WINDOW)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on a bcrypt worker. Raises PasswordHasherBusy if the pool is saturated."""
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise PasswordHasherBusy("Too many sign-in requests right now. Please try again in a moment.")
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+        started = []
+
+        def _call():
+            started.append(time.perf_counter())
+            return fn(*args)
+
+        def _done(_future) -> None:
+            finished = time.perf_counter()
+            with self._lock:
+                self._in_flight -= 1
+                if started:
+                    self._completed += 1
+                    self._timings.append((started[0] - submitted, finished - started[0]))
+
+        try:
+            future = self._executor.submit(_call)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # Released when the call ends (or is cancelled before it starts), not when the awaiting task goes away
+        future.add_done_callback(_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            timings = list(self._timings)
+            stats = {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        for name, idx in (("wait", 0), ("run", 1)):
+            values = sorted(t[idx] for t in timings)
+            if values:
+                stats[f"{name}_ms_p50"] = round(values[len(values) // 2] * 1000, 1)
+                stats[f"{name}_ms_p95"] = round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1)
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_password_hasher: Optional[PasswordHasherPool] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasherPool:
+    """Process-wide bcrypt pool used by the auth endpoints."""
+    global _password_hasher
+    if _password_hasher is None:
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasherPool()
+                logger.info(f"Password hashing pool: {_password_hasher.workers} workers, queue {_password_hasher.queue_size}")
+    return _password_hasher
+
+
+def shutdown_password_hasher() -> None:
+    global _password_hasher
+    with _password_hasher_lock:
+        if _password_hasher is not None:
+            _password_hasher.shutdown()
+            _password_hasher = None
@@ -0,0 +1,124 @@
+"""
+Principal Cache for InsightSheet-lite
+The authenticated user and their subscription plan, keyed by token subject (email), so
+get_current_user does not query User and Subscription on every request.
+
+Entries expire after AUTH_PRINCIPAL_CACHE_TTL seconds and at most AUTH_PRINCIPAL_CACHE_SIZE
+are kept (LRU). Whatever changes a user's role, active state or plan must call
+invalidate_principal(email). The cache is per process, so another worker process sees such
+a change at most TTL seconds later; set AUTH_PRINCIPAL_CACHE_TTL=0 to disable it.
+Usage counters (ai_queries_used, files_uploaded) are never cached.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import Subscription, User
+
+AUTH_PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "30"))
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+def load_principal(db: Session, email: str) -> Optional[Dict[str, Any]]:
+    """User and subscription plan for email in one query, or None if there is no such user."""
+    row = (
+        db.query(User, Subscription)
+        .outerjoin(Subscription, Subscription.user_email == User.email)
+        .filter(User.email == email)
+        .first()
+    )
+    if row is None:
+        return None
+    user, subscription = row
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "role": user.role,
+        "is_active": bool(user.is_active),
+        "plan": subscription.plan if subscription else None,
+        "subscription_status": subscription.status if subscription else None,
+        "ai_queries_limit": subscription.ai_queries_limit if subscription else None,
+    }
+
+
+class PrincipalCache:
+    """Thread-safe, size-bounded LRU of principals with a TTL."""
+
+    def __init__(self, ttl: float = AUTH_PRINCIPAL_CACHE_TTL, max_entries: int = AUTH_PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # email -> (expires_at, principal)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Bumped by every invalidation, so a load that raced one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, email: str) -> Optional[Dict[str, Any]]:
+        """The cached principal for email, loading it on a miss. Returns a copy; None if no such user."""
+        if self.ttl <= 0:
+            return load_principal(db, email)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            generation = self._generation
+
+        principal = load_principal(db, email)
+        if principal is None:
+            return None
+        with self._lock:
+            if self._generation == generation:
+                self._entries[email] = (time.monotonic() + self.ttl, principal)
+                self._entries.move_to_end(email)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return dict(principal)
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_principal_cache: Optional[PrincipalCache] = None
+_principal_cache_lock = threading.Lock()
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Process-wide principal cache used by get_current_user."""
+    global _principal_cache
+    if _principal_cache is None:
+        with _principal_cache_lock:
+            if _principal_cache is None:
+                _principal_cache = PrincipalCache()
+    return _principal_cache
+
+
+def invalidate_principal(email: str) -> None:
+    """Drop email's cached principal; call after changing its user's role, active state or plan."""
+    get_principal_cache().invalidate(email)
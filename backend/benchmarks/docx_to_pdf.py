@@ -0,0 +1,77 @@
+"""
+Benchmark DOCX -> PDF conversion on table-heavy documents
+Also converts a small table with one cell taller than a page, which must split across pages.
+Run from backend/ with: python -m benchmarks.docx_to_pdf [--cells 1000 10000 50000] [--cols 6]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.document_converter_service import docx_to_pdf
+
+
+def make_docx(cells: int, cols: int) -> bytes:
+    """Build a DOCX with a heading, some paragraphs and one table of about `cells` cells"""
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading("Quarterly ledger", level=1)
+    for i in range(20):
+        doc.add_paragraph(f"Paragraph {i + 1}: summary of the ledger entries listed in the table below.")
+    rows = max(1, cells // cols)
+    table = doc.add_table(rows=rows, cols=cols)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"Entry {r + 1}-{c + 1}" if c else f"Account {r + 1} with a longer description that wraps"
+    doc.add_paragraph("End of report.")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def make_tall_cell_docx(cell_kb: int = 50) -> bytes:
+    """A 2x2 table whose second cell holds about cell_kb KB of text, far taller than one page"""
+    from docx import Document
+
+    doc = Document()
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Notes"
+    table.cell(0, 1).text = "word " * (cell_kb * 1024 // 5)
+    table.cell(1, 0).text = "Total"
+    table.cell(1, 1).text = "42"
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def run(cells_list, cols):
+    print(f"{'cells':>7} {'seconds':>8} {'cells/s':>9} {'pdf KB':>8}")
+    for cells in cells_list:
+        docx = make_docx(cells, cols)
+        t0 = time.perf_counter()
+        pdf, err = docx_to_pdf(docx)
+        elapsed = time.perf_counter() - t0
+        if err:
+            print(f"{cells:>7} failed: {err}")
+            continue
+        print(f"{cells:>7} {elapsed:>8.2f} {cells / elapsed:>9.0f} {len(pdf) / 1024:>8.0f}")
+
+    t0 = time.perf_counter()
+    pdf, err = docx_to_pdf(make_tall_cell_docx())
+    elapsed = time.perf_counter() - t0
+    if err:
+        print(f"tall cell failed: {err}")
+    else:
+        print(f"tall cell {elapsed:>6.2f} {'':>9} {len(pdf) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cells", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--cols", type=int, default=6)
+    args = parser.parse_args()
+    run(args.cells, args.cols)
@@ -0,0 +1,67 @@
+"""
+Benchmark Excel -> PowerPoint conversion on many-sheet workbooks
+Run from backend/ with: python -m benchmarks.excel_to_ppt [--sheets 50] [--rows 200] [--repeat 3] [--workers N]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import excel_to_ppt
+from app.services.excel_to_ppt import ExcelToPPTService
+
+
+def make_workbook(sheets: int, rows: int) -> bytes:
+    """Build an XLSX with `sheets` sheets of `rows` rows: one category column and three numeric ones"""
+    import openpyxl
+
+    rng = random.Random(1)
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    regions = ["North", "South", "East", "West", "Central"]
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Sheet {s + 1}")
+        ws.append(["Region", "Revenue", "Units", "Margin", "Notes"])
+        for r in range(rows):
+            ws.append([
+                rng.choice(regions),
+                round(rng.uniform(100, 10000), 2),
+                rng.randint(1, 500),
+                round(rng.uniform(0, 0.6), 3),
+                f"Row {r + 1} of sheet {s + 1}",
+            ])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def run(sheets: int, rows: int, repeat: int, workers: int):
+    # Sheet workers are only used from EXCEL_TO_PPT_PARALLEL_MIN_SHEETS sheets; 1 converts in-process
+    excel_to_ppt.EXCEL_TO_PPT_WORKERS = workers
+    xlsx = make_workbook(sheets, rows)
+    print(f"{sheets} sheets x {rows} rows, {len(xlsx) / 1024:.0f} KB, {workers} worker(s)")
+    print(f"{'run':>4} {'seconds':>8} {'slides/s':>9} {'pptx KB':>8}")
+    # Title slide, then per sheet: section, table, 3 charts, statistics
+    slides = 1 + sheets * 6
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        pptx = asyncio.run(ExcelToPPTService().convert_excel_to_ppt(io.BytesIO(xlsx), "benchmark.xlsx"))
+        elapsed = time.perf_counter() - t0
+        print(f"{i + 1:>4} {elapsed:>8.2f} {slides / elapsed:>9.0f} {len(pptx) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sheets", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=excel_to_ppt.EXCEL_TO_PPT_WORKERS)
+    args = parser.parse_args()
+    run(args.sheets, args.rows, args.repeat, args.workers)
@@ -0,0 +1,103 @@
+"""
+Benchmark login throughput and event-loop responsiveness: bcrypt inline vs on the hashing pool
+Fires concurrent logins (a mix of good and bad passwords) at the app in-process while a probe
+calls /health every 10 ms, and reports logins/s, login latency and how late /health answered.
+Run from backend/ with: python -m benchmarks.login [--logins 40] [--concurrency 20] [--rounds 12]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def run_mode(app, pool, mode: str, logins: int, concurrency: int):
+    import httpx
+
+    if mode == "inline":
+        # The previous behaviour: bcrypt runs on the event loop inside the handler
+        async def run_inline(fn, *args):
+            return fn(*args)
+        pool.run = run_inline
+    else:
+        pool.__dict__.pop("run", None)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses, probes = [], {}, []
+        done = asyncio.Event()
+
+        async def login(i):
+            async with semaphore:
+                password = "correct-horse-battery" if i % 2 == 0 else "wrong-password-123"
+                t0 = time.perf_counter()
+                r = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": password})
+                latencies.append(time.perf_counter() - t0)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        async def probe():
+            # Time from when /health is due (every 10 ms) until it has answered, so event-loop stalls count
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.01)
+                await client.get("/health")
+                probes.append(time.perf_counter() - t0 - 0.01)
+
+        prober = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await prober
+
+    print(
+        f"{mode:>7} {logins / elapsed:>9.1f} {_percentile(latencies, 0.5) * 1000:>9.0f} "
+        f"{_percentile(latencies, 0.95) * 1000:>9.0f} {_percentile(probes, 0.5) * 1000:>10.1f} "
+        f"{max(probes) * 1000 if probes else 0:>10.1f}  {statuses}"
+    )
+
+
+def main(logins: int, concurrency: int, rounds: int):
+    db_dir = tempfile.mkdtemp(prefix="loginbench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    # Enough queue for the whole burst, so the run measures throughput rather than shedding
+    os.environ.setdefault("PASSWORD_HASH_QUEUE_SIZE", str(concurrency))
+
+    from app.database import SessionLocal, User, init_db
+    from app.main import app
+    from app.utils.auth import get_password_hash
+    from app.utils.password_hasher import get_password_hasher
+
+    init_db()
+    db = SessionLocal()
+    db.add(User(email="bench@example.com", full_name="Bench", hashed_password=get_password_hash("correct-horse-battery"),
+                role="user", is_verified=True))
+    db.commit()
+    db.close()
+
+    pool = get_password_hasher()
+    print(f"bcrypt cost {rounds}, {logins} logins, concurrency {concurrency}, pool workers {pool.workers}")
+    print(f"{'mode':>7} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'health p50':>10} {'health max':>10}  statuses")
+    for mode in ("inline", "pool"):
+        asyncio.run(run_mode(app, pool, mode, logins, concurrency))
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    main(args.logins, args.concurrency, args.rounds)
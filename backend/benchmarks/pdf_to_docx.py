@@ -0,0 +1,71 @@
+"""
+Benchmark PDF -> DOCX conversion: serial vs page-parallel
+Run from backend/ with: python -m benchmarks.pdf_to_docx [--pages 10 100 500] [--workers 4]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.document_converter_service import PDF_WORKERS, pdf_to_docx
+
+
+def make_pdf(pages: int) -> bytes:
+    """Build a text-and-table PDF with the given number of pages (contract-like content)"""
+    import fitz
+
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        y = 72
+        page.insert_text((72, y), f"Clause {p + 1}. Terms and conditions", fontsize=14)
+        for line in range(20):
+            y += 16
+            page.insert_text((72, y), f"{p + 1}.{line + 1} The parties agree to the obligations set out in this section.", fontsize=10)
+        # small ruled table
+        top = y + 24
+        for r in range(6):
+            page.draw_line((72, top + r * 18), (522, top + r * 18))
+            for c in range(3):
+                if r < 5:
+                    page.insert_text((78 + c * 150, top + r * 18 + 13), f"R{r + 1}C{c + 1}", fontsize=9)
+        for c in range(4):
+            page.draw_line((72 + c * 150, top), (72 + c * 150, top + 90))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def run(pages_list, workers):
+    print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8}")
+    for pages in pages_list:
+        pdf = make_pdf(pages)
+
+        t0 = time.perf_counter()
+        _, err = pdf_to_docx(pdf, workers=1)
+        serial = time.perf_counter() - t0
+        if err:
+            print(f"{pages:>6} serial failed: {err}")
+            continue
+
+        # parallel_min_pages=0 forces the parallel path even for small PDFs
+        t0 = time.perf_counter()
+        _, err = pdf_to_docx(pdf, workers=workers, parallel_min_pages=0)
+        parallel = time.perf_counter() - t0
+        if err:
+            print(f"{pages:>6} parallel failed: {err}")
+            continue
+
+        print(f"{pages:>6} {serial:>10.2f} {parallel:>11.2f} {serial / parallel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--workers", type=int, default=PDF_WORKERS)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # pdf2docx logs every page
+    run(args.pages, args.workers)